@@ -2,6 +2,7 @@
 -- This file creates the database tables for the SoccerApp application
 
 -- Drop tables if they exist to ensure clean setup
+DROP TABLE IF EXISTS data_version;
 DROP TABLE IF EXISTS players;
 DROP TABLE IF EXISTS teams;
 
@@ -45,9 +46,24 @@ CREATE TABLE players (
     FOREIGN KEY (team_id) REFERENCES teams(id) ON DELETE CASCADE
 );
 
+-- Per-table write counters used by the Python API to build ETags
+CREATE TABLE data_version (
+    table_name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0
+);
+
 -- Create indexes for better performance
+-- (the Python API declares the same indexes on its models)
 CREATE INDEX idx_players_team_id ON players(team_id);
 CREATE INDEX idx_teams_country ON teams(country);
 CREATE INDEX idx_teams_league ON teams(league);
+CREATE INDEX idx_teams_name ON teams(name);
 CREATE INDEX idx_players_nationality ON players(nationality);
 CREATE INDEX idx_players_position ON players(position);
+CREATE INDEX idx_players_full_name ON players(full_name);
+CREATE INDEX idx_players_value ON players(player_value);
+
+-- Composite indexes for the per-team report queries
+CREATE INDEX idx_players_team_injured ON players(team_id, is_injured);
+CREATE INDEX idx_players_team_rating ON players(team_id, rating);
+CREATE INDEX idx_players_team_value ON players(team_id, player_value);
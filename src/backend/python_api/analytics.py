@@ -0,0 +1,376 @@
+"""Vectorized player analytics over columns held in NumPy arrays.
+
+``PlayerFrameCache`` keeps the numeric player columns, a position code and
+the team of every player in memory as one ``PlayerFrame``. The first
+request loads them in a single bulk fetch; later requests compare the
+change log cursor (see change_log.py) with the frame's and patch only the
+rows written since, falling back to a full reload after large writes.
+Frames are immutable, so a refresh builds a new one and readers never see
+a half-applied update.
+
+The statistics are plain functions over arrays: masks select the players,
+``np.bincount`` and a single sort per request compute grouped figures, so
+the cost per request is a few passes over the selected rows.
+"""
+
+import threading
+from datetime import date
+
+import numpy as np
+
+import change_log
+
+# Numeric columns loaded per player: name -> SQL expression
+COLUMNS = {
+    'player_value': 'player_value',
+    'salary': 'salary',
+    'rating': 'rating',
+    'height': 'height',
+    'weight': 'weight',
+    'birth_day': 'julianday(date_of_birth)',
+    'team_id': 'team_id',
+}
+# Reload everything when more than this share of the players changed
+FULL_RELOAD_FRACTION = 0.05
+MIN_DELTA_ROWS = 1000
+FETCH_CHUNK = 500
+DAYS_PER_YEAR = 365.2425
+
+METRICS = ('player_value', 'salary', 'rating', 'age', 'value_per_rating', 'salary_to_value')
+GROUPINGS = ('position', 'league', 'country', 'team')
+DEFAULT_PERCENTILES = (10, 25, 50, 75, 90, 95, 99)
+
+
+class PlayerFrame:
+    """Player columns as arrays, sorted by id.
+
+    ``alive`` is False for rows deleted since the frame was loaded.
+    ``position`` holds codes into ``position_names`` (-1 for none). Team
+    attributes are looked up through ``teams``, whose ``slot`` maps team ids.
+    A frame patched from the change log records the ``seq`` it was built
+    on and the player ids it re-read, so indexes derived from the previous
+    frame can be patched the same way.
+    """
+
+    def __init__(self, seq, ids, columns, position, position_names, alive, teams,
+                 base_seq=None, changed_ids=None):
+        self.seq = seq
+        self.base_seq = base_seq
+        self.changed_ids = changed_ids
+        self.ids = ids
+        self.columns = columns
+        self.position = position
+        self.position_names = position_names
+        self.alive = alive
+        self.teams = teams
+
+    def __len__(self):
+        return int(self.alive.sum())
+
+    def team_index(self):
+        """Index into the team lookup arrays per row; the last slot stands for "no team"."""
+        team_id = self.columns['team_id']
+        size = len(self.teams['ids'])
+        index = np.full(len(team_id), size, dtype=np.int64)
+        valid = ~np.isnan(team_id)
+        known = np.zeros(len(team_id), dtype=bool)
+        known[valid] = team_id[valid] < len(self.teams['slot'])
+        slots = np.full(len(team_id), -1, dtype=np.int64)
+        slots[known] = self.teams['slot'][team_id[known].astype(np.int64)]
+        index[slots >= 0] = slots[slots >= 0]
+        return index
+
+    def mask(self, league=None, country=None, team_id=None, position=None):
+        """Rows of live players matching every given filter."""
+        mask = self.alive.copy()
+        if team_id is not None:
+            mask &= self.columns['team_id'] == team_id
+        if position is not None:
+            code = self.position_names.index(position) if position in self.position_names else -2
+            mask &= self.position == code
+        if league is not None or country is not None:
+            team_index = self.team_index()
+            for key, value in (('league', league), ('country', country)):
+                if value is not None:
+                    names = self.teams[f"{key}_names"]
+                    code = names.index(value) if value in names else -2
+                    mask &= self.teams[key][team_index] == code
+        return mask
+
+    def metric(self, name, today=None):
+        """Values of a metric for every row; NaN where it is undefined."""
+        columns = self.columns
+        if name == 'age':
+            today = julian_day(today or date.today())
+            return (today - columns['birth_day']) / DAYS_PER_YEAR
+        if name == 'value_per_rating':
+            return ratio(columns['player_value'], columns['rating'])
+        if name == 'salary_to_value':
+            return ratio(columns['salary'], columns['player_value'])
+        return columns[name]
+
+    def groups(self, by):
+        """Group code per row and the group names, for ``by`` in GROUPINGS."""
+        if by == 'position':
+            return self.position, list(self.position_names)
+        if by == 'team':
+            return self.team_index(), [int(i) for i in self.teams['ids']]
+        return self.teams[by][self.team_index()], list(self.teams[f"{by}_names"])
+
+
+def julian_day(day):
+    # date.toordinal() counts from 0001-01-01, which is Julian day 1721425.5
+    return day.toordinal() + 1721424.5
+
+
+def ratio(numerator, denominator):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(denominator > 0, numerator / denominator, np.nan)
+
+
+def _codes(values, names):
+    """Map strings to codes in ``names``, extending it with unseen values; None is -1."""
+    index = {name: i for i, name in enumerate(names)}
+    codes = np.empty(len(values), dtype=np.int64)
+    for i, value in enumerate(values):
+        if value is None:
+            codes[i] = -1
+        else:
+            if value not in index:
+                index[value] = len(names)
+                names.append(value)
+            codes[i] = index[value]
+    return codes
+
+
+def fetch_rows(connection, sql, params=()):
+    """Plain DBAPI tuples of a statement run through SQLAlchemy.
+
+    Building Row objects costs several times the fetch itself at a million
+    rows, so the rows are read from the underlying cursor.
+    """
+    result = connection.exec_driver_sql(sql, tuple(params))
+    try:
+        return result.cursor.fetchall()
+    finally:
+        result.close()
+
+
+def load_teams(connection):
+    """League and country codes per team, addressable by team id through ``slot``."""
+    rows = fetch_rows(connection, "SELECT id, league, country FROM teams ORDER BY id")
+    ids = np.array([r[0] for r in rows], dtype=np.int64)
+    teams = {'ids': ids, 'league_names': [], 'country_names': []}
+    for position, key in ((1, 'league'), (2, 'country')):
+        # One extra slot at the end for players without a (known) team
+        teams[key] = np.append(_codes([r[position] for r in rows], teams[f"{key}_names"]), -1)
+    slot = np.full(int(ids.max()) + 1 if len(ids) else 0, -1, dtype=np.int64)
+    slot[ids] = np.arange(len(ids))
+    teams['slot'] = slot
+    return teams
+
+
+def _select(where=''):
+    return f"SELECT id, {', '.join(COLUMNS.values())}, position FROM players {where}"
+
+
+def _split(rows, position_names):
+    """Turn fetched rows into (ids, {column: array}, position codes)."""
+    positions = [r[-1] for r in rows]
+    matrix = np.array([r[:-1] for r in rows], dtype=np.float64).reshape(len(rows), len(COLUMNS) + 1)
+    ids = matrix[:, 0].astype(np.int64)
+    columns = {name: np.ascontiguousarray(matrix[:, i + 1]) for i, name in enumerate(COLUMNS)}
+    return ids, columns, _codes(positions, position_names)
+
+
+def load_frame(session):
+    """Read every player in one query into a new frame."""
+    seq = change_log.head(session)
+    connection = session.connection()
+    teams = load_teams(connection)
+    position_names = [p for (p,) in fetch_rows(
+        connection, "SELECT DISTINCT position FROM players WHERE position IS NOT NULL ORDER BY position")]
+    # Positions come back as codes so the whole result converts to one float matrix
+    case = ' '.join(f"WHEN ? THEN {i}" for i in range(len(position_names)))
+    position_sql = f"CASE position {case} ELSE -1 END" if position_names else '-1'
+    rows = fetch_rows(
+        connection, f"SELECT id, {', '.join(COLUMNS.values())}, {position_sql} FROM players ORDER BY id",
+        position_names)
+    matrix = np.array(rows, dtype=np.float64).reshape(len(rows), len(COLUMNS) + 2)
+    columns = {name: np.ascontiguousarray(matrix[:, i + 1]) for i, name in enumerate(COLUMNS)}
+    return PlayerFrame(seq, matrix[:, 0].astype(np.int64), columns, matrix[:, -1].astype(np.int64),
+                       position_names, np.ones(len(rows), dtype=bool), teams)
+
+
+def merge_rows(ids, arrays, alive, new_ids, new_arrays, gone_ids):
+    """Apply upserts and deletes to arrays laid out by sorted ``ids``; returns new arrays.
+
+    ``arrays`` maps names to arrays whose first axis follows ``ids`` and
+    ``new_arrays`` holds the same names for the rows of ``new_ids``. Rows
+    of ``gone_ids`` are marked dead in ``alive``, existing ids are
+    overwritten in place and new ids are inserted in order.
+    """
+    arrays = {name: values.copy() for name, values in arrays.items()}
+    alive = alive.copy()
+
+    slots = np.searchsorted(ids, gone_ids)
+    found = slots < len(ids)
+    found[found] = ids[slots[found]] == gone_ids[found]
+    alive[slots[found]] = False
+
+    slots = np.searchsorted(ids, new_ids)
+    existing = slots < len(ids)
+    existing[existing] = ids[slots[existing]] == new_ids[existing]
+    for name, values in arrays.items():
+        values[slots[existing]] = new_arrays[name][existing]
+    alive[slots[existing]] = True
+
+    added = ~existing
+    if added.any():
+        at = slots[added]
+        ids = np.insert(ids, at, new_ids[added])
+        arrays = {name: np.insert(values, at, new_arrays[name][added], axis=0) for name, values in arrays.items()}
+        alive = np.insert(alive, at, True)
+    return ids, arrays, alive
+
+
+def apply_changes(session, frame, seq, entries):
+    """A copy of ``frame`` with the given change log entries applied."""
+    player_ids = [e.row_id for e in entries if e.table_name == 'players']
+    teams_changed = any(e.table_name == 'teams' for e in entries)
+
+    connection = session.connection()
+    teams = load_teams(connection) if teams_changed else frame.teams
+    rows = []
+    for start in range(0, len(player_ids), FETCH_CHUNK):
+        chunk = player_ids[start:start + FETCH_CHUNK]
+        rows += fetch_rows(connection, _select(f"WHERE id IN ({', '.join('?' * len(chunk))})"), chunk)
+
+    position_names = list(frame.position_names)
+    new_ids, new_columns, new_position = _split(rows, position_names)
+    # Ids in the log that no longer exist were deleted
+    gone = np.setdiff1d(np.array(player_ids, dtype=np.int64), new_ids)
+    ids, arrays, alive = merge_rows(frame.ids, {**frame.columns, 'position': frame.position}, frame.alive,
+                                    new_ids, {**new_columns, 'position': new_position}, gone)
+    position = arrays.pop('position')
+    return PlayerFrame(seq, ids, arrays, position, position_names, alive, teams,
+                       base_seq=frame.seq, changed_ids=np.array(player_ids, dtype=np.int64))
+
+
+class PlayerFrameCache:
+    """The current ``PlayerFrame``, refreshed from the change log on demand."""
+
+    def __init__(self):
+        self._frame = None
+        self._lock = threading.Lock()
+        self.full_loads = 0
+        self.delta_loads = 0
+
+    def clear(self):
+        with self._lock:
+            self._frame = None
+
+    def get(self, session):
+        seq = change_log.head(session)
+        frame = self._frame
+        if frame is not None and frame.seq == seq:
+            return frame
+        with self._lock:
+            frame = self._frame
+            if frame is None or frame.seq != seq:
+                frame = self._refresh(session, frame)
+                self._frame = frame
+            return frame
+
+    def _refresh(self, session, frame):
+        if frame is not None:
+            seq = change_log.head(session)
+            limit = max(MIN_DELTA_ROWS, int(len(frame.ids) * FULL_RELOAD_FRACTION))
+            try:
+                entries, has_more = change_log.read_changes(session, frame.seq, limit)
+            except change_log.CursorExpired:
+                has_more = True
+            if not has_more:
+                self.delta_loads += 1
+                return apply_changes(session, frame, seq, entries)
+        self.full_loads += 1
+        return load_frame(session)
+
+
+# Statistics over plain arrays
+
+def describe(values, percentiles=DEFAULT_PERCENTILES):
+    """Count, mean, standard deviation, range and percentiles of the non-NaN values."""
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return {'count': 0, 'mean': None, 'std': None, 'min': None, 'max': None,
+                'percentiles': {f"p{p}": None for p in percentiles}}
+    return {
+        'count': int(len(values)),
+        'mean': float(values.mean()),
+        'std': float(values.std()),
+        'min': float(values.min()),
+        'max': float(values.max()),
+        'percentiles': {f"p{p}": float(v) for p, v in zip(percentiles, np.percentile(values, percentiles))},
+    }
+
+
+def histogram(values, bins):
+    """Equal-width histogram of the non-NaN values: bin edges and counts."""
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return {'edges': [], 'counts': []}
+    counts, edges = np.histogram(values, bins=bins)
+    return {'edges': edges.tolist(), 'counts': counts.tolist()}
+
+
+def grouped(codes, values, names, percentiles=(25, 50, 75)):
+    """Per-group count, mean, std and percentiles of ``values`` by integer ``codes``.
+
+    Rows with a negative code or a NaN value are skipped; groups without
+    values are left out. Percentiles interpolate linearly like
+    ``np.percentile``, computed for all groups from one ordering of the values.
+    """
+    keep = (codes >= 0) & (codes < len(names)) & ~np.isnan(values)
+    codes, values = codes[keep], values[keep]
+    ngroups = len(names)
+    counts = np.bincount(codes, minlength=ngroups)[:ngroups]
+    sums = np.bincount(codes, weights=values, minlength=ngroups)[:ngroups]
+    squares = np.bincount(codes, weights=values * values, minlength=ngroups)[:ngroups]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        means = sums / counts
+        stds = np.sqrt(np.maximum(squares / counts - means * means, 0))
+
+    # Sort by value, then stably by group: on codes narrowed to 16 bits or
+    # less numpy uses a radix sort, about five times faster than lexsort
+    order = np.argsort(values)
+    order = order[np.argsort(codes.astype(np.min_scalar_type(ngroups))[order], kind='stable')]
+    sorted_values = values[order]
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    present = counts > 0
+    quantiles = {}
+    for p in percentiles:
+        position = starts[present] + (counts[present] - 1) * (p / 100)
+        low = np.floor(position).astype(np.int64)
+        high = np.minimum(low + 1, starts[present] + counts[present] - 1)
+        fraction = position - low
+        quantiles[p] = sorted_values[low] * (1 - fraction) + sorted_values[high] * fraction
+
+    result = {}
+    for i, group in enumerate(np.flatnonzero(present)):
+        result[names[group]] = {
+            'count': int(counts[group]),
+            'mean': float(means[group]),
+            'std': float(stds[group]),
+            **{f"p{p}": float(quantiles[p][i]) for p in percentiles},
+        }
+    return result
+
+
+def age_curve(ages, values, min_age=15, max_age=45):
+    """Per whole year of age: player count, mean and median of ``values``."""
+    years = np.floor(ages)
+    keep = ~np.isnan(years) & (years >= min_age) & (years <= max_age)
+    codes = np.where(keep, years - min_age, -1).astype(np.int64)
+    names = list(range(min_age, max_age + 1))
+    return grouped(codes, values, names, percentiles=(50,))
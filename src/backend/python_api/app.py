@@ -1,24 +1,110 @@
 # Python API for Soccer Team Management
 # This is a demo app to showcase GitHub Copilot features
 
-from flask import Flask, request, jsonify
+from flask import Blueprint, Flask, Response, current_app, request, jsonify, make_response, stream_with_context
 from flask_cors import CORS
-from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime
-import json
+from sqlalchemy import and_, case, event, func, inspect, text
+from sqlalchemy.orm import aliased
+from datetime import date, datetime
+from functools import wraps
+from types import SimpleNamespace
+from urllib.parse import urlencode
+import hashlib
+import math
 import os
 
-app = Flask(__name__)
-CORS(app)  # Enable CORS for all routes
+from report_cache import ReportCache
+from serialization import json_response
+import serialization
+import analytics
+import change_log
+import export
+import search as search_index
+import similar
+import team_stats
+from metrics import Metrics
+from sqlite_tuning import TunedSQLAlchemy
 
-# Configure SQLAlchemy with SQLite
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///instance/soccer_app.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-print(f"SQLAlchemy connecting to: {app.config['SQLALCHEMY_DATABASE_URI']}")
-db = SQLAlchemy(app)
+db = TunedSQLAlchemy()
+metrics = Metrics()
+# Report payload cache, invalidated per team by the write endpoints
+report_cache = ReportCache()
+# Player columns as NumPy arrays for /api/analytics, refreshed from the change log
+analytics_frames = analytics.PlayerFrameCache()
+# Nearest-neighbour index over the same frame for /api/players/<id>/similar
+similar_players = similar.SimilarityIndexCache(analytics_frames)
+api = Blueprint('api', __name__)
+
+def create_app(config=None):
+    """Build and configure the Flask app; ``config`` overrides the environment.
+
+    Nothing connects to the database here: engines are created on first use,
+    so a prefork server can build the app before forking its workers.
+    """
+    app = Flask(__name__)
+    CORS(app)  # Enable CORS for all routes
+
+    # Configure SQLAlchemy with SQLite
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///instance/soccer_app.db')
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+    # SQLite performance profile and pool sizing (see sqlite_tuning.py)
+    app.config['SQLITE_PROFILE'] = os.environ.get('SQLITE_PROFILE', 'performance')
+    app.config['SQLITE_POOL_SIZE'] = int(os.environ.get('SQLITE_POOL_SIZE', 8))
+    app.config['SQLITE_MAX_OVERFLOW'] = int(os.environ.get('SQLITE_MAX_OVERFLOW', 8))
+    app.config['SQLITE_POOL_TIMEOUT'] = float(os.environ.get('SQLITE_POOL_TIMEOUT', 30))
+
+    # JSON encoder backend for the read endpoints (see serialization.py)
+    app.config['JSON_BACKEND'] = os.environ.get('JSON_BACKEND', 'auto')
+
+    # Request metrics at /api/_metrics and slow-request profiling (see metrics.py)
+    app.config['METRICS_ENABLED'] = os.environ.get('METRICS_ENABLED', '0') == '1'
+    app.config['PROFILE_SLOW_MS'] = float(os.environ.get('PROFILE_SLOW_MS', 0))
+    app.config['PROFILE_INTERVAL_MS'] = float(os.environ.get('PROFILE_INTERVAL_MS', 5))
+    app.config['PROFILE_DIR'] = os.environ.get('PROFILE_DIR', 'profiles')
+
+    app.config['REPORT_CACHE_SIZE'] = int(os.environ.get('REPORT_CACHE_SIZE', 256))
+    app.config['REPORT_CACHE_TTL'] = float(os.environ.get('REPORT_CACHE_TTL', 300))
+
+    app.config.update(config or {})
+
+    db.init_app(app)
+    serialization.init_app(app)
+    metrics.init_app(app)
+    report_cache.configure(app.config['REPORT_CACHE_SIZE'], app.config['REPORT_CACHE_TTL'])
+    app.register_blueprint(api)
+    return app
+
+def prepare_database(app):
+    """Create missing tables and the search index, then report what the database holds."""
+    with app.app_context():
+        db.create_all()
+        migrate_legacy_tables()
+        search_index.ensure_search_index(db.session)
+        team_stats.ensure_team_stats(db.session)
+        change_log.ensure_change_log(db.session)
+        print("Database tables created or verified")
+        load_data()
+
+def dispose_engines(app, close=True):
+    """Replace the connection pool so no connection is shared across a fork.
+
+    The master calls this with ``close=True`` once it is done with the
+    database; forked workers pass ``close=False`` so they never close
+    connections that belong to another process.
+    """
+    with app.app_context():
+        db.get_engine().dispose(close=close)
 
 # Define models
+# Table and index names match schemas/schema.sql
 class Team(db.Model):
+    __tablename__ = 'teams'
+    __table_args__ = (
+        db.Index('idx_teams_country', 'country'),
+        db.Index('idx_teams_league', 'league'),
+        db.Index('idx_teams_name', 'name'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     established_year = db.Column(db.Integer)
@@ -55,6 +141,18 @@ class Team(db.Model):
         }
 
 class Player(db.Model):
+    __tablename__ = 'players'
+    __table_args__ = (
+        db.Index('idx_players_team_id', 'team_id'),
+        db.Index('idx_players_nationality', 'nationality'),
+        db.Index('idx_players_position', 'position'),
+        db.Index('idx_players_full_name', 'full_name'),
+        db.Index('idx_players_value', 'player_value'),
+        # Composite indexes serving the per-team report queries
+        db.Index('idx_players_team_injured', 'team_id', 'is_injured'),
+        db.Index('idx_players_team_rating', 'team_id', 'rating'),
+        db.Index('idx_players_team_value', 'team_id', 'player_value'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     full_name = db.Column(db.String(100), nullable=False)
     date_of_birth = db.Column(db.Date)
@@ -67,7 +165,7 @@ class Player(db.Model):
     contract_end = db.Column(db.Date)
     salary = db.Column(db.Float)
     player_value = db.Column(db.Float)
-    team_id = db.Column(db.Integer, db.ForeignKey('team.id'))
+    team_id = db.Column(db.Integer, db.ForeignKey('teams.id', ondelete='CASCADE'))
     photo_url = db.Column(db.String(200))
     is_injured = db.Column(db.Boolean, default=False)
     injury_details = db.Column(db.Text)
@@ -94,6 +192,83 @@ class Player(db.Model):
             'rating': self.rating
         }
 
+class DataVersion(db.Model):
+    """Per-table write counter used to derive ETags for the GET endpoints."""
+    table_name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+VERSIONED_MODELS = (Team, Player)
+
+@event.listens_for(db.session, 'after_flush')
+def bump_data_versions(session, flush_context):
+    # new/dirty/deleted still hold the pre-flush state inside after_flush
+    touched = {obj.__tablename__ for obj in session.new if isinstance(obj, VERSIONED_MODELS)}
+    touched.update(obj.__tablename__ for obj in session.deleted if isinstance(obj, VERSIONED_MODELS))
+    touched.update(obj.__tablename__ for obj in session.dirty
+                   if isinstance(obj, VERSIONED_MODELS) and session.is_modified(obj))
+    for table_name in touched:
+        bump_data_version(session, table_name)
+
+def bump_data_version(session, table_name):
+    session.execute(text(
+        "INSERT INTO data_version (table_name, version) VALUES (:table_name, 1) "
+        "ON CONFLICT (table_name) DO UPDATE SET version = version + 1"
+    ), {'table_name': table_name})
+
+def conditional_get(*models):
+    """Answer GETs with a strong ETag derived from the versions of ``models``.
+
+    The tag covers the request URL and representation, so a matching
+    ``If-None-Match`` gets a 304 after a single primary key lookup, before
+    any rows are queried or serialized.
+    """
+    table_names = [m.__tablename__ for m in models]
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            versions = dict(db.session.query(DataVersion.table_name, DataVersion.version)
+                            .filter(DataVersion.table_name.in_(table_names)).all())
+            tag_source = '|'.join([request.full_path, str(wants_stream(request.args))] +
+                                  [f"{name}={versions.get(name, 0)}" for name in table_names])
+            # Drops cached reports older than these versions, which may come
+            # from writes served by another worker process
+            report_cache.sync({name: versions.get(name, 0) for name in table_names})
+            etag = hashlib.sha1(tag_source.encode()).hexdigest()
+
+            if etag in request.if_none_match:
+                response = Response(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorator
+
+def migrate_legacy_tables():
+    """Copy rows from the ``team``/``player`` tables created by older versions.
+
+    Earlier releases let SQLAlchemy name the tables after the models, so an
+    existing database may hold its data there while ``teams``/``players``
+    (the names used by schemas/schema.sql) are empty. The old tables are
+    kept, renamed to ``team_migrated``/``player_migrated``, so the copy runs
+    once: emptying ``teams`` later must not bring the old rows back.
+    """
+    existing = set(inspect(db.engine).get_table_names())
+    for legacy_name, model in (('team', Team), ('player', Player)):
+        if legacy_name not in existing:
+            continue
+        if db.session.query(model.id).first() is None:
+            columns = ', '.join(model.__table__.columns.keys())
+            db.session.execute(text(
+                f"INSERT INTO {model.__tablename__} ({columns}) SELECT {columns} FROM {legacy_name}"))
+            print(f"Copied rows from legacy table '{legacy_name}' into '{model.__tablename__}'")
+        db.session.execute(text(f"ALTER TABLE {legacy_name} RENAME TO {legacy_name}_migrated"))
+    db.session.commit()
+
 # Verify database is loaded with data
 def load_data():
     try:
@@ -120,46 +295,154 @@ def load_data():
     except Exception as e:
         print(f"Error checking database: {e}")
 
+# Listing helpers: keyset pagination and field projection
+MAX_PAGE_LIMIT = 1000
+
+def parse_fields(model, fields_param):
+    """Parse a comma separated ``fields`` parameter into model column names.
+
+    Returns None when no projection was requested. Raises ValueError on
+    unknown field names.
+    """
+    if not fields_param:
+        return None
+    columns = model.__table__.columns.keys()
+    fields = [f.strip() for f in fields_param.split(',') if f.strip()]
+    unknown = [f for f in fields if f not in columns]
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
+    return fields
+
+def parse_page_args(args):
+    """Return (limit, after) from the query string, both None when absent."""
+    limit = args.get('limit')
+    after = args.get('after')
+    if limit is not None:
+        limit = int(limit)
+        if limit < 1 or limit > MAX_PAGE_LIMIT:
+            raise ValueError(f"limit must be between 1 and {MAX_PAGE_LIMIT}")
+    if after is not None:
+        after = int(after)
+    return limit, after
+
+STREAM_CHUNK_ROWS = 1000
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+def wants_stream(args):
+    """True when the client asked for NDJSON via ``stream=1`` or the Accept header."""
+    if args.get('stream', '').lower() in ('1', 'true'):
+        return True
+    return request.accept_mimetypes.best == NDJSON_MIMETYPE
+
+def stream_ndjson(query, to_item):
+    """Stream query results as NDJSON, one object per line.
+
+    Rows are read through ``yield_per`` so only one chunk is held in memory
+    at a time, and each chunk is written out as a single piece of the body.
+    """
+    dumps = serialization.dumps
+
+    def generate():
+        lines = []
+        for row in query.yield_per(STREAM_CHUNK_ROWS):
+            lines.append(dumps(to_item(row)))
+            if len(lines) >= STREAM_CHUNK_ROWS:
+                yield b'\n'.join(lines) + b'\n'
+                lines = []
+        if lines:
+            yield b'\n'.join(lines) + b'\n'
+
+    return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
+
+def list_response(model, query_filter, args):
+    """Build the JSON response for a list endpoint.
+
+    ``query_filter`` applies the endpoint specific filters to a query over
+    the selected columns. With ``fields`` only those columns are selected in
+    SQL; with ``limit``/``after`` the rows are paged by id and wrapped in an
+    envelope carrying the cursor for the next page. Streaming requests get
+    NDJSON instead (see ``wants_stream``).
+    """
+    try:
+        fields = parse_fields(model, args.get('fields'))
+        limit, after = parse_page_args(args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # Rows are read as plain column tuples, skipping ORM object hydration
+    names = fields or model.__table__.columns.keys()
+    if 'id' in names:
+        query = query_filter(db.session.query(*[getattr(model, n) for n in names]))
+        to_item = lambda r: dict(zip(names, r))
+    else:
+        # Always select the id so it can serve as the pagination cursor
+        query = query_filter(db.session.query(model.id, *[getattr(model, n) for n in names]))
+        to_item = lambda r: dict(zip(names, r[1:]))
+
+    paginate = limit is not None or after is not None
+    if after is not None:
+        query = query.filter(model.id > after)
+
+    if wants_stream(args):
+        query = query.order_by(model.id)
+        if limit is not None:
+            query = query.limit(limit)
+        return stream_ndjson(query, to_item)
+
+    if paginate:
+        query = query.order_by(model.id).limit((limit or MAX_PAGE_LIMIT) + 1)
+
+    rows = query.all()
+
+    next_cursor = None
+    if paginate and len(rows) > (limit or MAX_PAGE_LIMIT):
+        rows = rows[:-1]
+        next_cursor = rows[-1].id
+
+    items = [to_item(r) for r in rows]
+
+    if not paginate:
+        return json_response(items)
+
+    next_url = None
+    if next_cursor is not None:
+        params = request.args.to_dict()
+        params['after'] = next_cursor
+        next_url = f"{request.base_url}?{urlencode(params)}"
+
+    return json_response({'items': items, 'next_cursor': next_cursor, 'next': next_url})
+
 # Team endpoints
-@app.route('/api/teams', methods=['GET'])
+@api.route('/api/teams', methods=['GET'])
+@conditional_get(Team)
 def get_teams():
     # Optional query parameters for filtering
     country = request.args.get('country')
     league = request.args.get('league')
+    current_app.logger.debug("Fetching teams with filters: country=%s, league=%s", country, league)
     
-    # Print debug info
-    print(f"Fetching teams with filters: country={country}, league={league}")
+    def apply_filters(query):
+        if country:
+            query = query.filter(Team.country == country)
+        if league:
+            query = query.filter(Team.league == league)
+        return query
     
-    # Use SQLAlchemy to query teams
-    query = Team.query
-    
-    if country:
-        query = query.filter(Team.country == country)
-    if league:
-        query = query.filter(Team.league == league)
-    
-    teams = query.all()
-    print(f"SQLAlchemy found {len(teams)} teams")
-    if len(teams) > 0:
-        print(f"First team: {teams[0].name}")
-    
-    return jsonify([t.to_dict() for t in teams])
+    return list_response(Team, apply_filters, request.args)
 
-@app.route('/api/teams/<int:team_id>', methods=['GET'])
+@api.route('/api/teams/<int:team_id>', methods=['GET'])
+@conditional_get(Team)
 def get_team(team_id):
-    print(f"Getting team with ID: {team_id} (type: {type(team_id)})")
-    
     team = Team.query.get(team_id)
     if not team:
         return jsonify({'error': 'Team not found'}), 404
     
-    return jsonify(team.to_dict())
+    return json_response(team.to_dict())
 
-@app.route('/api/teams', methods=['POST'])
+@api.route('/api/teams', methods=['POST'])
 def create_team():
     try:
         team_data = request.json
-        print(f"Parsed JSON data: {team_data}")
         
         if not team_data:
             return jsonify({"error": "No JSON data provided"}), 400
@@ -186,19 +469,18 @@ def create_team():
         
         db.session.add(new_team)
         db.session.commit()
-        print(f"Team created successfully with ID: {new_team.id}")
+        report_cache.invalidate_teams(new_team.id)
+        current_app.logger.debug("Team created with ID: %s", new_team.id)
         
         # Return the newly created team
         return jsonify(new_team.to_dict()), 201
             
     except Exception as e:
-        print(f"Error creating team: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        current_app.logger.exception("Error creating team")
         db.session.rollback()
         return jsonify({"error": f"Failed to create team: {str(e)}"}), 500
 
-@app.route('/api/teams/<int:team_id>', methods=['PUT'])
+@api.route('/api/teams/<int:team_id>', methods=['PUT'])
 def update_team(team_id):
     team = Team.query.get(team_id)
     if not team:
@@ -206,15 +488,16 @@ def update_team(team_id):
     
     team_data = request.json
     
-    for field in ['name','established_year','home_stadium','logo_url','club_colors','country','league','current_season_position','team_value','historical_performance','contact_information','description','wikipedia_link']:
+    for field in TEAM_FIELDS:
         if field in team_data:
             setattr(team, field, team_data[field])
     
     db.session.commit()
+    report_cache.invalidate_teams(team_id)
     
     return jsonify(team.to_dict())
 
-@app.route('/api/teams/<int:team_id>', methods=['DELETE'])
+@api.route('/api/teams/<int:team_id>', methods=['DELETE'])
 def delete_team(team_id):
     team = Team.query.get(team_id)
     if not team:
@@ -222,39 +505,80 @@ def delete_team(team_id):
     
     db.session.delete(team)
     db.session.commit()
+    report_cache.invalidate_teams(team_id)
     
     return jsonify({'message': 'Team deleted successfully'})
 
 # Player endpoints
-@app.route('/api/players', methods=['GET'])
+@api.route('/api/players', methods=['GET'])
+@conditional_get(Player)
 def get_players():
-    # Optional query parameters for filtering
-    team_id = request.args.get('team_id')
-    position = request.args.get('position')
-    injured = request.args.get('injured')
+    try:
+        apply_filters = player_filters(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return list_response(Player, apply_filters, request.args)
+
+def player_filters(args):
+    """The optional ``team_id``/``position``/``injured`` filters as a query transform.
+
+    Shared by the player listing and the player export. Raises ValueError
+    on a team id that is not an integer.
+    """
+    team_id = args.get('team_id')
+    position = args.get('position')
+    injured = args.get('injured')
     
-    # Use SQLAlchemy to query players
-    query = Player.query
+    if team_id is not None:
+        try:
+            team_id = int(team_id)
+        except ValueError:
+            raise ValueError('Invalid Team ID')
     
-    if team_id:
-        query = query.filter(Player.team_id == int(team_id))
-    if position:
-        query = query.filter(Player.position == position)
-    if injured is not None:
-        is_injured = injured.lower() == 'true'
-        query = query.filter(Player.is_injured == is_injured)
+    def apply_filters(query):
+        if team_id is not None:
+            query = query.filter(Player.team_id == team_id)
+        if position:
+            query = query.filter(Player.position == position)
+        if injured is not None:
+            is_injured = injured.lower() == 'true'
+            query = query.filter(Player.is_injured == is_injured)
+        return query
     
-    players = query.all()
-    return jsonify([p.to_dict() for p in players])
+    return apply_filters
 
-@app.route('/api/players/<int:player_id>', methods=['GET'])
+@api.route('/api/players/<int:player_id>', methods=['GET'])
+@conditional_get(Player)
 def get_player(player_id):
     player = Player.query.get(player_id)
     if player:
-        return jsonify(player.to_dict())
+        return json_response(player.to_dict())
     return jsonify({"error": "Player not found"}), 404
 
-@app.route('/api/players', methods=['POST'])
+SIMILAR_DEFAULT_K = 10
+SIMILAR_MAX_K = 100
+
+@api.route('/api/players/<int:player_id>/similar', methods=['GET'])
+@conditional_get(Player)
+def get_similar_players(player_id):
+    """The ``k`` players nearest to a player by position, build, rating, value, salary and age."""
+    try:
+        k = int(request.args.get('k', SIMILAR_DEFAULT_K))
+    except ValueError:
+        return jsonify({'error': 'k must be an integer'}), 400
+    if not 1 <= k <= SIMILAR_MAX_K:
+        return jsonify({'error': f"k must be between 1 and {SIMILAR_MAX_K}"}), 400
+
+    try:
+        ids, distances = similar_players.get(db.session).nearest(player_id, k)
+    except KeyError:
+        return jsonify({"error": "Player not found"}), 404
+    players = {p['id']: p for p in player_dicts(Player.id.in_(ids.tolist()))}
+    # A player deleted since the index was refreshed is left out
+    items = [{**players[i], 'distance': d} for i, d in zip(ids.tolist(), distances.tolist()) if i in players]
+    return json_response({'player_id': player_id, 'features': list(similar.FEATURES), 'items': items})
+
+@api.route('/api/players', methods=['POST'])
 def create_player():
     player_data = request.json
     
@@ -284,16 +608,18 @@ def create_player():
     
     db.session.add(new_player)
     db.session.commit()
+    report_cache.invalidate_teams(new_player.team_id)
     
     return jsonify(new_player.to_dict()), 201
 
-@app.route('/api/players/<int:player_id>', methods=['PUT'])
+@api.route('/api/players/<int:player_id>', methods=['PUT'])
 def update_player(player_id):
     player = Player.query.get(player_id)
     if not player:
         return jsonify({"error": "Player not found"}), 404
     
     player_data = request.json
+    old_team_id = player.team_id
     
     # Convert date strings to date objects
     if player_data.get('date_of_birth'):
@@ -318,186 +644,947 @@ def update_player(player_id):
     player.rating = player_data.get('rating', player.rating)
     
     db.session.commit()
+    report_cache.invalidate_teams(old_team_id, player.team_id)
     
     return jsonify(player.to_dict())
 
-@app.route('/api/players/<int:player_id>', methods=['DELETE'])
+@api.route('/api/players/<int:player_id>', methods=['DELETE'])
 def delete_player(player_id):
     player = Player.query.get(player_id)
     if not player:
         return jsonify({"error": "Player not found"}), 404
     
+    team_id = player.team_id
     db.session.delete(player)
     db.session.commit()
+    report_cache.invalidate_teams(team_id)
     
     return jsonify({"message": "Player deleted successfully"})
 
+# Bulk endpoints: validate a whole batch, then write it in a single transaction
+BULK_MAX_ITEMS = 10000
+SQL_IN_CHUNK = 500
+
+TEAM_FIELDS = ['name','established_year','home_stadium','logo_url','club_colors','country','league','current_season_position','team_value','historical_performance','contact_information','description','wikipedia_link']
+TEAM_DEFAULTS = {'current_season_position': 0, 'team_value': 0, 'historical_performance': '', 'contact_information': '', 'description': '', 'wikipedia_link': ''}
+PLAYER_FIELDS = ['full_name','date_of_birth','nationality','position','jersey_number','height','weight','contract_start','contract_end','salary','player_value','team_id','photo_url','is_injured','injury_details','rating']
+PLAYER_DATE_FIELDS = ('date_of_birth', 'contract_start', 'contract_end')
+
+def chunked(values, size=SQL_IN_CHUNK):
+    values = list(values)
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+def parse_bulk_items(payload):
+    """Accept either a JSON array or an object with an ``items`` array."""
+    items = payload.get('items') if isinstance(payload, dict) else payload
+    if not isinstance(items, list):
+        raise ValueError('Expected a JSON array of items')
+    if len(items) > BULK_MAX_ITEMS:
+        raise ValueError(f"At most {BULK_MAX_ITEMS} items per request")
+    return items
+
+def is_upsert(payload):
+    mode = request.args.get('mode') or (payload.get('mode') if isinstance(payload, dict) else None)
+    return mode == 'upsert'
+
+def team_mapping(data, partial=False):
+    """Validate a team item and return the column mapping for it."""
+    if not isinstance(data, dict):
+        raise ValueError('Item must be an object')
+    if not partial and not data.get('name'):
+        raise ValueError('Team name is required')
+    mapping = {f: data[f] for f in TEAM_FIELDS if f in data}
+    if not partial:
+        for field, default in TEAM_DEFAULTS.items():
+            mapping.setdefault(field, default)
+    return mapping
+
+def player_mapping(data, team_ids, partial=False):
+    """Validate a player item against the known ``team_ids`` and return its column mapping."""
+    if not isinstance(data, dict):
+        raise ValueError('Item must be an object')
+    if not partial and not data.get('full_name'):
+        raise ValueError('Player full_name is required')
+    mapping = {f: data[f] for f in PLAYER_FIELDS if f in data}
+    for field in PLAYER_DATE_FIELDS:
+        if mapping.get(field):
+            try:
+                mapping[field] = date.fromisoformat(str(mapping[field])[:10])
+            except ValueError:
+                raise ValueError(f"Invalid date for {field}: {mapping[field]}")
+    if 'team_id' in mapping and mapping['team_id'] not in team_ids:
+        raise ValueError(f"Team {mapping['team_id']} does not exist")
+    if not partial:
+        mapping.setdefault('is_injured', False)
+    return mapping
+
+def existing_team_ids(ids):
+    found = set()
+    for chunk in chunked({i for i in ids if isinstance(i, int)}):
+        found.update(i for (i,) in db.session.query(Team.id).filter(Team.id.in_(chunk)))
+    return found
+
+def bulk_response(results, counts):
+    """Per-item results plus totals; 207 when only part of the batch was applied."""
+    errors = sum(1 for r in results if r['status'] == 'error')
+    status = 200
+    if errors:
+        status = 400 if errors == len(results) else 207
+    return jsonify({**counts, 'errors': errors, 'results': results}), status
+
+def apply_bulk_writes(model, inserts, updates, results):
+    """Write the validated mappings in one transaction and fill in created ids."""
+    if not inserts and not updates:
+        return
+    if inserts:
+        db.session.bulk_insert_mappings(model, [m for _, m in inserts], return_defaults=True)
+    if updates:
+        db.session.bulk_update_mappings(model, [m for _, m in updates])
+    # Bulk operations skip the flush hooks, so record the write explicitly
+    bump_data_version(db.session, model.__tablename__)
+    db.session.commit()
+    for index, mapping in inserts:
+        results[index].update(status='created', id=mapping['id'])
+    for index, mapping in updates:
+        results[index].update(status='updated', id=mapping['id'])
+
+@api.route('/api/teams/bulk', methods=['POST', 'PUT'])
+def bulk_upsert_teams():
+    payload = request.json
+    try:
+        items = parse_bulk_items(payload)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    by_id = request.method == 'PUT'
+    upsert = is_upsert(payload)
+    results = [{'index': i} for i in range(len(items))]
+
+    existing = {}
+    if by_id:
+        existing = {i: i for i in existing_team_ids(item.get('id') for item in items if isinstance(item, dict))}
+    elif upsert:
+        names = {item.get('name') for item in items if isinstance(item, dict) and isinstance(item.get('name'), str)}
+        for chunk in chunked(names):
+            existing.update(db.session.query(Team.name, Team.id).filter(Team.name.in_(chunk)).all())
+
+    inserts, updates, seen = [], [], set()
+    for index, item in enumerate(items):
+        try:
+            key = item.get('id') if by_id and isinstance(item, dict) else (item.get('name') if isinstance(item, dict) else None)
+            mapping = team_mapping(item, partial=by_id or key in existing)
+            if key in seen:
+                raise ValueError('Duplicate item in batch')
+            seen.add(key)
+            if by_id and key not in existing:
+                raise ValueError('Team not found')
+            if key in existing:
+                mapping['id'] = existing[key]
+                updates.append((index, mapping))
+            else:
+                inserts.append((index, mapping))
+        except (TypeError, ValueError) as e:
+            results[index].update(status='error', error=str(e))
+
+    try:
+        apply_bulk_writes(Team, inserts, updates, results)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f"Bulk write failed: {str(e)}"}), 500
+
+    report_cache.invalidate_teams(*[m['id'] for _, m in inserts + updates])
+    return bulk_response(results, {'created': len(inserts), 'updated': len(updates)})
+
+@api.route('/api/players/bulk', methods=['POST', 'PUT'])
+def bulk_upsert_players():
+    payload = request.json
+    try:
+        items = parse_bulk_items(payload)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    by_id = request.method == 'PUT'
+    upsert = is_upsert(payload)
+    results = [{'index': i} for i in range(len(items))]
+    dicts = [item for item in items if isinstance(item, dict)]
+    team_ids = existing_team_ids(item.get('team_id') for item in dicts)
+
+    # Current team of every player touched, for cache invalidation and key lookup
+    existing = {}
+    old_team_ids = {}
+    if by_id:
+        ids = {item.get('id') for item in dicts if isinstance(item.get('id'), int)}
+        for chunk in chunked(ids):
+            for player_id, team_id in db.session.query(Player.id, Player.team_id).filter(Player.id.in_(chunk)):
+                existing[player_id] = player_id
+                old_team_ids[player_id] = team_id
+    elif upsert:
+        names = {item.get('full_name') for item in dicts if isinstance(item.get('full_name'), str)}
+        for chunk in chunked(names):
+            rows = db.session.query(Player.id, Player.full_name, Player.team_id).filter(Player.full_name.in_(chunk))
+            for player_id, full_name, team_id in rows:
+                existing[(full_name, team_id)] = player_id
+                old_team_ids[player_id] = team_id
+
+    inserts, updates, seen = [], [], set()
+    for index, item in enumerate(items):
+        try:
+            if not isinstance(item, dict):
+                raise ValueError('Item must be an object')
+            key = item.get('id') if by_id else (item.get('full_name'), item.get('team_id'))
+            mapping = player_mapping(item, team_ids, partial=by_id or key in existing)
+            if key in seen:
+                raise ValueError('Duplicate item in batch')
+            seen.add(key)
+            if by_id and key not in existing:
+                raise ValueError('Player not found')
+            if key in existing:
+                mapping['id'] = existing[key]
+                updates.append((index, mapping))
+            else:
+                inserts.append((index, mapping))
+        except (TypeError, ValueError) as e:
+            results[index].update(status='error', error=str(e))
+
+    try:
+        apply_bulk_writes(Player, inserts, updates, results)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f"Bulk write failed: {str(e)}"}), 500
+
+    affected = {m.get('team_id') for _, m in inserts + updates}
+    affected.update(old_team_ids[m['id']] for _, m in updates)
+    report_cache.invalidate_teams(*affected)
+    return bulk_response(results, {'created': len(inserts), 'updated': len(updates)})
+
+def parse_bulk_ids(payload):
+    ids = payload.get('ids') if isinstance(payload, dict) else payload
+    if not isinstance(ids, list) or not all(isinstance(i, int) for i in ids):
+        raise ValueError('Expected a JSON array of integer ids')
+    if len(ids) > BULK_MAX_ITEMS:
+        raise ValueError(f"At most {BULK_MAX_ITEMS} items per request")
+    return ids
+
+@api.route('/api/teams/bulk', methods=['DELETE'])
+def bulk_delete_teams():
+    try:
+        ids = parse_bulk_ids(request.json)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    found = existing_team_ids(ids)
+    try:
+        for chunk in chunked(found):
+            # Mirror the ORM delete-orphan cascade for the bulk path
+            Player.query.filter(Player.team_id.in_(chunk)).delete(synchronize_session=False)
+            Team.query.filter(Team.id.in_(chunk)).delete(synchronize_session=False)
+        bump_data_version(db.session, Team.__tablename__)
+        bump_data_version(db.session, Player.__tablename__)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f"Bulk delete failed: {str(e)}"}), 500
+
+    report_cache.invalidate_teams(*found)
+    results = [{'index': index, 'id': team_id, 'status': 'deleted' if team_id in found else 'error',
+                **({} if team_id in found else {'error': 'Team not found'})}
+               for index, team_id in enumerate(ids)]
+    return bulk_response(results, {'deleted': len(found)})
+
+@api.route('/api/players/bulk', methods=['DELETE'])
+def bulk_delete_players():
+    try:
+        ids = parse_bulk_ids(request.json)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    team_of = {}
+    try:
+        for chunk in chunked(set(ids)):
+            team_of.update(db.session.query(Player.id, Player.team_id).filter(Player.id.in_(chunk)).all())
+            Player.query.filter(Player.id.in_(chunk)).delete(synchronize_session=False)
+        bump_data_version(db.session, Player.__tablename__)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f"Bulk delete failed: {str(e)}"}), 500
+
+    report_cache.invalidate_teams(*set(team_of.values()))
+    results = [{'index': index, 'id': player_id, 'status': 'deleted' if player_id in team_of else 'error',
+                **({} if player_id in team_of else {'error': 'Player not found'})}
+               for index, player_id in enumerate(ids)]
+    return bulk_response(results, {'deleted': len(team_of)})
+
 # Reporting endpoints
-@app.route('/api/reports/team-composition', methods=['GET'])
-def team_composition_report():
+def parse_report_team_id():
+    """Read the ``team_id`` query parameter shared by the report endpoints.
+
+    Returns (team_id, None) on success or (None, error_response).
+    """
     team_id = request.args.get('team_id')
     if not team_id:
-        return jsonify({'error': 'Team ID is required'}), 400
-        
+        return None, (jsonify({'error': 'Team ID is required'}), 400)
     try:
-        team_id = int(team_id)
+        return int(team_id), None
     except ValueError:
-        return jsonify({'error': 'Invalid Team ID'}), 400
-    
-    team = Team.query.get(team_id)
-    if not team:
-        return jsonify({'error': 'Team not found'}), 404
-    
-    players = Player.query.filter(Player.team_id == team_id).all()
-    
-    # Create report data
-    positions = {}
-    nationalities = {}
-    total_rating = 0
-    total_value = 0
-    injured_players = []
-    
-    for p in players:
-        # Count positions
-        position = p.position
-        if position:
-            if position not in positions:
-                positions[position] = 0
-            positions[position] += 1
-        
-        # Count nationalities
-        nationality = p.nationality
-        if nationality:
-            if nationality not in nationalities:
-                nationalities[nationality] = 0
-            nationalities[nationality] += 1
-        
-        # Sum ratings and values
-        total_rating += p.rating or 0
-        total_value += p.player_value or 0
-        
-        # Track injured players
-        if p.is_injured:
-            injured_players.append(p.to_dict())
-    
-    avg_rating = total_rating / len(players) if players else 0
-    
-    report = {
-        'team': team.to_dict(),
-        'total_players': len(players),
-        'positions': positions,
-        'nationalities': nationalities,
+        return None, (jsonify({'error': 'Invalid Team ID'}), 400)
+
+EMPTY_TOTALS = dict.fromkeys(team_stats.TOTAL_COLUMNS, 0)
+
+def team_player_totals(team_id):
+    """Player count, rating/value sums and injured count of a team (see team_stats.py)."""
+    totals = team_stats.team_totals(db.session, team_id)
+    return totals if totals is not None else SimpleNamespace(**EMPTY_TOTALS)
+
+PLAYER_COLUMNS = Player.__table__.columns.keys()
+
+def player_dicts(*criteria, order_by=(Player.id,)):
+    """Players matching ``criteria`` as plain dicts, read as column tuples without ORM objects."""
+    rows = db.session.query(*Player.__table__.columns).filter(*criteria).order_by(*order_by).all()
+    return [dict(zip(PLAYER_COLUMNS, row)) for row in rows]
+
+def team_players_ranked(team_id, column):
+    """A team's players ordered by ``column`` descending, ties by id.
+
+    Ordering on the bare column lets SQLite walk the (team_id, column)
+    index; NULLs sort last.
+    """
+    return player_dicts(Player.team_id == team_id, order_by=(column.desc(), Player.id))
+
+def injured_players_of(team_id):
+    return player_dicts(Player.team_id == team_id, Player.is_injured == True)
+
+# Report payloads from rows fetched beforehand, shared by the single-team and batch endpoints
+def team_composition_payload(team, totals, histograms, injured_players):
+    avg_rating = totals.total_rating / totals.player_count if totals.player_count else 0
+    return {
+        'team': team,
+        'total_players': totals.player_count,
+        'positions': histograms['position'],
+        'nationalities': histograms['nationality'],
         'average_rating': avg_rating,
-        'total_value': total_value,
+        'total_value': totals.total_value,
         'injured_players': injured_players
     }
-    
-    return jsonify(report)
 
-@app.route('/api/reports/player-performance', methods=['GET'])
-def player_performance_report():
-    team_id = request.args.get('team_id')
-    if not team_id:
-        return jsonify({'error': 'Team ID is required'}), 400
-    try:
-        team_id = int(team_id)
-    except ValueError:
-        return jsonify({'error': 'Invalid Team ID'}), 400
+def player_performance_payload(team, totals, sorted_players):
+    if not totals.player_count:
+        return {'team': team, 'players': [], 'highest_rated': None, 'lowest_rated': None, 'average_rating': 0}
+    return {
+        'team': team,
+        'players': sorted_players,
+        'highest_rated': sorted_players[0],
+        'lowest_rated': sorted_players[-1],
+        'average_rating': totals.total_rating / totals.player_count
+    }
 
+def value_payload(team, totals, sorted_players):
+    if not totals.player_count:
+        return {'team': team, 'players': [], 'total_value': 0, 'most_valuable': None, 'least_valuable': None, 'average_value': 0}
+    return {
+        'team': team,
+        'players': sorted_players,
+        'total_value': totals.total_value,
+        'most_valuable': sorted_players[0],
+        'least_valuable': sorted_players[-1],
+        'average_value': totals.total_value / totals.player_count
+    }
+
+def injury_payload(team, totals, injured_players):
+    injury_rate = (len(injured_players) / totals.player_count * 100) if totals.player_count else 0
+    return {
+        'team': team,
+        'total_players': totals.player_count,
+        'injured_players': injured_players,
+        'injury_rate': injury_rate
+    }
+
+# Report builders return the report payload, or None when the team does not exist
+def build_team_composition_report(team_id):
     team = Team.query.get(team_id)
     if not team:
-        return jsonify({'error': 'Team not found'}), 404
+        return None
+    return team_composition_payload(team.to_dict(), team_player_totals(team_id),
+                                    team_stats.team_histograms(db.session, team_id), injured_players_of(team_id))
+
+def build_player_performance_report(team_id):
+    team = Team.query.get(team_id)
+    if not team:
+        return None
+    totals = team_player_totals(team_id)
+    sorted_players = team_players_ranked(team_id, Player.rating) if totals.player_count else []
+    return player_performance_payload(team.to_dict(), totals, sorted_players)
 
-    players = Player.query.filter(Player.team_id == team_id).all()
-    if not players:
-        return jsonify({'team': team.to_dict(), 'players': [], 'highest_rated': None, 'lowest_rated': None, 'average_rating': 0}), 200
+def build_value_report(team_id):
+    team = Team.query.get(team_id)
+    if not team:
+        return None
+    totals = team_player_totals(team_id)
+    sorted_players = team_players_ranked(team_id, Player.player_value) if totals.player_count else []
+    return value_payload(team.to_dict(), totals, sorted_players)
 
-    sorted_players = sorted(players, key=lambda p: (p.rating or 0), reverse=True)
-    total_rating = sum([(p.rating or 0) for p in players])
-    avg_rating = total_rating / len(players) if players else 0
+def build_injury_report(team_id):
+    team = Team.query.get(team_id)
+    if not team:
+        return None
+    return injury_payload(team.to_dict(), team_player_totals(team_id), injured_players_of(team_id))
 
-    report = {
-        'team': team.to_dict(),
-        'players': [p.to_dict() for p in sorted_players],
-        'highest_rated': sorted_players[0].to_dict(),
-        'lowest_rated': sorted_players[-1].to_dict(),
-        'average_rating': avg_rating
-    }
-    return jsonify(report)
+def team_report_response(report_type, build):
+    """Serve a single-team report from the cache, building it on a miss."""
+    team_id, error = parse_report_team_id()
+    if error:
+        return error
 
-@app.route('/api/reports/value-report', methods=['GET'])
+    key = ReportCache.make_key(report_type, team_id)
+    token = report_cache.token()
+    report = report_cache.get(key)
+    if report is None:
+        report = build(team_id)
+        if report is None:
+            return jsonify({'error': 'Team not found'}), 404
+        report_cache.set(key, report, token)
+    return json_response(report)
+
+@api.route('/api/reports/team-composition', methods=['GET'])
+@conditional_get(Team, Player)
+def team_composition_report():
+    return team_report_response('team-composition', build_team_composition_report)
+
+@api.route('/api/reports/player-performance', methods=['GET'])
+@conditional_get(Team, Player)
+def player_performance_report():
+    return team_report_response('player-performance', build_player_performance_report)
+
+@api.route('/api/reports/value-report', methods=['GET'])
+@conditional_get(Team, Player)
 def value_report():
-    team_id = request.args.get('team_id')
-    if not team_id:
-        return jsonify({'error': 'Team ID is required'}), 400
+    return team_report_response('value-report', build_value_report)
+
+@api.route('/api/reports/injury-report', methods=['GET'])
+@conditional_get(Team, Player)
+def injury_report():
+    return team_report_response('injury-report', build_injury_report)
+
+# Several report types for several teams from one fetch per kind of data
+REPORT_TYPES = ('team-composition', 'player-performance', 'value-report', 'injury-report')
+REPORT_BATCH_MAX_TEAMS = 100
+
+def parse_report_batch_args(args):
+    """(team_ids, report_types) from comma-separated query parameters; raises ValueError."""
+    if not args.get('team_ids'):
+        raise ValueError('team_ids is required')
     try:
-        team_id = int(team_id)
+        team_ids = list(dict.fromkeys(int(t) for t in args['team_ids'].split(',') if t.strip()))
     except ValueError:
-        return jsonify({'error': 'Invalid Team ID'}), 400
+        raise ValueError('team_ids must be comma-separated integers')
+    if not 1 <= len(team_ids) <= REPORT_BATCH_MAX_TEAMS:
+        raise ValueError(f"team_ids must list between 1 and {REPORT_BATCH_MAX_TEAMS} teams")
+    report_types = list(dict.fromkeys(t.strip() for t in args.get('types', '').split(',') if t.strip()))
+    unknown = [t for t in report_types if t not in REPORT_TYPES]
+    if unknown:
+        raise ValueError(f"Unknown report types: {', '.join(unknown)}; expected {', '.join(REPORT_TYPES)}")
+    return team_ids, report_types or list(REPORT_TYPES)
 
-    team = Team.query.get(team_id)
-    if not team:
+def ranked(players, column):
+    """``players`` ordered like ``team_players_ranked``: ``column`` descending, NULLs last, ties by id."""
+    return sorted(players, key=lambda p: (p[column] is None, -(p[column] or 0), p['id']))
+
+def build_report_batch(team_ids, report_types):
+    """``{team_id: {report_type: payload}}`` for the existing teams among ``team_ids``.
+
+    The teams, their totals, their histograms and their players are each
+    read once for the whole set, instead of once per team and report.
+    """
+    teams = {team.id: team.to_dict() for team in Team.query.filter(Team.id.in_(team_ids))}
+    if not teams:
+        return {}
+    ids = sorted(teams)
+    totals = team_stats.totals_of_teams(db.session, ids)
+    histograms = team_stats.histograms_of_teams(db.session, ids) if 'team-composition' in report_types else {}
+    # The rankings need every player; the other reports only the injured ones
+    criteria = [Player.team_id.in_(ids)]
+    if not {'player-performance', 'value-report'} & set(report_types):
+        criteria.append(Player.is_injured == True)
+    players = {team_id: [] for team_id in ids}
+    for player in player_dicts(*criteria):
+        players[player['team_id']].append(player)
+
+    reports = {}
+    for team_id in ids:
+        team, roster = teams[team_id], players[team_id]
+        team_totals = totals.get(team_id) or SimpleNamespace(**EMPTY_TOTALS)
+        injured = [p for p in roster if p['is_injured']]
+        payloads = {}
+        for report_type in report_types:
+            if report_type == 'team-composition':
+                payloads[report_type] = team_composition_payload(team, team_totals, histograms[team_id], injured)
+            elif report_type == 'player-performance':
+                payloads[report_type] = player_performance_payload(team, team_totals, ranked(roster, 'rating'))
+            elif report_type == 'value-report':
+                payloads[report_type] = value_payload(team, team_totals, ranked(roster, 'player_value'))
+            else:
+                payloads[report_type] = injury_payload(team, team_totals, injured)
+        reports[team_id] = payloads
+    return reports
+
+@api.route('/api/reports/batch', methods=['GET'])
+@conditional_get(Team, Player)
+def report_batch():
+    """Any combination of the four team reports for many teams in one response."""
+    try:
+        team_ids, report_types = parse_report_batch_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # Entries are shared with the single-team endpoints; only the misses are built
+    reports = {team_id: {} for team_id in team_ids}
+    token = report_cache.token()
+    missing = set()
+    for team_id in team_ids:
+        for report_type in report_types:
+            report = report_cache.get(ReportCache.make_key(report_type, team_id))
+            if report is None:
+                missing.add((team_id, report_type))
+            else:
+                reports[team_id][report_type] = report
+    if missing:
+        missing_types = [t for t in report_types if any(r == t for _, r in missing)]
+        built = build_report_batch(sorted({team_id for team_id, _ in missing}), missing_types)
+        for team_id, report_type in missing:
+            report = built.get(team_id, {}).get(report_type)
+            if report is not None:
+                report_cache.set(ReportCache.make_key(report_type, team_id), report, token)
+                reports[team_id][report_type] = report
+
+    found = [team_id for team_id in team_ids if len(reports[team_id]) == len(report_types)]
+    return json_response({
+        'types': report_types,
+        'reports': {str(team_id): {t: reports[team_id][t] for t in report_types} for team_id in found},
+        'not_found': [team_id for team_id in team_ids if team_id not in found]
+    })
+
+@api.route('/api/reports/cache-stats', methods=['GET'])
+def report_cache_stats():
+    return jsonify(report_cache.stats())
+
+# League-wide reports: every team aggregated in a fixed number of grouped queries
+def filter_teams(query, league=None, country=None):
+    if league:
+        query = query.filter(Team.league == league)
+    if country:
+        query = query.filter(Team.country == country)
+    return query
+
+def all_team_stats(league=None, country=None):
+    """Composition, value, rating and injury figures for every team, keyed by team id.
+
+    Reads the maintained aggregates (see team_stats.py): one query for the
+    totals and one for the histograms, however many teams match the
+    optional ``league``/``country`` filters.
+    """
+    stats = {}
+    for row in team_stats.all_team_totals(db.session, league, country):
+        count = row.player_count
+        stats[row.id] = {
+            'team': {'id': row.id, 'name': row.name, 'country': row.country, 'league': row.league},
+            'total_players': count,
+            'positions': {},
+            'nationalities': {},
+            'average_rating': row.total_rating / count if count else 0,
+            'total_value': row.total_value,
+            'average_value': row.total_value / count if count else 0,
+            'injured_players': row.injured_count,
+            'injury_rate': row.injured_count / count * 100 if count else 0
+        }
+
+    keys = {'position': 'positions', 'nationality': 'nationalities'}
+    for team_id, kind, value, count in team_stats.all_team_histograms(db.session, league, country):
+        if team_id in stats:
+            stats[team_id][keys[kind]][value] = count
+
+    return stats
+
+@api.route('/api/reports/all-teams', methods=['GET'])
+@conditional_get(Team, Player)
+def all_teams_report():
+    league = request.args.get('league')
+    country = request.args.get('country')
+    key = ReportCache.make_key('all-teams', None, league, country)
+    return json_response(report_cache.get_or_compute(key, lambda: {'teams': all_team_stats(league, country)}))
+
+@api.route('/api/reports/league-summary', methods=['GET'])
+@conditional_get(Team, Player)
+def league_summary_report():
+    league = request.args.get('league')
+    country = request.args.get('country')
+    key = ReportCache.make_key('league-summary', None, league, country)
+    return json_response(report_cache.get_or_compute(key, lambda: build_league_summary(league, country)))
+
+def build_league_summary(league=None, country=None):
+    stats = all_team_stats(league, country)
+
+    leagues = {}
+    for team_id, team_summary in stats.items():
+        team_league = team_summary['team']['league'] or 'Unknown'
+        summary = leagues.setdefault(team_league, {
+            'team_count': 0, 'total_players': 0, 'total_value': 0, 'total_rating': 0,
+            'injured_players': 0, 'positions': {}, 'teams': {}
+        })
+        summary['team_count'] += 1
+        summary['total_players'] += team_summary['total_players']
+        summary['total_value'] += team_summary['total_value']
+        summary['injured_players'] += team_summary['injured_players']
+        summary['total_rating'] += team_summary['average_rating'] * team_summary['total_players']
+        for position, count in team_summary['positions'].items():
+            summary['positions'][position] = summary['positions'].get(position, 0) + count
+        summary['teams'][team_id] = team_summary
+
+    for summary in leagues.values():
+        count = summary['total_players']
+        total_rating = summary.pop('total_rating')
+        summary['average_rating'] = total_rating / count if count else 0
+        summary['average_value'] = summary['total_value'] / count if count else 0
+        summary['injury_rate'] = summary['injured_players'] / count * 100 if count else 0
+
+    return {'leagues': leagues}
+
+# CSV and Arrow exports (see export.py)
+def export_format():
+    """Return (format, None) from the ``format`` parameter, or (None, error_response)."""
+    fmt = request.args.get('format', 'csv')
+    if fmt not in export.FORMATS:
+        return None, (jsonify({'error': f"format must be one of {', '.join(export.FORMATS)}"}), 400)
+    if fmt == 'arrow' and not export.arrow_available():
+        return None, (jsonify({'error': 'Arrow export needs pyarrow installed on the server'}), 501)
+    return fmt, None
+
+def export_response(fmt, columns, rows, filename):
+    """Stream ``rows`` as a download, reading and encoding one chunk at a time."""
+    body = export.encode(fmt, columns, rows, STREAM_CHUNK_ROWS)
+    response = Response(stream_with_context(body), mimetype=export.FORMATS[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}.{fmt}"'
+    return response
+
+def player_export_columns(names=None):
+    columns = Player.__table__.columns
+    return [(name, export.column_kind(columns[name])) for name in names or PLAYER_COLUMNS]
+
+@api.route('/api/export/players', methods=['GET'])
+@conditional_get(Player)
+def export_players():
+    fmt, error = export_format()
+    if error:
+        return error
+    try:
+        apply_filters = player_filters(request.args)
+        fields = parse_fields(Player, request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    columns = player_export_columns(fields)
+    query = apply_filters(db.session.query(*[getattr(Player, name) for name, _ in columns])).order_by(Player.id)
+    return export_response(fmt, columns, query.yield_per(STREAM_CHUNK_ROWS), 'players')
+
+TEAM_EXPORT_COLUMNS = [
+    ('team_id', 'int'), ('name', 'str'), ('country', 'str'), ('league', 'str'),
+    ('total_players', 'int'), ('injured_players', 'int'), ('injury_rate', 'float'),
+    ('average_rating', 'float'), ('total_value', 'float'), ('average_value', 'float'),
+]
+
+def team_export_rows(league=None, country=None):
+    for row in team_stats.all_team_totals(db.session, league, country):
+        count = row.player_count
+        yield (row.id, row.name, row.country, row.league, count, row.injured_count,
+               row.injured_count / count * 100 if count else 0,
+               row.total_rating / count if count else 0,
+               row.total_value, row.total_value / count if count else 0)
+
+# Per-team exports: the rows of the report's player table, in the report's order
+TEAM_REPORT_EXPORTS = {
+    'player-performance': lambda team_id: (Player.team_id == team_id, (Player.rating.desc(), Player.id)),
+    'value-report': lambda team_id: (Player.team_id == team_id, (Player.player_value.desc(), Player.id)),
+    'injury-report': lambda team_id: (and_(Player.team_id == team_id, Player.is_injured == True), (Player.id,)),
+}
+EXPORT_REPORT_TYPES = ('team-composition', *TEAM_REPORT_EXPORTS, 'all-teams')
+
+@api.route('/api/export/reports/<report_type>', methods=['GET'])
+@conditional_get(Team, Player)
+def export_report(report_type):
+    if report_type not in EXPORT_REPORT_TYPES:
+        return jsonify({'error': f"report type must be one of {', '.join(EXPORT_REPORT_TYPES)}"}), 404
+    fmt, error = export_format()
+    if error:
+        return error
+
+    if report_type == 'all-teams':
+        league = request.args.get('league')
+        country = request.args.get('country')
+        return export_response(fmt, TEAM_EXPORT_COLUMNS, team_export_rows(league, country), 'all-teams')
+
+    team_id, error = parse_report_team_id()
+    if error:
+        return error
+    if db.session.query(Team.id).filter(Team.id == team_id).first() is None:
         return jsonify({'error': 'Team not found'}), 404
+    filename = f"{report_type}-team-{team_id}"
 
-    players = Player.query.filter(Player.team_id == team_id).all()
-    if not players:
-        return jsonify({'team': team.to_dict(), 'players': [], 'total_value': 0, 'most_valuable': None, 'least_valuable': None, 'average_value': 0}), 200
-
-    sorted_players = sorted(players, key=lambda p: (p.player_value or 0), reverse=True)
-    total_value = sum([(p.player_value or 0) for p in players])
-    avg_value = total_value / len(players) if players else 0
-
-    report = {
-        'team': team.to_dict(),
-        'players': [p.to_dict() for p in sorted_players],
-        'total_value': total_value,
-        'most_valuable': sorted_players[0].to_dict(),
-        'least_valuable': sorted_players[-1].to_dict(),
-        'average_value': avg_value
-    }
-    return jsonify(report)
+    if report_type == 'team-composition':
+        columns = [('breakdown', 'str'), ('value', 'str'), ('players', 'int')]
+        histograms = team_stats.team_histograms(db.session, team_id)
+        rows = [(kind, value, count) for kind, counts in histograms.items() for value, count in counts.items()]
+        return export_response(fmt, columns, rows, filename)
 
-@app.route('/api/reports/injury-report', methods=['GET'])
-def injury_report():
-    team_id = request.args.get('team_id')
-    if not team_id:
-        return jsonify({'error': 'Team ID is required'}), 400
+    criterion, order_by = TEAM_REPORT_EXPORTS[report_type](team_id)
+    columns = player_export_columns()
+    query = db.session.query(*Player.__table__.columns).filter(criterion).order_by(*order_by)
+    return export_response(fmt, columns, query.yield_per(STREAM_CHUNK_ROWS), filename)
+
+# Change feed for delta sync (see change_log.py)
+CHANGES_DEFAULT_LIMIT = 500
+
+@api.route('/api/changes', methods=['GET'])
+def get_changes():
+    """Rows changed after the ``since`` cursor, latest state first seen last.
+
+    Without ``since`` only the current cursor is returned, for clients
+    about to fetch the full lists.
+    """
+    if request.args.get('since') is None:
+        return json_response({'changes': [], 'next_since': change_log.head(db.session), 'has_more': False})
     try:
-        team_id = int(team_id)
+        since = int(request.args['since'])
+        limit = int(request.args.get('limit', CHANGES_DEFAULT_LIMIT))
     except ValueError:
-        return jsonify({'error': 'Invalid Team ID'}), 400
+        return jsonify({'error': 'since and limit must be integers'}), 400
+    if since < 0 or not 1 <= limit <= MAX_PAGE_LIMIT:
+        return jsonify({'error': f"since must not be negative and limit must be between 1 and {MAX_PAGE_LIMIT}"}), 400
 
-    team = Team.query.get(team_id)
-    if not team:
-        return jsonify({'error': 'Team not found'}), 404
+    try:
+        entries, has_more = change_log.read_changes(db.session, since, limit)
+    except change_log.CursorExpired:
+        return jsonify({'error': 'Changes after this cursor were pruned; fetch the lists again'}), 410
 
-    players = Player.query.filter(Player.team_id == team_id).all()
-    injured_players = [p for p in players if p.is_injured]
-    injury_rate = (len(injured_players) / len(players) * 100) if players else 0
+    # Current rows of everything not deleted, one query per table
+    models = {Team.__tablename__: Team, Player.__tablename__: Player}
+    current = {}
+    for table_name, model in models.items():
+        ids = [e.row_id for e in entries if e.table_name == table_name and e.op != 'delete']
+        if ids:
+            names = model.__table__.columns.keys()
+            rows = db.session.query(*model.__table__.columns).filter(model.id.in_(ids)).all()
+            current[table_name] = {row.id: dict(zip(names, row)) for row in rows}
 
-    report = {
-        'team': team.to_dict(),
-        'total_players': len(players),
-        'injured_players': [p.to_dict() for p in injured_players],
-        'injury_rate': injury_rate
+    changes = []
+    for entry in entries:
+        data = current.get(entry.table_name, {}).get(entry.row_id)
+        # A row deleted after the log was read has its delete entry further on
+        if entry.op == 'delete' or data is None:
+            changes.append({'seq': entry.seq, 'table': entry.table_name, 'id': entry.row_id, 'op': 'delete'})
+        else:
+            changes.append({'seq': entry.seq, 'table': entry.table_name, 'id': entry.row_id, 'op': 'upsert',
+                            'data': data})
+    next_since = entries[-1].seq if entries else since
+    return json_response({'changes': changes, 'next_since': next_since, 'has_more': has_more})
+
+# Full-text search (see search.py)
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+
+@api.route('/api/search', methods=['GET'])
+@conditional_get(Team, Player)
+def search():
+    match = search_index.build_match_query(request.args.get('q'))
+    if match is None:
+        return jsonify({'error': 'Query parameter q is required'}), 400
+
+    search_type = request.args.get('type', 'all')
+    if search_type not in ('all', 'players', 'teams'):
+        return jsonify({'error': 'type must be one of all, players, teams'}), 400
+
+    try:
+        limit = int(request.args.get('limit', SEARCH_DEFAULT_LIMIT))
+        offset = int(request.args.get('offset', 0))
+        team_id = int(request.args['team_id']) if request.args.get('team_id') else None
+    except ValueError:
+        return jsonify({'error': 'limit, offset and team_id must be integers'}), 400
+    if not 1 <= limit <= SEARCH_MAX_LIMIT or offset < 0:
+        return jsonify({'error': f"limit must be between 1 and {SEARCH_MAX_LIMIT}"}), 400
+
+    injured = request.args.get('injured')
+    if injured is not None:
+        injured = injured.lower() == 'true'
+
+    result = {'query': request.args.get('q')}
+    if search_type in ('all', 'players'):
+        items, next_offset = search_index.search_players(
+            db.session, match, limit, offset, team_id, request.args.get('position'), injured)
+        result['players'] = {'items': items, 'next_offset': next_offset}
+    if search_type in ('all', 'teams'):
+        items, next_offset = search_index.search_teams(db.session, match, limit, offset)
+        result['teams'] = {'items': items, 'next_offset': next_offset}
+    return json_response(result)
+
+# Dashboard statistics
+VALUE_PERCENTILES = (25, 50, 75, 90)
+
+def value_percentiles(valued_count):
+    """Nearest-rank percentiles of the player values in one walk of idx_players_value.
+
+    OFFSET steps through k index entries, so probing every percentile from
+    the start would walk the index once per percentile. Each probe here
+    starts after the value found by the previous one instead; ``ties``
+    counts the rows sharing that value further along, so that the next
+    offset is relative to the first larger value.
+    """
+    other = aliased(Player)
+    ties = db.session.query(func.count(other.id)) \
+        .filter(other.player_value == Player.player_value, other.id > Player.id).scalar_subquery()
+    probe = db.session.query(Player.player_value, ties).order_by(Player.player_value, Player.id)
+
+    percentiles = {}
+    value, seen = None, 0  # ``seen``: rows with a value up to ``value``
+    for p in VALUE_PERCENTILES:
+        rank = max(math.ceil(p / 100 * valued_count), 1)
+        if rank > seen:
+            after = Player.player_value.isnot(None) if value is None else Player.player_value > value
+            value, tied = probe.filter(after).offset(rank - seen - 1).limit(1).one()
+            seen = rank + tied
+        percentiles[f"p{p}"] = value
+    return percentiles
+
+def build_stats_summary():
+    """Headline figures for the dashboard without transferring any table rows."""
+    totals = db.session.query(
+        db.session.query(func.count(Team.id)).scalar_subquery().label('team_count'),
+        func.count(Player.id).label('player_count'),
+        func.coalesce(func.sum(case((Player.is_injured == True, 1), else_=0)), 0).label('injured_count'),
+        func.coalesce(func.sum(func.coalesce(Player.player_value, 0)), 0).label('total_value'),
+        func.count(Player.player_value).label('valued_count'),
+        func.avg(Player.rating).label('average_rating'),
+    ).one()
+
+    percentiles = {f"p{p}": None for p in VALUE_PERCENTILES}
+    if totals.valued_count:
+        percentiles.update(value_percentiles(totals.valued_count))
+
+    leagues = {}
+    for league, team_count, player_count, injured_count in team_stats.league_totals(db.session):
+        leagues[league or 'Unknown'] = {
+            'teams': team_count,
+            'players': player_count,
+            'injured_players': injured_count
+        }
+
+    player_count = totals.player_count
+    return {
+        'total_teams': totals.team_count,
+        'total_players': player_count,
+        'injured_players': totals.injured_count,
+        'total_player_value': totals.total_value,
+        'average_player_value': totals.total_value / player_count if player_count else 0,
+        'average_rating': totals.average_rating or 0,
+        'value_percentiles': percentiles,
+        'leagues': leagues
+    }
+
+@api.route('/api/stats/summary', methods=['GET'])
+@conditional_get(Team, Player)
+def stats_summary():
+    key = ReportCache.make_key('stats-summary', None)
+    return json_response(report_cache.get_or_compute(key, build_stats_summary))
+
+# League-wide analytics over in-memory column arrays (see analytics.py)
+ANALYTICS_MAX_BINS = 200
+
+def analytics_args(args):
+    """The metric and player filters shared by the analytics endpoints; raises ValueError."""
+    metric = args.get('metric', 'player_value')
+    if metric not in analytics.METRICS:
+        raise ValueError(f"metric must be one of {', '.join(analytics.METRICS)}")
+    try:
+        team_id = int(args['team_id']) if args.get('team_id') else None
+    except ValueError:
+        raise ValueError('Invalid Team ID')
+    filters = {
+        'league': args.get('league') or None,
+        'country': args.get('country') or None,
+        'team_id': team_id,
+        'position': args.get('position') or None,
     }
-    return jsonify(report)
+    return metric, filters
+
+def analytics_selection(args):
+    """(metric name, values of the selected players, frame, mask) for a request."""
+    metric, filters = analytics_args(args)
+    frame = analytics_frames.get(db.session)
+    mask = frame.mask(**filters)
+    return metric, frame.metric(metric)[mask], frame, mask
+
+@api.route('/api/analytics/distribution', methods=['GET'])
+@conditional_get(Team, Player)
+def analytics_distribution():
+    """Summary statistics, percentiles and a histogram of one metric."""
+    try:
+        metric, values, _, _ = analytics_selection(request.args)
+        bins = int(request.args.get('bins', 20))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if not 1 <= bins <= ANALYTICS_MAX_BINS:
+        return jsonify({'error': f"bins must be between 1 and {ANALYTICS_MAX_BINS}"}), 400
+    return json_response({
+        'metric': metric,
+        'summary': analytics.describe(values),
+        'histogram': analytics.histogram(values, bins),
+    })
+
+@api.route('/api/analytics/groups', methods=['GET'])
+@conditional_get(Team, Player)
+def analytics_groups():
+    """Per-group statistics of one metric, grouped by position, league, country or team."""
+    group_by = request.args.get('by', 'league')
+    if group_by not in analytics.GROUPINGS:
+        return jsonify({'error': f"by must be one of {', '.join(analytics.GROUPINGS)}"}), 400
+    try:
+        metric, values, frame, mask = analytics_selection(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    codes, names = frame.groups(group_by)
+    return json_response({
+        'metric': metric,
+        'by': group_by,
+        'groups': analytics.grouped(codes[mask], values, [name or 'Unknown' for name in names]),
+    })
+
+@api.route('/api/analytics/age-curve', methods=['GET'])
+@conditional_get(Team, Player)
+def analytics_age_curve():
+    """Count, mean and median of one metric per year of age."""
+    try:
+        metric, values, frame, mask = analytics_selection(
+            {'metric': 'rating', **request.args.to_dict()})
+        min_age = int(request.args.get('min_age', 15))
+        max_age = int(request.args.get('max_age', 45))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if metric == 'age' or not 0 <= min_age <= max_age <= 100:
+        return jsonify({'error': 'metric must not be age and 0 <= min_age <= max_age <= 100'}), 400
+    ages = frame.metric('age')[mask]
+    curve = analytics.age_curve(ages, values, min_age, max_age)
+    return json_response({
+        'metric': metric,
+        'ages': [{'age': age, **stats} for age, stats in curve.items()],
+    })
 
 if __name__ == '__main__':
-    # Create data directory if it doesn't exist
+    # Development server; see wsgi.py and gunicorn.conf.py for production serving
     os.makedirs('data', exist_ok=True)
-    
-    # Ensure the instance directory exists
     os.makedirs('instance', exist_ok=True)
-    
-    # Create tables if they don't exist
-    with app.app_context():
-        db.create_all()
-        print("Database tables created or verified")
-        
-        # Load initial data
-        load_data()
-    
+
+    app = create_app()
+    print(f"SQLAlchemy connecting to: {app.config['SQLALCHEMY_DATABASE_URI']}")
+    prepare_database(app)
+
     # Start the server
     print("Starting Flask server on http://localhost:5000")
     app.run(debug=True, port=5000)
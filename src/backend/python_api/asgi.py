@@ -0,0 +1,176 @@
+"""ASGI entry point: serve the API from an event loop.
+
+    uvicorn asgi:app --workers 2
+    gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker asgi:app
+
+The event loop owns the client connections, so idle keep-alive and polling
+connections cost no thread. Each request is handed to a bounded thread
+pool that runs the same Flask views (routing, ETags, report cache,
+metrics) and streams the body back to the loop chunk by chunk; responses
+are therefore byte-for-byte those of the WSGI app.
+
+The pool size comes from ASGI_THREADS and defaults to the SQLite pool size
+plus overflow, so a request never waits on the connection pool after it
+got a thread. Run under uvicorn directly, the lifespan startup creates
+missing tables and the search index like gunicorn.conf.py does; under
+gunicorn the master already did, and ASGI_PREPARE_DB defaults to off.
+With several workers each process has its own report cache; every
+versioned GET drops the reports older than the data versions it read, so
+writes served by another worker are seen (see conditional_get in app.py).
+"""
+
+import asyncio
+import io
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from app import create_app, dispose_engines, prepare_database
+
+
+class AsgiApp:
+    """Adapt a WSGI app to ASGI, running every request on a worker thread."""
+
+    def __init__(self, wsgi_app, max_threads, on_startup=None, on_shutdown=None, flask_app=None):
+        self.wsgi_app = wsgi_app
+        # The Flask app behind ``wsgi_app``, for hooks that need its context
+        self.flask_app = flask_app
+        self.max_threads = max_threads
+        self.on_startup = on_startup
+        self.on_shutdown = on_shutdown
+        self._executor = None
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.max_threads, thread_name_prefix='asgi')
+        return self._executor
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http':
+            await self.handle_http(scope, receive, send)
+        elif scope['type'] == 'lifespan':
+            await self.handle_lifespan(receive, send)
+
+    async def handle_lifespan(self, receive, send):
+        loop = asyncio.get_running_loop()
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                if self.on_startup:
+                    await loop.run_in_executor(self.executor, self.on_startup)
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self._executor is not None:
+                    self._executor.shutdown(wait=True)
+                    self._executor = None
+                if self.on_shutdown:
+                    self.on_shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def handle_http(self, scope, receive, send):
+        body = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+            body.append(message.get('body', b''))
+            more_body = message.get('more_body', False)
+
+        loop = asyncio.get_running_loop()
+        environ = build_environ(scope, b''.join(body))
+        await loop.run_in_executor(self.executor, self.run_wsgi, environ, loop, send)
+
+    def run_wsgi(self, environ, loop, send):
+        """Call the WSGI app and forward its response; runs on a pool thread.
+
+        The whole request, including iterating a streamed body, stays on one
+        thread so Flask's request context is pushed and popped where it
+        lives. Each chunk waits for the loop to accept it, which keeps a
+        slow client from buffering the whole body in memory.
+        """
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                                   for name, value in headers]
+
+        def forward(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        iterable = self.wsgi_app(environ, start_response)
+        try:
+            started = False
+            for chunk in iterable:
+                if not chunk:
+                    continue
+                if not started:
+                    forward({'type': 'http.response.start', 'status': response['status'],
+                             'headers': response['headers']})
+                    started = True
+                forward({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            if not started:
+                forward({'type': 'http.response.start', 'status': response['status'],
+                         'headers': response['headers']})
+            forward({'type': 'http.response.body', 'body': b''})
+        finally:
+            if hasattr(iterable, 'close'):
+                iterable.close()
+
+
+def build_environ(scope, body):
+    """Translate an ASGI HTTP scope into a WSGI environ (PEP 3333)."""
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope['http_version']}",
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+        environ['REMOTE_PORT'] = str(scope['client'][1])
+    for raw_name, raw_value in scope['headers']:
+        name = raw_name.decode('latin-1').upper().replace('-', '_')
+        value = raw_value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+            continue
+        if name == 'CONTENT_LENGTH':
+            continue
+        key = f"HTTP_{name}"
+        # Repeated headers are folded into one comma-separated value
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def create_asgi_app(flask_app, max_threads=None, prepare=True):
+    """Wrap ``flask_app``; ``prepare`` creates missing tables at lifespan startup."""
+    if max_threads is None:
+        max_threads = flask_app.config['SQLITE_POOL_SIZE'] + flask_app.config['SQLITE_MAX_OVERFLOW']
+
+    def startup():
+        os.makedirs('instance', exist_ok=True)
+        prepare_database(flask_app)
+
+    return AsgiApp(flask_app, max_threads, on_startup=startup if prepare else None,
+                   on_shutdown=lambda: dispose_engines(flask_app), flask_app=flask_app)
+
+
+max_threads = os.environ.get('ASGI_THREADS')
+app = create_asgi_app(create_app(), int(max_threads) if max_threads else None,
+                      prepare=os.environ.get('ASGI_PREPARE_DB', '1') == '1')
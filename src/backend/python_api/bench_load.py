@@ -0,0 +1,387 @@
+#!/usr/bin/env python
+"""
+HTTP load test for the API against a generated league.
+
+Starts the app in a subprocess on a free local port: the Flask development
+server, gunicorn with --workers, or the ASGI app under uvicorn with --asgi.
+The app is pointed at a dataset built by generate_league.py, or at an
+existing file via --database.
+Each scenario is driven by --concurrency client threads for --duration
+seconds after a warm-up. The scenarios cover:
+- list and detail endpoints
+- the four team reports
+- a create/update/delete cycle
+
+The script prints p50/p95/p99 latency and throughput per request type,
+plus the server's peak RSS. Results are written as JSON. Pass --compare
+with an earlier result file to diff the runs; --max-regression turns the
+diff into a failing exit code.
+
+Usage:
+    python bench_load.py [--teams 200] [--players 10000] [--concurrency 8] [--duration 10]
+    python bench_load.py --scenarios list-players,team-composition --no-report-cache
+    python bench_load.py --workers 4 --threads 4
+    python bench_load.py --asgi --concurrency 64
+    python bench_load.py --compare bench-results/load-baseline.json --max-regression 15
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import generate_league
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_TEAMS = 200
+DEFAULT_PLAYERS = 10000
+DEFAULT_CONCURRENCY = 8
+DEFAULT_DURATION = 10.0
+DEFAULT_WARMUP = 2.0
+PERCENTILES = (50, 95, 99)
+SERVER_START_TIMEOUT = 30
+
+SERVER_CODE = """
+import logging, sys
+from app import create_app
+logging.getLogger('werkzeug').setLevel(logging.ERROR)
+create_app().run(host='127.0.0.1', port=int(sys.argv[1]), threaded=True)
+"""
+
+
+class Client:
+    """Per-thread HTTP session that records the latency of every request by label."""
+
+    def __init__(self, base_url, rng, dataset, concurrency):
+        self.base_url = base_url
+        self.rng = rng
+        self.dataset = dataset
+        self.session = requests.Session()
+        self.session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=concurrency))
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def request(self, label, method, path, expect=200, **kwargs):
+        start = time.perf_counter()
+        try:
+            resp = self.session.request(method, self.base_url + path, timeout=30, **kwargs)
+            resp.content
+        except requests.RequestException:
+            self.errors[label] += 1
+            return None
+        self.latencies[label].append(time.perf_counter() - start)
+        if resp.status_code != expect:
+            self.errors[label] += 1
+        return resp
+
+    def team_id(self):
+        return self.rng.randint(1, self.dataset['teams'])
+
+    def player_id(self):
+        return self.rng.randint(1, self.dataset['players'])
+
+
+def list_players(client):
+    after = client.rng.randint(0, max(client.dataset['players'] - 100, 0))
+    client.request('list-players', 'GET', f"/players?limit=100&after={after}")
+
+
+def list_team_players(client):
+    client.request('list-team-players', 'GET', f"/players?team_id={client.team_id()}")
+
+
+def list_teams(client):
+    client.request('list-teams', 'GET', '/teams?limit=100')
+
+
+def player_detail(client):
+    client.request('player-detail', 'GET', f"/players/{client.player_id()}")
+
+
+def team_detail(client):
+    client.request('team-detail', 'GET', f"/teams/{client.team_id()}")
+
+
+def report(report_type):
+    def run(client):
+        client.request(report_type, 'GET', f"/reports/{report_type}?team_id={client.team_id()}")
+    return run
+
+
+def crud_player(client):
+    team_id = client.team_id()
+    resp = client.request('crud-create', 'POST', '/players', expect=201, json={
+        'full_name': f"Load Test {client.rng.random():.8f}", 'team_id': team_id,
+        'position': 'Midfielder', 'rating': 5, 'player_value': 1000000.0,
+    })
+    if resp is None or resp.status_code != 201:
+        return
+    player_id = resp.json()['id']
+    client.request('crud-update', 'PUT', f"/players/{player_id}", json={'rating': 6, 'is_injured': True})
+    client.request('crud-delete', 'DELETE', f"/players/{player_id}")
+
+
+SCENARIOS = {
+    'list-players': list_players,
+    'list-team-players': list_team_players,
+    'list-teams': list_teams,
+    'player-detail': player_detail,
+    'team-detail': team_detail,
+    'team-composition': report('team-composition'),
+    'player-performance': report('player-performance'),
+    'value-report': report('value-report'),
+    'injury-report': report('injury-report'),
+    'crud-player': crud_player,
+}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(database, port, env_overrides, workers=0, threads=4, asgi=False):
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{database}", **env_overrides)
+    if workers:
+        env.update(WEB_BIND=f"127.0.0.1:{port}", WEB_WORKERS=str(workers), WEB_THREADS=str(threads))
+        command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app']
+        if asgi:
+            command[-1:] = ['-k', 'uvicorn.workers.UvicornWorker', 'asgi:app']
+    elif asgi:
+        command = [sys.executable, '-m', 'uvicorn', 'asgi:app', '--host', '127.0.0.1', '--port', str(port),
+                   '--no-access-log']
+    else:
+        command = [sys.executable, '-c', SERVER_CODE, str(port)]
+    server = subprocess.Popen(command, cwd=current_dir, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server exited with code {server.returncode}")
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/api/teams?limit=1", timeout=1).ok:
+                return server
+        except requests.RequestException:
+            pass
+        time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError('Server did not become ready in time')
+
+
+def stop_server(server):
+    """Stop the server and return its peak RSS in MB."""
+    server.terminate()
+    server.wait(timeout=10)
+    maxrss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+def run_scenario(scenario, base_url, dataset, concurrency, duration, warmup, seed):
+    """Drive ``scenario`` from ``concurrency`` threads; return (latencies, errors, elapsed) by label."""
+    clients = [Client(base_url, random.Random(f"{seed}-{i}"), dataset, concurrency) for i in range(concurrency)]
+    timing = {}
+
+    def start_clock():
+        timing['start'] = time.perf_counter()
+        timing['end'] = timing['start'] + duration
+
+    # Measurement starts once every client has finished its warm-up
+    barrier = threading.Barrier(concurrency, action=start_clock)
+
+    def worker(client):
+        warm_until = time.perf_counter() + warmup
+        while time.perf_counter() < warm_until:
+            scenario(client)
+        client.latencies.clear()
+        client.errors.clear()
+        barrier.wait()
+        while time.perf_counter() < timing['end']:
+            scenario(client)
+
+    threads = [threading.Thread(target=worker, args=(c,)) for c in clients]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - timing['start']
+
+    latencies, errors = defaultdict(list), defaultdict(int)
+    for client in clients:
+        for label, values in client.latencies.items():
+            latencies[label].extend(values)
+        for label, count in client.errors.items():
+            errors[label] += count
+    return latencies, errors, elapsed
+
+
+def summarize(latencies, errors, elapsed):
+    results = {}
+    for label in sorted(latencies):
+        values = sorted(latencies[label])
+        results[label] = {
+            'requests': len(values),
+            'errors': errors.get(label, 0),
+            'throughput_rps': len(values) / elapsed,
+            'mean_ms': sum(values) / len(values) * 1000,
+            **{f"p{p}_ms": percentile(values, p) * 1000 for p in PERCENTILES},
+        }
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=current_dir,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results):
+    print(f"{'request':<20} {'reqs':>7} {'err':>5} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for label, r in results.items():
+        print(f"{label:<20} {r['requests']:>7} {r['errors']:>5} {r['throughput_rps']:>8.1f} "
+              f"{r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f}")
+
+
+def compare(results, baseline_path, max_regression):
+    """Print the change against a previous run; return the labels that regressed past the limit."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)['results']
+    regressed = []
+    print(f"\nCompared with {baseline_path}:")
+    print(f"{'request':<20} {'p95 change':>11} {'rps change':>11}")
+    for label, r in results.items():
+        old = baseline.get(label)
+        if not old:
+            continue
+        p95 = (r['p95_ms'] / old['p95_ms'] - 1) * 100
+        rps = (r['throughput_rps'] / old['throughput_rps'] - 1) * 100
+        print(f"{label:<20} {p95:>+10.1f}% {rps:>+10.1f}%")
+        if max_regression is not None and (p95 > max_regression or -rps > max_regression):
+            regressed.append(label)
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the API against a generated league.')
+    parser.add_argument('--database', help='existing database file (default: generate one)')
+    parser.add_argument('--teams', type=int, default=DEFAULT_TEAMS)
+    parser.add_argument('--players', type=int, default=DEFAULT_PLAYERS)
+    parser.add_argument('--seed', type=int, default=generate_league.DEFAULT_SEED)
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument('--duration', type=float, default=DEFAULT_DURATION, help='seconds per scenario')
+    parser.add_argument('--warmup', type=float, default=DEFAULT_WARMUP, help='seconds per scenario')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help='comma-separated subset of: %(default)s')
+    parser.add_argument('--sqlite-profile', help='SQLITE_PROFILE for the server')
+    parser.add_argument('--no-report-cache', action='store_true', help='run the server with REPORT_CACHE_SIZE=0')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='serve with gunicorn and this many worker processes (default: Flask dev server)')
+    parser.add_argument('--threads', type=int, default=4, help='threads per gunicorn worker')
+    parser.add_argument('--asgi', action='store_true',
+                        help='serve asgi.py with uvicorn (as the gunicorn worker class with --workers)')
+    parser.add_argument('--output', help='result file (default: bench-results/load-<time>-<commit>.json)')
+    parser.add_argument('--compare', help='earlier result file to compare against')
+    parser.add_argument('--max-regression', type=float,
+                        help='with --compare, exit 1 if any p95 or throughput is worse by more than this percent')
+    args = parser.parse_args()
+
+    names = [n.strip() for n in args.scenarios.split(',') if n.strip()]
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+
+    tmpdir = None
+    database = args.database
+    if database:
+        conn = sqlite3.connect(database)
+        dataset = {'teams': conn.execute("SELECT max(id) FROM teams").fetchone()[0] or 1,
+                   'players': conn.execute("SELECT max(id) FROM players").fetchone()[0] or 1}
+        conn.close()
+    else:
+        tmpdir = tempfile.mkdtemp()
+        database = os.path.join(tmpdir, 'league.db')
+        conn = sqlite3.connect(database)
+        for pragma in generate_league.FAST_LOAD_PRAGMAS:
+            conn.execute(pragma)
+        generate_league.load_league(conn, args.teams, args.players, args.seed)
+        conn.close()
+        generate_league.build_derived_tables(database)
+        dataset = {'teams': args.teams, 'players': args.players}
+    print(f"Dataset: {dataset['teams']} teams, {dataset['players']} players ({database})")
+
+    env = {}
+    if args.sqlite_profile:
+        env['SQLITE_PROFILE'] = args.sqlite_profile
+    if args.no_report_cache:
+        env['REPORT_CACHE_SIZE'] = '0'
+    port = free_port()
+    server = start_server(database, port, env, args.workers, args.threads, args.asgi)
+    base_url = f"http://127.0.0.1:{port}/api"
+    results = {}
+    try:
+        for name in names:
+            latencies, errors, elapsed = run_scenario(SCENARIOS[name], base_url, dataset, args.concurrency,
+                                                      args.duration, args.warmup, args.seed)
+            results.update(summarize(latencies, errors, elapsed))
+    finally:
+        peak_rss_mb = stop_server(server)
+        if tmpdir:
+            for name in os.listdir(tmpdir):
+                os.remove(os.path.join(tmpdir, name))
+            os.rmdir(tmpdir)
+
+    print_results(results)
+    print(f"Server peak RSS: {peak_rss_mb:.1f} MB")
+
+    commit = git_commit()
+    now = datetime.now(timezone.utc)
+    output = args.output or os.path.join('bench-results', f"load-{now:%Y%m%dT%H%M%SZ}-{commit or 'nogit'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({
+            'commit': commit,
+            'timestamp': now.isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'config': {k: v for k, v in vars(args).items() if k not in ('compare', 'output', 'max_regression')},
+            'dataset': dataset,
+            'peak_rss_mb': peak_rss_mb,
+            'results': results,
+        }, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        regressed = compare(results, args.compare, args.max_regression)
+        if regressed:
+            print(f"Regressed past {args.max_regression}%: {', '.join(regressed)}")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+"""
+Benchmark the report endpoints against the previous pure-Python aggregation.
+
+Builds a temporary SQLite database holding one large team, then times the
+old implementation (load every player, aggregate in Python) against the
+current SQL based endpoints and checks that both produce the same report.
+
+Usage:
+    python bench_reports.py [--players 20000] [--repeat 5]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from flask import jsonify
+
+from app import create_app, db, report_cache, Team, Player
+import team_stats
+
+
+def legacy_team_composition(team_id):
+    team = Team.query.get(team_id)
+    players = Player.query.filter(Player.team_id == team_id).all()
+    positions = {}
+    nationalities = {}
+    total_rating = 0
+    total_value = 0
+    injured_players = []
+    for p in players:
+        if p.position:
+            positions[p.position] = positions.get(p.position, 0) + 1
+        if p.nationality:
+            nationalities[p.nationality] = nationalities.get(p.nationality, 0) + 1
+        total_rating += p.rating or 0
+        total_value += p.player_value or 0
+        if p.is_injured:
+            injured_players.append(p.to_dict())
+    return {
+        'team': team.to_dict(),
+        'total_players': len(players),
+        'positions': positions,
+        'nationalities': nationalities,
+        'average_rating': total_rating / len(players) if players else 0,
+        'total_value': total_value,
+        'injured_players': injured_players
+    }
+
+
+def legacy_player_performance(team_id):
+    team = Team.query.get(team_id)
+    players = Player.query.filter(Player.team_id == team_id).all()
+    sorted_players = sorted(players, key=lambda p: (p.rating or 0), reverse=True)
+    return {
+        'team': team.to_dict(),
+        'players': [p.to_dict() for p in sorted_players],
+        'highest_rated': sorted_players[0].to_dict(),
+        'lowest_rated': sorted_players[-1].to_dict(),
+        'average_rating': sum([(p.rating or 0) for p in players]) / len(players)
+    }
+
+
+def legacy_value_report(team_id):
+    team = Team.query.get(team_id)
+    players = Player.query.filter(Player.team_id == team_id).all()
+    sorted_players = sorted(players, key=lambda p: (p.player_value or 0), reverse=True)
+    total_value = sum([(p.player_value or 0) for p in players])
+    return {
+        'team': team.to_dict(),
+        'players': [p.to_dict() for p in sorted_players],
+        'total_value': total_value,
+        'most_valuable': sorted_players[0].to_dict(),
+        'least_valuable': sorted_players[-1].to_dict(),
+        'average_value': total_value / len(players)
+    }
+
+
+def legacy_injury_report(team_id):
+    team = Team.query.get(team_id)
+    players = Player.query.filter(Player.team_id == team_id).all()
+    injured_players = [p for p in players if p.is_injured]
+    return {
+        'team': team.to_dict(),
+        'total_players': len(players),
+        'injured_players': [p.to_dict() for p in injured_players],
+        'injury_rate': len(injured_players) / len(players) * 100
+    }
+
+
+REPORTS = [
+    ('team-composition', legacy_team_composition),
+    ('player-performance', legacy_player_performance),
+    ('value-report', legacy_value_report),
+    ('injury-report', legacy_injury_report),
+]
+
+
+def populate(num_players):
+    rng = random.Random(42)
+    positions = ['Goalkeeper', 'Defender', 'Midfielder', 'Forward']
+    nations = ['Spain', 'Brazil', 'France', 'Germany', 'Argentina', 'England', 'Italy', 'Portugal']
+    team = Team(name='Benchmark FC', country='Spain', league='La Liga')
+    db.session.add(team)
+    db.session.flush()
+    db.session.bulk_insert_mappings(Player, [{
+        'full_name': f"Player {i}",
+        'nationality': rng.choice(nations),
+        'position': rng.choice(positions),
+        'team_id': team.id,
+        'rating': rng.randint(1, 10),
+        'player_value': round(rng.uniform(1e5, 1e8), 2),
+        'salary': round(rng.uniform(1e4, 1e7), 2),
+        'is_injured': rng.random() < 0.08,
+    } for i in range(num_players)])
+    db.session.commit()
+    return team.id
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        # Measure the computation itself, not report cache hits
+        report_cache.clear()
+        db.session.expire_all()
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--players', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    fd, db_path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{db_path}"})
+    try:
+        with app.app_context():
+            db.create_all()
+            team_id = populate(args.players)
+            # The reports read the per-team aggregates, filled here from the loaded rows
+            team_stats.ensure_team_stats(db.session)
+            client = app.test_client()
+
+            print(f"Team {team_id} with {args.players} players, best of {args.repeat} runs")
+            print(f"{'report':<20} {'legacy ms':>10} {'sql ms':>10} {'speedup':>8}")
+            for name, legacy in REPORTS:
+                # Both paths are timed up to a finished JSON response
+                with app.test_request_context():
+                    legacy_time, expected = best_of(lambda: jsonify(legacy(team_id)), args.repeat)
+                new_time, resp = best_of(
+                    lambda: client.get(f"/api/reports/{name}?team_id={team_id}"), args.repeat)
+                assert resp.get_json() == expected.get_json(), f"{name} differs from the legacy report"
+                print(f"{name:<20} {legacy_time * 1000:>10.1f} {new_time * 1000:>10.1f} "
+                      f"{legacy_time / new_time:>7.1f}x")
+            db.session.remove()
+    finally:
+        os.remove(db_path)
+
+
+if __name__ == '__main__':
+    main()
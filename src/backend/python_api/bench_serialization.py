@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+"""
+Micro-benchmark for serializing player lists.
+
+Compares the previous path (hydrate ORM objects, call to_dict() per row,
+encode with the stdlib encoder as jsonify does) with column-tuple rows
+encoded by each available JSON backend (see serialization.py). Fetch,
+row-to-dict and encode times are reported separately.
+
+Usage:
+    python bench_serialization.py [--players 100000] [--repeat 3]
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import date
+
+from app import create_app, db, Player, Team, PLAYER_COLUMNS
+import serialization
+
+
+def populate(num_players):
+    rng = random.Random(3)
+    db.session.add(Team(name='Serialization FC'))
+    db.session.flush()
+    db.session.bulk_insert_mappings(Player, [{
+        'full_name': f"Player {i}",
+        'date_of_birth': date(1980 + i % 25, 1 + i % 12, 1 + i % 28),
+        'contract_start': date(2020, 7, 1),
+        'contract_end': date(2025, 6, 30),
+        'nationality': rng.choice(['Spain', 'Brazil', 'France', 'Germany']),
+        'position': rng.choice(['Goalkeeper', 'Defender', 'Midfielder', 'Forward']),
+        'jersey_number': i % 99 + 1,
+        'height': round(rng.uniform(165, 200), 2),
+        'weight': round(rng.uniform(60, 95), 2),
+        'salary': round(rng.uniform(1e4, 1e7), 2),
+        'player_value': round(rng.uniform(1e5, 1e8), 2),
+        'team_id': 1,
+        'photo_url': f"https://example.com/{i}.png",
+        'is_injured': rng.random() < 0.08,
+        'rating': rng.randint(1, 10),
+    } for i in range(num_players)])
+    db.session.commit()
+
+
+def orm_rows():
+    return [p.to_dict() for p in Player.query.all()]
+
+
+def tuple_rows():
+    return [dict(zip(PLAYER_COLUMNS, row)) for row in db.session.query(*Player.__table__.columns).all()]
+
+
+def jsonify_dumps(obj):
+    # What flask.jsonify did for these endpoints: sorted keys, stdlib encoder
+    return json.dumps(obj, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+def timed(fn, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        db.session.expire_all()
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--players', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    fd, db_path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{db_path}"})
+    try:
+        with app.app_context():
+            db.create_all()
+            populate(args.players)
+
+            variants = [('orm + to_dict', orm_rows, 'jsonify', jsonify_dumps)]
+            for name, dumps in serialization.BACKENDS.items():
+                variants.append(('column tuples', tuple_rows, name, dumps))
+
+            print(f"{args.players} players, best of {args.repeat} runs (ms)")
+            print(f"{'rows':<15} {'encoder':<8} {'rows ms':>9} {'encode ms':>10} {'total ms':>9} {'MB':>7}")
+            for rows_name, rows_fn, encoder_name, dumps in variants:
+                rows_time, rows = timed(rows_fn, args.repeat)
+                encode_time, body = timed(lambda: dumps(rows), args.repeat)
+                print(f"{rows_name:<15} {encoder_name:<8} {rows_time * 1000:>9.1f} {encode_time * 1000:>10.1f} "
+                      f"{(rows_time + encode_time) * 1000:>9.1f} {len(body) / 1e6:>7.1f}")
+            db.session.remove()
+    finally:
+        os.remove(db_path)
+
+
+if __name__ == '__main__':
+    main()
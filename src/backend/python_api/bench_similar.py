@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+"""
+Benchmark the similar-player index against a naive full scan.
+
+Builds a league with generate_league.py (or opens --database) and times:
+- loading the player arrays and building the index
+- k-nearest-neighbour queries on the index
+- the same queries as a pure-Python scan over every player
+- patching the index after --writes player updates
+
+The scan's neighbours are checked against the index's. Writes go to a
+copy when --database is given.
+
+Usage:
+    python bench_similar.py [--teams 2000] [--players 1000000] [--queries 50] [--k 10]
+    python bench_similar.py --database league.db --naive-queries 3
+"""
+
+import argparse
+import heapq
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import text
+
+import generate_league
+import similar
+
+
+def naive_nearest(rows, positions, alive, player_index, k):
+    """The k nearest players by scanning every row in Python."""
+    query = rows[player_index]
+    position = positions[player_index]
+
+    def distance(i):
+        d = sum((a - b) ** 2 for a, b in zip(rows[i], query))
+        return d + (0 if positions[i] == position else similar.POSITION_PENALTY)
+
+    candidates = (i for i in range(len(rows)) if alive[i] and i != player_index)
+    return heapq.nsmallest(k, candidates, key=distance)
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark /api/players/<id>/similar against a full scan.')
+    parser.add_argument('--database', help='existing database file (default: generate one)')
+    parser.add_argument('--teams', type=int, default=2000)
+    parser.add_argument('--players', type=int, default=1000000)
+    parser.add_argument('--seed', type=int, default=generate_league.DEFAULT_SEED)
+    parser.add_argument('--queries', type=int, default=50)
+    parser.add_argument('--naive-queries', type=int, default=3, help='the scan takes seconds per query')
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--writes', type=int, default=1000)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    database = os.path.join(tmpdir, 'league.db')
+    try:
+        if args.database:
+            shutil.copyfile(args.database, database)
+        else:
+            conn = sqlite3.connect(database)
+            for pragma in generate_league.FAST_LOAD_PRAGMAS:
+                conn.execute(pragma)
+            generate_league.load_league(conn, args.teams, args.players, args.seed)
+            conn.close()
+            generate_league.build_derived_tables(database)
+
+        from app import create_app, db, similar_players
+
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{database}"})
+        with app.app_context():
+            _, load_ms = timed(similar_players.frames.get, db.session)
+            index, build_ms = timed(similar_players.get, db.session)
+            print(f"Players: {int(index.alive.sum())}")
+            print(f"Load player arrays: {load_ms:10.1f} ms")
+            print(f"Build index:        {build_ms:10.1f} ms")
+
+            rng = random.Random(args.seed)
+            live = index.ids[index.alive].tolist()
+            sample = [rng.choice(live) for _ in range(args.queries)]
+            times = [timed(index.nearest, player_id, args.k)[1] for player_id in sample]
+            print(f"Index query:        {statistics.median(times):10.2f} ms median, "
+                  f"{max(times):.2f} ms max over {len(times)} queries (k={args.k})")
+
+            rows = index.matrix.astype(float).tolist()
+            positions = index.position.tolist()
+            alive = index.alive.tolist()
+            times = []
+            for player_id in sample[:args.naive_queries]:
+                player_index = int(index.ids.searchsorted(player_id))
+                found, elapsed = timed(naive_nearest, rows, positions, alive, player_index, args.k)
+                times.append(elapsed)
+                expected = index.nearest(player_id, args.k)[0].tolist()
+                if [int(index.ids[i]) for i in found] != expected:
+                    print(f"  neighbours of {player_id} differ (ties or float32 rounding)")
+            if times:
+                print(f"Naive scan query:   {statistics.median(times):10.2f} ms median over {len(times)} queries")
+
+            ids = rng.sample(live, min(args.writes, len(live)))
+            for player_id in ids:
+                db.session.execute(text("UPDATE players SET rating = coalesce(rating, 0) % 10 + 1 WHERE id = :id"),
+                                   {'id': player_id})
+            db.session.commit()
+            _, refresh_ms = timed(similar_players.get, db.session)
+            kind = 'patched' if similar_players.patches else 'rebuilt'
+            print(f"Refresh after {len(ids)} writes: {refresh_ms:.1f} ms ({kind})")
+    finally:
+        shutil.rmtree(tmpdir)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
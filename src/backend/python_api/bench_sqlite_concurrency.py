@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+"""
+Concurrency benchmark for the SQLite tuning profiles.
+
+For each profile a fresh database file is populated, then reader threads
+run report-style queries while writer threads commit small updates. The
+script prints read and write throughput plus the number of "database is
+locked" errors, so the default journal can be compared with WAL.
+
+Usage:
+    python bench_sqlite_concurrency.py [--players 50000] [--readers 8] [--writers 2] [--seconds 5]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import NullPool
+
+from app import db
+from sqlite_tuning import install_pragmas, pool_options, resolve_pragmas, POOL_DEFAULTS
+
+READ_QUERIES = [
+    text("SELECT COUNT(id), SUM(COALESCE(rating, 0)), SUM(COALESCE(player_value, 0)) "
+         "FROM players WHERE team_id = :team_id"),
+    text("SELECT position, COUNT(id) FROM players WHERE team_id = :team_id GROUP BY position"),
+    text("SELECT * FROM players WHERE team_id = :team_id AND is_injured = 1"),
+]
+WRITE_QUERY = text("UPDATE players SET rating = :rating, player_value = :value WHERE id = :id")
+
+
+def make_engine(path, profile):
+    url = f"sqlite:///{path}"
+    if profile == 'default':
+        # What the app used before tuning: NullPool and SQLite's defaults
+        return create_engine(url, poolclass=NullPool)
+    engine = create_engine(url, **pool_options(POOL_DEFAULTS))
+    install_pragmas(engine, resolve_pragmas(profile))
+    return engine
+
+
+def populate(engine, num_players, num_teams):
+    rng = random.Random(7)
+    db.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(db.metadata.tables['teams'].insert(),
+                     [{'name': f"Team {t}"} for t in range(num_teams)])
+        conn.execute(db.metadata.tables['players'].insert(), [{
+            'full_name': f"Player {i}",
+            'position': rng.choice(['Goalkeeper', 'Defender', 'Midfielder', 'Forward']),
+            'team_id': i % num_teams + 1,
+            'rating': rng.randint(1, 10),
+            'player_value': rng.uniform(1e5, 1e8),
+            'is_injured': rng.random() < 0.08,
+        } for i in range(num_players)])
+
+
+def run_profile(profile, args):
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    engine = make_engine(path, profile)
+    try:
+        populate(engine, args.players, args.teams)
+        counters = {'reads': 0, 'writes': 0, 'locked': 0}
+        lock = threading.Lock()
+        stop = threading.Event()
+
+        def count(key):
+            with lock:
+                counters[key] += 1
+
+        def reader(seed):
+            rng = random.Random(seed)
+            while not stop.is_set():
+                try:
+                    with engine.connect() as conn:
+                        conn.execute(rng.choice(READ_QUERIES), {'team_id': rng.randint(1, args.teams)}).fetchall()
+                    count('reads')
+                except OperationalError:
+                    count('locked')
+
+        def writer(seed):
+            rng = random.Random(seed)
+            while not stop.is_set():
+                try:
+                    with engine.begin() as conn:
+                        conn.execute(WRITE_QUERY, {'id': rng.randint(1, args.players),
+                                                   'rating': rng.randint(1, 10),
+                                                   'value': rng.uniform(1e5, 1e8)})
+                    count('writes')
+                except OperationalError:
+                    count('locked')
+
+        threads = [threading.Thread(target=reader, args=(i,)) for i in range(args.readers)]
+        threads += [threading.Thread(target=writer, args=(1000 + i,)) for i in range(args.writers)]
+        for t in threads:
+            t.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for t in threads:
+            t.join()
+        return {k: v / args.seconds if k != 'locked' else v for k, v in counters.items()}
+    finally:
+        engine.dispose()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--players', type=int, default=50000)
+    parser.add_argument('--teams', type=int, default=100)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--profiles', default='default,performance')
+    args = parser.parse_args()
+
+    print(f"{args.players} players, {args.readers} readers, {args.writers} writers, {args.seconds}s per profile")
+    print(f"{'profile':<12} {'reads/s':>10} {'writes/s':>10} {'locked':>8}")
+    for profile in args.profiles.split(','):
+        result = run_profile(profile, args)
+        print(f"{profile:<12} {result['reads']:>10.0f} {result['writes']:>10.0f} {result['locked']:>8}")
+
+
+if __name__ == '__main__':
+    main()
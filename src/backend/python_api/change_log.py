@@ -0,0 +1,113 @@
+"""Change log of team and player writes for delta sync.
+
+Every insert, update and delete on ``teams`` and ``players`` appends a row
+to ``change_log`` from a trigger, so the entry commits or rolls back with
+the write itself whichever path made it (ORM, bulk endpoints or raw SQL).
+``seq`` is an AUTOINCREMENT key: it only grows and is never reused, which
+makes it a safe cursor for clients.
+
+A client bootstraps by reading the current cursor, fetching the lists,
+then polling for changes after that cursor. Each poll returns the latest
+state of every row changed since: the row itself for inserts and updates,
+a tombstone for deletes. The log is trimmed with
+
+    python change_log.py prune --keep 100000
+
+after which clients holding an older cursor get 410 Gone and resync.
+"""
+
+import argparse
+import sys
+
+from sqlalchemy import text
+
+TABLES = ('teams', 'players')
+OPERATIONS = {'INSERT': ('insert', 'new'), 'UPDATE': ('update', 'new'), 'DELETE': ('delete', 'old')}
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS change_log (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        table_name TEXT NOT NULL,
+        row_id INTEGER NOT NULL,
+        op TEXT NOT NULL)""",
+    "CREATE INDEX IF NOT EXISTS idx_change_log_row ON change_log (table_name, row_id, seq)",
+] + [
+    f"""CREATE TRIGGER IF NOT EXISTS {table}_change_log_{op} AFTER {event} ON {table} BEGIN
+        INSERT INTO change_log (table_name, row_id, op) VALUES ('{table}', {ref}.id, '{op}');
+    END"""
+    for table in TABLES for event, (op, ref) in OPERATIONS.items()
+]
+
+TRIGGERS = [f"{table}_change_log_{op}" for table in TABLES for op, _ in OPERATIONS.values()]
+
+
+class CursorExpired(Exception):
+    """The entries after the client's cursor were pruned; it has to resync."""
+
+
+def ensure_change_log(session):
+    """Create the table and triggers if missing. Earlier writes are not logged."""
+    for statement in SCHEMA:
+        session.execute(text(statement))
+    session.commit()
+
+
+def drop_change_log(session):
+    for trigger in TRIGGERS:
+        session.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+    session.execute(text("DROP TABLE IF EXISTS change_log"))
+    session.commit()
+
+
+def head(session):
+    """The seq of the last change ever logged, 0 before the first."""
+    return session.execute(text(
+        "SELECT coalesce((SELECT seq FROM sqlite_sequence WHERE name = 'change_log'), 0)")).scalar()
+
+
+def read_changes(session, since, limit):
+    """The latest entry of every row changed after ``since``, oldest first.
+
+    Returns ``(entries, has_more)`` where entries are ``(seq, table_name,
+    row_id, op)`` rows; an earlier entry of a row that changed again later
+    is skipped. Raises CursorExpired when entries after ``since`` were
+    pruned.
+    """
+    oldest = session.execute(text("SELECT min(seq) FROM change_log")).scalar()
+    if (oldest is None and since < head(session)) or (oldest is not None and since < oldest - 1):
+        raise CursorExpired()
+    rows = session.execute(text(
+        "SELECT c.seq, c.table_name, c.row_id, c.op FROM change_log c "
+        "WHERE c.seq > :since AND c.seq = (SELECT max(seq) FROM change_log "
+        "WHERE table_name = c.table_name AND row_id = c.row_id) "
+        "ORDER BY c.seq LIMIT :limit"), {'since': since, 'limit': limit + 1}).all()
+    return rows[:limit], len(rows) > limit
+
+
+def prune_change_log(session, keep):
+    """Delete all but the newest ``keep`` entries; returns how many were removed."""
+    result = session.execute(text(
+        "DELETE FROM change_log WHERE seq <= (SELECT coalesce(max(seq), 0) FROM change_log) - :keep"),
+        {'keep': keep})
+    return result.rowcount
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Maintain the change log.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    prune = subparsers.add_parser('prune', help='drop all but the newest entries')
+    prune.add_argument('--keep', type=int, required=True)
+    args = parser.parse_args()
+
+    from app import create_app, db
+
+    app = create_app()
+    with app.app_context():
+        removed = prune_change_log(db.session, args.keep)
+        db.session.commit()
+        print(f"Removed {removed} change log entries")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,122 @@
+"""Streaming CSV and Arrow exports.
+
+Rows are consumed from a database cursor in chunks of ``chunk_rows`` and
+each chunk is encoded and handed to the response on its own, so memory
+use is bounded by the chunk size whatever the number of rows.
+
+``csv`` is always available. ``arrow`` writes the Arrow IPC streaming
+format, one record batch per chunk, and needs pyarrow
+(``pip install pyarrow``); ``arrow_available()`` tells whether it is.
+"""
+
+import csv
+import io
+from datetime import date
+from itertools import islice
+
+from sqlalchemy import types
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+except ImportError:  # optional dependency
+    pyarrow = None
+
+CSV_MIMETYPE = 'text/csv'
+ARROW_MIMETYPE = 'application/vnd.apache.arrow.stream'
+FORMATS = {'csv': CSV_MIMETYPE, 'arrow': ARROW_MIMETYPE}
+
+
+def arrow_available():
+    return pyarrow is not None
+
+
+def column_kind(column):
+    """Map a SQLAlchemy column to one of the export kinds: int, float, bool, date or str."""
+    if isinstance(column.type, types.Boolean):
+        return 'bool'
+    if isinstance(column.type, types.Integer):
+        return 'int'
+    if isinstance(column.type, types.Float):
+        return 'float'
+    if isinstance(column.type, types.Date):
+        return 'date'
+    return 'str'
+
+
+def chunked(rows, size):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def csv_chunks(columns, rows, chunk_rows):
+    """Encode ``rows`` (tuples ordered like ``columns``) as CSV, one chunk per piece."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\r\n')
+    writer.writerow([name for name, _ in columns])
+    # The csv module writes NULL as an empty field; only booleans need converting
+    bool_indexes = [i for i, (_, kind) in enumerate(columns) if kind == 'bool']
+    for chunk in chunked(rows, chunk_rows):
+        if bool_indexes:
+            chunk = [list(row) for row in chunk]
+            for row in chunk:
+                for i in bool_indexes:
+                    if row[i] is not None:
+                        row[i] = 'true' if row[i] else 'false'
+        writer.writerows(chunk)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # Header of an empty export
+        yield buffer.getvalue().encode('utf-8')
+
+
+def _arrow_type(kind):
+    return {
+        'int': pyarrow.int64(),
+        'float': pyarrow.float64(),
+        'bool': pyarrow.bool_(),
+        'date': pyarrow.date32(),
+        'str': pyarrow.string(),
+    }[kind]
+
+
+def _arrow_column(values, kind):
+    if kind == 'date':
+        # SQLite hands back ISO strings when a date was stored by raw SQL
+        values = [date.fromisoformat(v) if isinstance(v, str) else v for v in values]
+    elif kind == 'bool':
+        values = [None if v is None else bool(v) for v in values]
+    return pyarrow.array(values, type=_arrow_type(kind))
+
+
+def arrow_chunks(columns, rows, chunk_rows):
+    """Encode ``rows`` as an Arrow IPC stream, one record batch per chunk."""
+    schema = pyarrow.schema([(name, _arrow_type(kind)) for name, kind in columns])
+    sink = io.BytesIO()
+
+    def drain():
+        data = sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+        return data
+
+    with pyarrow.ipc.new_stream(sink, schema) as writer:
+        for chunk in chunked(rows, chunk_rows):
+            arrays = [_arrow_column(values, kind) for values, (_, kind) in zip(zip(*chunk), columns)]
+            writer.write_batch(pyarrow.RecordBatch.from_arrays(arrays, schema=schema))
+            yield drain()
+    # Schema of an empty export and the end-of-stream marker
+    yield drain()
+
+
+def encode(fmt, columns, rows, chunk_rows):
+    """Chunks of ``rows`` encoded in ``fmt`` ('csv' or 'arrow')."""
+    if fmt == 'arrow':
+        return arrow_chunks(columns, rows, chunk_rows)
+    return csv_chunks(columns, rows, chunk_rows)
@@ -0,0 +1,348 @@
+#!/usr/bin/env python
+"""
+Generate a large synthetic league straight into a SQLite database.
+
+The output is deterministic for a given --seed and sizes. Teams are spread
+over tiered national leagues. Squads follow real-world shapes:
+- Positions are weighted towards defenders and midfielders.
+- Most players are domestic.
+- Ratings are higher in the top tiers.
+- Values are log-normal in rating and age; salaries follow value.
+- About 8% of players are injured.
+
+Rows are written with executemany on one exclusive connection with
+journaling off, and the indexes are built after the load.
+With --via-memory the database is built in memory and copied to the file
+with the SQLite backup API instead.
+
+Usage:
+    python generate_league.py --teams 5000 --players 2000000 --seed 7
+    python generate_league.py --output /tmp/league.db --teams 200 --players 5000 --force
+"""
+
+import argparse
+import math
+import os
+import random
+import re
+import sqlite3
+import sys
+import time
+from datetime import date
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(os.path.dirname(current_dir)))
+SCHEMA_PATH = os.path.join(project_root, "schemas", "schema.sql")
+DEFAULT_OUTPUT = os.path.join(current_dir, "instance", "soccer_app.db")
+
+DEFAULT_SEED = 42
+DEFAULT_TEAMS = 500
+DEFAULT_PLAYERS = 12500
+BATCH_SIZE = 50000
+TEAMS_PER_LEAGUE = 20
+
+# (country, top division, nationality) in order of how many clubs they get
+COUNTRIES = [
+    ('England', 'Premier League', 'England'),
+    ('Spain', 'La Liga', 'Spain'),
+    ('Germany', 'Bundesliga', 'Germany'),
+    ('Italy', 'Serie A', 'Italy'),
+    ('France', 'Ligue 1', 'France'),
+    ('Portugal', 'Primeira Liga', 'Portugal'),
+    ('Netherlands', 'Eredivisie', 'Netherlands'),
+    ('Brazil', 'Brasileirão', 'Brazil'),
+    ('Argentina', 'Primera División', 'Argentina'),
+    ('Belgium', 'Pro League', 'Belgium'),
+]
+COUNTRY_WEIGHTS = [16, 14, 12, 12, 10, 8, 7, 9, 7, 5]
+
+# Foreign signings, weighted by how often each nationality moves abroad
+FOREIGN_NATIONALITIES = ['Brazil', 'Argentina', 'France', 'Spain', 'Portugal', 'Nigeria', 'Senegal', 'Colombia',
+                         'Uruguay', 'Croatia', 'Serbia', 'Netherlands', 'Belgium', 'Germany', 'England',
+                         'Ghana', 'Ivory Coast', 'Japan', 'United States', 'Morocco']
+FOREIGN_WEIGHTS = [14, 10, 9, 7, 6, 6, 5, 5, 4, 4, 4, 4, 4, 3, 3, 3, 3, 2, 2, 2]
+DOMESTIC_SHARE = 0.65
+
+POSITIONS = ['Goalkeeper', 'Defender', 'Midfielder', 'Forward']
+POSITION_WEIGHTS = [3, 8, 8, 6]
+
+FIRST_NAMES = ['James', 'Luis', 'Marco', 'Thomas', 'João', 'Lucas', 'Mateo', 'Ivan', 'Kylian', 'Sergio',
+               'Diego', 'Paulo', 'Erling', 'Kevin', 'Mohamed', 'Sadio', 'Pedro', 'Andrés', 'Hugo', 'Jan',
+               'Federico', 'Bernardo', 'Rúben', 'Kai', 'Jamal', 'Vinícius', 'Takumi', 'Christian', 'Dušan', 'Achraf',
+               'Youssef', 'Emil', 'Leon', 'Nicolò', 'Gabriel', 'Raphaël', 'Olivier', 'Bukayo', 'Declan', 'Joško']
+LAST_NAMES = ['Silva', 'Müller', 'García', 'Rossi', 'Martin', 'Santos', 'Fernández', 'Smith', 'Dubois', 'Jansen',
+              'Pereira', 'Kovačić', 'Mensah', 'Diallo', 'Suárez', 'Moreno', 'Rodríguez', 'Costa', 'Bernard', 'Peeters',
+              'Schmidt', 'Bianchi', 'Lopes', 'Walker', 'Okafor', 'Traoré', 'Nakamura', 'Petrović', 'Hakimi', 'Lindqvist',
+              'De Jong', 'Barella', 'Gomes', 'Lefèvre', 'Rice', 'Saka', 'Gvardiol', 'Álvarez', 'Vlahović', 'Neuer']
+CITIES = ['Northfield', 'Riverton', 'Kingsport', 'Ashford', 'Bellmont', 'Castleton', 'Dunmore', 'Eastbrook',
+          'Fairhaven', 'Glenwood', 'Harrowgate', 'Ironbridge', 'Larkhill', 'Millbrook', 'Newhaven', 'Oakridge',
+          'Porthaven', 'Queensbury', 'Redcliffe', 'Stonebridge', 'Thornbury', 'Upton', 'Westmoor', 'Yarrow']
+CLUB_FORMS = ['{city} FC', '{city} United', 'Athletic {city}', 'Real {city}', '{city} City', 'Sporting {city}',
+              '{city} Rovers', 'Inter {city}', '{city} Wanderers', 'Dynamo {city}']
+COLORS = ['Red', 'Blue', 'White', 'Black', 'Yellow', 'Green', 'Claret', 'Sky Blue', 'Orange', 'Purple']
+INJURIES = ['Hamstring strain', 'Ankle sprain', 'Knee ligament damage', 'Groin strain', 'Calf tear',
+            'Concussion', 'Broken metatarsal', 'Muscle fatigue', 'Shoulder dislocation', 'Back spasms']
+INJURY_RATE = 0.08
+QUANTILE_TABLE_SIZE = 4096
+
+TEAM_COLUMNS = ('id', 'name', 'established_year', 'home_stadium', 'logo_url', 'club_colors', 'country', 'league',
+                'current_season_position', 'team_value', 'historical_performance', 'contact_information',
+                'description', 'wikipedia_link')
+PLAYER_COLUMNS = ('id', 'full_name', 'date_of_birth', 'nationality', 'position', 'jersey_number', 'height', 'weight',
+                  'contract_start', 'contract_end', 'salary', 'player_value', 'team_id', 'photo_url', 'is_injured',
+                  'injury_details', 'rating')
+
+TODAY = date(2025, 1, 1)
+
+FAST_LOAD_PRAGMAS = [
+    "PRAGMA journal_mode = OFF",
+    "PRAGMA synchronous = OFF",
+    "PRAGMA locking_mode = EXCLUSIVE",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -262144",
+    # Lets CREATE INDEX sort with worker threads
+    "PRAGMA threads = 4",
+]
+
+
+def split_schema(sql):
+    """Split schema.sql into (table statements, index statements)."""
+    statements = [s.strip() for s in sql.split(';') if s.strip()]
+    indexes = [s for s in statements if re.search(r'\bCREATE\s+INDEX\b', s, re.I)]
+    return [s for s in statements if s not in indexes], indexes
+
+
+def place_team(slot):
+    """Map the n-th club of a country onto its pyramid: ``(tier, group, position)``.
+
+    Each tier has twice as many regional groups of TEAMS_PER_LEAGUE clubs as
+    the one above it, so tier 1 is one league, tier 2 two, tier 3 four...
+    """
+    block = slot // TEAMS_PER_LEAGUE
+    tier = (block + 1).bit_length()
+    group = block - (2 ** (tier - 1) - 1) + 1
+    return tier, group, slot % TEAMS_PER_LEAGUE + 1
+
+
+def league_name(country_index, tier, group):
+    country, top_division, _ = COUNTRIES[country_index]
+    if tier == 1:
+        return top_division
+    return f"{country} Division {tier} Group {group}"
+
+
+def generate_teams(rng, num_teams):
+    """Return team rows (without team_value, which is derived from the squads) and
+    a ``(country_index, tier)`` per team for the player generator."""
+    countries = rng.choices(range(len(COUNTRIES)), weights=COUNTRY_WEIGHTS, k=num_teams)
+    placed = [0] * len(COUNTRIES)
+    seen_names = {}
+    rows, profiles = [], []
+    for team_id, country_index in enumerate(countries, start=1):
+        tier, group, position = place_team(placed[country_index])
+        placed[country_index] += 1
+        country = COUNTRIES[country_index][0]
+        league = league_name(country_index, tier, group)
+        city = rng.choice(CITIES)
+        name = rng.choice(CLUB_FORMS).format(city=city)
+        seen_names[name] = seen_names.get(name, 0) + 1
+        if seen_names[name] > 1:
+            name = f"{name} {seen_names[name]}"
+        slug = re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-')
+        colors = rng.sample(COLORS, 2)
+        established = rng.randint(1860, 2010)
+        rows.append((
+            team_id, name, established, f"{city} Stadium", f"https://example.com/logos/{slug}.png",
+            f"{colors[0]} and {colors[1]}", country, league, position, None,
+            f"{rng.randint(0, 30 // tier)} league titles", f"info@{slug}.example.com",
+            f"Founded in {established}, plays in {league}.", None,
+        ))
+        profiles.append((country_index, tier))
+    return rows, profiles
+
+
+def quantile_table(draw, size=QUANTILE_TABLE_SIZE):
+    """Pre-draw ``size`` samples; indexing it uniformly approximates ``draw``."""
+    return sorted(draw() for _ in range(size))
+
+
+class PlayerDistributions:
+    """Lookup tables for the per-player draws.
+
+    Sampling from pre-drawn tables with ``choices(k=squad)`` keeps the
+    generator at a few microseconds per row instead of a dozen
+    random-variate calls each.
+    """
+
+    def __init__(self, rng):
+        self.names = [f"{first} {last}" for first in FIRST_NAMES for last in LAST_NAMES]
+        # (date_of_birth, value multiplier): value peaks in the mid-twenties
+        today = TODAY.toordinal()
+        self.ages = [(date.fromordinal(today - int(age * 365.25)).isoformat(), 0.3 + math.exp(-((age - 26) / 6) ** 2))
+                     for age in quantile_table(lambda: rng.triangular(17, 38, 25))]
+        self.value_noise = quantile_table(lambda: rng.lognormvariate(0, 0.6))
+        self.salary_share = quantile_table(lambda: rng.lognormvariate(-2.6, 0.3))
+        self.heights = {False: [round(h, 1) for h in quantile_table(lambda: rng.gauss(181, 6))],
+                        True: [round(h, 1) for h in quantile_table(lambda: rng.gauss(189, 5))]}
+        self.weight_offsets = quantile_table(lambda: rng.gauss(-105, 5))
+        self.contracts = [(date(start, 7, 1).isoformat(), date(start + length, 6, 30).isoformat())
+                          for start in range(2019, 2025) for length in range(1, 6)]
+        self.injuries = [f"{injury}, expected return in {weeks} weeks" for injury in INJURIES for weeks in range(1, 13)]
+        # Value grows exponentially with rating
+        self.rating_value = {rating: math.exp(11.0 + 0.75 * rating) for rating in range(1, 11)}
+        self.rating_weights = {}
+
+    def rating_cum_weights(self, tier):
+        """Discretised normal rating distribution; lower tiers rate lower."""
+        if tier not in self.rating_weights:
+            mean = max(3.5, 7.5 - 1.0 * (tier - 1))
+            weights = [math.exp(-((r - mean) / 1.4) ** 2 / 2) for r in range(1, 11)]
+            self.rating_weights[tier] = [sum(weights[:i + 1]) for i in range(10)]
+        return self.rating_weights[tier]
+
+
+def generate_players(rng, profiles, num_players, first_id=1):
+    """Yield player rows, squads of near-equal size in team order."""
+    dist = PlayerDistributions(rng)
+    base, extra = divmod(num_players, len(profiles))
+    choices, random_ = rng.choices, rng.random
+    ratings_range = range(1, 11)
+    player_id = first_id
+    for team_index, (country_index, tier) in enumerate(profiles):
+        squad = base + (1 if team_index < extra else 0)
+        if not squad:
+            continue
+        team_id = team_index + 1
+        domestic = COUNTRIES[country_index][2]
+        positions = choices(POSITIONS, weights=POSITION_WEIGHTS, k=squad)
+        foreign = choices(FOREIGN_NATIONALITIES, weights=FOREIGN_WEIGHTS, k=squad)
+        numbers = rng.sample(range(1, 100), squad) if squad <= 99 else choices(range(1, 100), k=squad)
+        ratings = choices(ratings_range, cum_weights=dist.rating_cum_weights(tier), k=squad)
+        rows = zip(
+            range(player_id, player_id + squad), choices(dist.names, k=squad), choices(dist.ages, k=squad),
+            positions, foreign, numbers, ratings, choices(dist.value_noise, k=squad),
+            choices(dist.salary_share, k=squad), choices(dist.heights[False], k=squad),
+            choices(dist.heights[True], k=squad), choices(dist.weight_offsets, k=squad),
+            choices(dist.contracts, k=squad),
+        )
+        for (pid, name, (dob, age_factor), position, foreign_nat, number, rating, noise, share,
+             outfield_height, keeper_height, offset, contract) in rows:
+            value = round(dist.rating_value[rating] * noise * age_factor, -3)
+            height = keeper_height if position == 'Goalkeeper' else outfield_height
+            injured = random_() < INJURY_RATE
+            yield (
+                pid, name, dob, domestic if random_() < DOMESTIC_SHARE else foreign_nat, position, number,
+                height, round(height + offset, 1), contract[0], contract[1],
+                round(value * share, -2), value, team_id, None, int(injured),
+                choices(dist.injuries)[0] if injured else None, rating,
+            )
+        player_id += squad
+
+
+def insert_rows(conn, table, columns, rows, batch_size=BATCH_SIZE):
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    batch = []
+    count = 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            conn.executemany(sql, batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        conn.executemany(sql, batch)
+        count += len(batch)
+    return count
+
+
+def load_league(conn, num_teams, num_players, seed=DEFAULT_SEED, create_schema=True, batch_size=BATCH_SIZE):
+    """Write a generated league into ``conn`` (an open sqlite3 connection).
+
+    With ``create_schema`` the tables come from schemas/schema.sql, with the
+    indexes created after the rows are in. Returns ``(teams, players)``.
+    """
+    rng = random.Random(seed)
+    indexes = []
+    if create_schema:
+        with open(SCHEMA_PATH) as f:
+            tables, indexes = split_schema(f.read())
+        for statement in tables:
+            conn.execute(statement)
+
+    team_rows, profiles = generate_teams(rng, num_teams)
+    teams = insert_rows(conn, 'teams', TEAM_COLUMNS, team_rows, batch_size)
+    players = insert_rows(conn, 'players', PLAYER_COLUMNS, generate_players(rng, profiles, num_players), batch_size)
+    for statement in indexes:
+        conn.execute(statement)
+    # Club value tracks the squad, the way the sample data does
+    conn.execute("UPDATE teams SET team_value = "
+                 "(SELECT round(coalesce(sum(player_value), 0) * 1.2, -3) FROM players WHERE team_id = teams.id)")
+    conn.commit()
+    return teams, players
+
+
+def build_derived_tables(path):
+    """Create the FTS index, team aggregates, change log and their triggers.
+
+    See search.py, team_stats.py and change_log.py. The index and the
+    aggregates are filled from the loaded rows; the log starts empty.
+    """
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+    import change_log
+    import search as search_index
+    import team_stats
+
+    engine = create_engine(f"sqlite:///{path}")
+    with Session(engine) as session:
+        search_index.ensure_search_index(session)
+        team_stats.ensure_team_stats(session)
+        change_log.ensure_change_log(session)
+    engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic league into a SQLite database.')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='database file (default: %(default)s)')
+    parser.add_argument('--teams', type=int, default=DEFAULT_TEAMS)
+    parser.add_argument('--players', type=int, default=DEFAULT_PLAYERS)
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--via-memory', action='store_true',
+                        help='build in memory and copy to --output with the backup API')
+    parser.add_argument('--no-search-index', action='store_true',
+                        help='skip the FTS index and team aggregates (the API builds them on first start)')
+    parser.add_argument('--force', action='store_true', help='overwrite --output if it exists')
+    args = parser.parse_args()
+
+    if args.teams < 1 or args.players < 0:
+        parser.error('--teams must be positive and --players not negative')
+    if os.path.exists(args.output):
+        if not args.force:
+            parser.error(f"{args.output} exists; pass --force to overwrite it")
+        os.remove(args.output)
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+
+    start = time.perf_counter()
+    conn = sqlite3.connect(':memory:' if args.via_memory else args.output)
+    for pragma in FAST_LOAD_PRAGMAS:
+        conn.execute(pragma)
+    teams, players = load_league(conn, args.teams, args.players, args.seed, batch_size=args.batch_size)
+    if args.via_memory:
+        target = sqlite3.connect(args.output)
+        conn.backup(target)
+        target.close()
+    conn.close()
+    elapsed = time.perf_counter() - start
+    print(f"Wrote {teams} teams and {players} players to {args.output} in {elapsed:.1f}s "
+          f"({(teams + players) / elapsed:,.0f} rows/s)")
+
+    if not args.no_search_index:
+        start = time.perf_counter()
+        build_derived_tables(args.output)
+        print(f"Built the search index and team aggregates in {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,54 @@
+"""Gunicorn settings for serving the API with several worker processes.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+    gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker asgi:app
+
+Every setting can be overridden from the environment (WEB_*). The master
+creates missing tables and the search index once, then forks the workers.
+With WEB_PRELOAD (the default), the app is imported in the master and
+shared copy-on-write. Each worker starts with a fresh connection pool.
+
+Reloading without dropping requests:
+- ``kill -HUP <master pid>`` re-reads this file, starts new workers and
+  lets the old ones finish their requests (graceful_timeout). With
+  preload the application code is not re-imported.
+- To deploy new code, ``kill -USR2 <master pid>`` starts a new master
+  alongside the old one. Then ``kill -WINCH`` and ``kill -QUIT`` the old
+  master. With WEB_PRELOAD=0 a HUP alone also reloads the code.
+"""
+
+import multiprocessing
+import os
+
+bind = os.environ.get('WEB_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_WORKERS', multiprocessing.cpu_count()))
+threads = int(os.environ.get('WEB_THREADS', 4))
+worker_class = 'gthread'
+preload_app = os.environ.get('WEB_PRELOAD', '1') == '1'
+timeout = int(os.environ.get('WEB_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('WEB_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('WEB_KEEPALIVE', 5))
+# Recycle workers after this many requests (0 disables) to bound memory growth
+max_requests = int(os.environ.get('WEB_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+accesslog = os.environ.get('WEB_ACCESS_LOG') or None  # "-" logs to stdout
+
+# Read by asgi.py, which runs after this file is loaded
+os.environ.setdefault('ASGI_PREPARE_DB', '0')  # on_starting below prepares the database
+
+
+def on_starting(server):
+    from app import create_app, dispose_engines, prepare_database
+
+    os.makedirs('instance', exist_ok=True)
+    app = create_app()
+    prepare_database(app)
+    dispose_engines(app)
+
+
+def post_fork(server, worker):
+    from app import dispose_engines
+
+    # Under the uvicorn worker class wsgi() is the AsgiApp wrapping the Flask app
+    app = worker.app.wsgi()
+    dispose_engines(getattr(app, 'flask_app', app), close=False)
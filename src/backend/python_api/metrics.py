@@ -0,0 +1,309 @@
+"""Opt-in request metrics and slow-request profiling.
+
+With ``METRICS_ENABLED`` set, every request records its latency, the SQL
+statements it ran (count and time, from engine cursor events) and the time
+spent encoding JSON, labelled by method and route rule. The totals are served
+at ``/api/_metrics`` in the Prometheus text exposition format.
+
+Setting ``PROFILE_SLOW_MS`` turns on a sampling profiler: the stacks of
+in-flight requests are sampled every ``PROFILE_INTERVAL_MS`` and requests
+slower than the threshold are written to ``PROFILE_DIR`` as collapsed stacks
+(``frame;frame;frame count`` per line), the input format of flamegraph.pl
+and speedscope.
+"""
+
+import math
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+from flask import Response, current_app, g, has_request_context, jsonify, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+
+
+def format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value))
+
+
+def format_labels(names, values):
+    if not names:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for v in values)
+    return '{' + ','.join(f'{n}="{v}"' for n, v in zip(names, escaped)) + '}'
+
+
+class CounterMetric:
+    type = 'counter'
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def get(self, labels=()):
+        return self._values.get(labels, 0)
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            yield self.name, format_labels(self.labels, labels), value
+
+
+class HistogramMetric:
+    type = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets) + (math.inf,)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, labels=()):
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    def get(self, labels=()):
+        """Return ``(sum, count)`` for one label set."""
+        entry = self._values.get(labels)
+        return (entry[1], entry[2]) if entry else (0.0, 0)
+
+    def samples(self):
+        with self._lock:
+            values = sorted((labels, (list(e[0]), e[1], e[2])) for labels, e in self._values.items())
+        for labels, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield (self.name + '_bucket',
+                       format_labels(self.labels + ('le',), labels + (format_value(bound),)), cumulative)
+            label_text = format_labels(self.labels, labels)
+            yield self.name + '_sum', label_text, total
+            yield self.name + '_count', label_text, count
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = {}
+
+    def counter(self, name, help, labels=()):
+        return self.metrics.setdefault(name, CounterMetric(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        return self.metrics.setdefault(name, HistogramMetric(name, help, labels, buckets))
+
+    def render(self):
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+def collapse_stack(frame):
+    """Render a frame and its callers as a root-first ``a;b;c`` string."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class StackSampler:
+    """Samples the stacks of registered threads from one background thread.
+
+    The thread only runs while at least one request is being profiled.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self._active = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self, ident):
+        with self._lock:
+            self._active[ident] = Counter()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+                self._thread.start()
+
+    def stop(self, ident):
+        with self._lock:
+            return self._active.pop(ident, Counter())
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._active:
+                    self._thread = None
+                    return
+                frames = sys._current_frames()
+                for ident, stacks in self._active.items():
+                    frame = frames.get(ident)
+                    if frame is not None:
+                        stacks[collapse_stack(frame)] += 1
+
+
+class RequestStats:
+    __slots__ = ('start', 'status', 'queries', 'sql_time', 'serialize_time', 'profiling')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.status = 500
+        self.queries = 0
+        self.sql_time = 0.0
+        self.serialize_time = 0.0
+        self.profiling = False
+
+
+def current_stats():
+    return g.get('request_stats') if has_request_context() else None
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_stats() is not None:
+        conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_stats()
+    starts = conn.info.get('metrics_query_start')
+    if stats is not None and starts:
+        stats.queries += 1
+        stats.sql_time += time.perf_counter() - starts.pop()
+
+
+class Metrics:
+    def __init__(self, app=None):
+        self.registry = MetricsRegistry()
+        labels = ('method', 'endpoint')
+        self.requests = self.registry.counter(
+            'http_requests_total', 'Requests handled, by route and status.', labels + ('status',))
+        self.latency = self.registry.histogram(
+            'http_request_duration_seconds', 'Request latency, including streamed bodies.', labels)
+        self.sql_queries = self.registry.histogram(
+            'http_request_sql_queries', 'SQL statements executed per request.', labels, QUERY_COUNT_BUCKETS)
+        self.sql_time = self.registry.histogram(
+            'http_request_sql_duration_seconds', 'Time spent in SQL statements per request.', labels)
+        self.serialize_time = self.registry.histogram(
+            'http_response_serialization_seconds', 'Time spent encoding JSON per request.', labels)
+        self.profiles = self.registry.counter(
+            'slow_request_profiles_total', 'Slow requests written to PROFILE_DIR.', labels)
+        self.sampler = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('METRICS_ENABLED', False)
+        app.config.setdefault('PROFILE_SLOW_MS', 0)
+        app.config.setdefault('PROFILE_INTERVAL_MS', 5)
+        app.config.setdefault('PROFILE_DIR', 'profiles')
+        app.extensions['metrics'] = self
+
+        if not event.contains(Engine, 'before_cursor_execute', before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', after_cursor_execute)
+
+        # Wraps the encoder picked by serialization.init_app
+        dumps = app.extensions['json_dumps']
+
+        def timed_dumps(obj):
+            stats = current_stats()
+            if stats is None:
+                return dumps(obj)
+            start = time.perf_counter()
+            try:
+                return dumps(obj)
+            finally:
+                stats.serialize_time += time.perf_counter() - start
+
+        app.extensions['json_dumps'] = timed_dumps
+        app.before_request(self.before_request)
+        app.after_request(self.after_request)
+        app.teardown_request(self.teardown_request)
+        app.add_url_rule('/api/_metrics', 'metrics', self.metrics_view)
+
+    def before_request(self):
+        config = current_app.config
+        profile = config['PROFILE_SLOW_MS'] > 0
+        if not (config['METRICS_ENABLED'] or profile):
+            return
+        stats = g.request_stats = RequestStats()
+        if profile:
+            interval = config['PROFILE_INTERVAL_MS'] / 1000.0
+            if self.sampler is None or self.sampler.interval != interval:
+                self.sampler = StackSampler(interval)
+            self.sampler.start(threading.get_ident())
+            stats.profiling = True
+
+    def after_request(self, response):
+        stats = current_stats()
+        if stats is not None:
+            stats.status = response.status_code
+        return response
+
+    def teardown_request(self, exc):
+        # Runs after a stream_with_context body is exhausted, so streamed
+        # responses are timed end to end
+        stats = g.pop('request_stats', None)
+        if stats is None:
+            return
+        elapsed = time.perf_counter() - stats.start
+        labels = (request.method, request.url_rule.rule if request.url_rule else 'unmatched')
+        if current_app.config['METRICS_ENABLED']:
+            self.requests.inc(labels + (str(stats.status),))
+            self.latency.observe(elapsed, labels)
+            self.sql_queries.observe(stats.queries, labels)
+            self.sql_time.observe(stats.sql_time, labels)
+            self.serialize_time.observe(stats.serialize_time, labels)
+        if stats.profiling:
+            stacks = self.sampler.stop(threading.get_ident())
+            if stacks and elapsed * 1000 >= current_app.config['PROFILE_SLOW_MS']:
+                self.write_profile(stacks, labels, elapsed)
+
+    def write_profile(self, stacks, labels, elapsed):
+        directory = current_app.config['PROFILE_DIR']
+        os.makedirs(directory, exist_ok=True)
+        slug = ''.join(c if c.isalnum() else '_' for c in labels[1]).strip('_')
+        path = os.path.join(directory, f"{int(time.time() * 1000)}-{labels[0]}-{slug}-{int(elapsed * 1000)}ms.folded")
+        with open(path, 'w') as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        self.profiles.inc(labels)
+        current_app.logger.info("Wrote profile of slow request %s %s to %s", labels[0], request.full_path, path)
+
+    def metrics_view(self):
+        if not current_app.config['METRICS_ENABLED']:
+            return jsonify({'error': 'Metrics are disabled'}), 404
+        return Response(self.registry.render(), content_type=PROMETHEUS_CONTENT_TYPE)
@@ -0,0 +1,125 @@
+"""In-process LRU/TTL cache for report payloads.
+
+Entries are keyed by (report type, team id, extra args). Entries that span
+several teams, such as the league-wide reports, use ``team_id=None`` and
+are dropped on every invalidation since any write can change them.
+
+A reader that misses builds the payload from rows that a concurrent write
+may replace before the reader stores it; the writer's invalidation has
+then already run. To keep such a payload out of the cache the reader takes
+a ``token()`` before building and passes it to ``set``, which drops the
+payload when any invalidation happened in between.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class ReportCache:
+    def __init__(self, maxsize=256, ttl=300, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._versions = {}
+        # Bumped by every invalidation; see token()
+        self._generation = 0
+
+    def configure(self, maxsize, ttl):
+        """Apply new limits; entries over the new size are evicted on the next ``set``."""
+        with self._lock:
+            self.maxsize = maxsize
+            self.ttl = ttl
+
+    @staticmethod
+    def make_key(report_type, team_id=None, *args):
+        return (report_type, team_id) + tuple(args)
+
+    def get(self, key):
+        """Return the cached payload for ``key`` or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > self.clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.evictions += 1
+            self.misses += 1
+            return None
+
+    def token(self):
+        """Take before reading the rows of a payload that will be passed to ``set``."""
+        with self._lock:
+            return self._generation
+
+    def set(self, key, value, token=None):
+        """Store ``value``; with a ``token``, only if nothing was invalidated since it was taken."""
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            if token is not None and token != self._generation:
+                return
+            self._entries[key] = (self.clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        token = self.token()
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.set(key, value, token)
+        return value
+
+    def invalidate_teams(self, *team_ids):
+        """Drop the entries of the given teams plus every cross-team entry."""
+        affected = set(team_ids) | {None}
+        with self._lock:
+            stale = [key for key in self._entries if key[1] in affected]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+            self._generation += 1
+
+    def sync(self, versions):
+        """Drop every entry once ``versions`` (table name -> data version) moved on.
+
+        Writes invalidate the entries of this process only. Every versioned
+        GET calls this with the versions it read from the database, so that
+        writes served by other worker processes are seen too.
+        """
+        with self._lock:
+            stale = any(self._versions.get(name, version) != version for name, version in versions.items())
+            self._versions.update(versions)
+            if stale:
+                self.invalidations += len(self._entries)
+                self._entries.clear()
+                self._generation += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }
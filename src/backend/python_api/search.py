@@ -0,0 +1,144 @@
+"""Full-text search over players and teams backed by SQLite FTS5.
+
+Two contentful FTS5 tables mirror the searchable columns, keyed by the
+player/team id as rowid. Triggers on ``players`` and ``teams`` keep them
+in sync for every writer (ORM, bulk endpoints or raw SQL), including
+renaming a team, which rewrites the team name on its players' entries.
+
+Queries match every word as a prefix, and the unicode61 tokenizer folds
+diacritics, so "mull" finds "Thomas Müller".
+"""
+
+import re
+
+from sqlalchemy import text
+
+TOKENIZE = "unicode61 remove_diacritics 2"
+
+SCHEMA = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS player_search USING fts5(
+        full_name, nationality, team_name, league, injury_details,
+        tokenize = '{TOKENIZE}', prefix = '2 3')""",
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS team_search USING fts5(
+        name, league, country,
+        tokenize = '{TOKENIZE}', prefix = '2 3')""",
+    """CREATE TRIGGER IF NOT EXISTS players_search_insert AFTER INSERT ON players BEGIN
+        INSERT INTO player_search (rowid, full_name, nationality, team_name, league, injury_details)
+        VALUES (new.id, new.full_name, new.nationality,
+                (SELECT name FROM teams WHERE id = new.team_id),
+                (SELECT league FROM teams WHERE id = new.team_id),
+                new.injury_details);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS players_search_update
+    AFTER UPDATE OF full_name, nationality, team_id, injury_details ON players BEGIN
+        DELETE FROM player_search WHERE rowid = old.id;
+        INSERT INTO player_search (rowid, full_name, nationality, team_name, league, injury_details)
+        VALUES (new.id, new.full_name, new.nationality,
+                (SELECT name FROM teams WHERE id = new.team_id),
+                (SELECT league FROM teams WHERE id = new.team_id),
+                new.injury_details);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS players_search_delete AFTER DELETE ON players BEGIN
+        DELETE FROM player_search WHERE rowid = old.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS teams_search_insert AFTER INSERT ON teams BEGIN
+        INSERT INTO team_search (rowid, name, league, country) VALUES (new.id, new.name, new.league, new.country);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS teams_search_update AFTER UPDATE OF name, league, country ON teams BEGIN
+        UPDATE team_search SET name = new.name, league = new.league, country = new.country WHERE rowid = new.id;
+        UPDATE player_search SET team_name = new.name, league = new.league
+        WHERE rowid IN (SELECT id FROM players WHERE team_id = new.id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS teams_search_delete AFTER DELETE ON teams BEGIN
+        DELETE FROM team_search WHERE rowid = old.id;
+    END""",
+]
+
+TRIGGERS = ['players_search_insert', 'players_search_update', 'players_search_delete',
+            'teams_search_insert', 'teams_search_update', 'teams_search_delete']
+
+# bm25 column weights: names count most, free text least
+PLAYER_WEIGHTS = '10.0, 2.0, 4.0, 2.0, 1.0'
+TEAM_WEIGHTS = '10.0, 3.0, 2.0'
+
+
+def ensure_search_index(session):
+    """Create the FTS tables and triggers if missing, filling them on first creation."""
+    exists = session.execute(text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'player_search'")).first()
+    for statement in SCHEMA:
+        session.execute(text(statement))
+    if not exists:
+        rebuild_search_index(session)
+    session.commit()
+
+
+def rebuild_search_index(session):
+    """Repopulate both FTS tables from ``players`` and ``teams``."""
+    session.execute(text("DELETE FROM player_search"))
+    session.execute(text("DELETE FROM team_search"))
+    session.execute(text(
+        "INSERT INTO player_search (rowid, full_name, nationality, team_name, league, injury_details) "
+        "SELECT p.id, p.full_name, p.nationality, t.name, t.league, p.injury_details "
+        "FROM players p LEFT JOIN teams t ON t.id = p.team_id"))
+    session.execute(text(
+        "INSERT INTO team_search (rowid, name, league, country) SELECT id, name, league, country FROM teams"))
+
+
+def drop_search_index(session):
+    for trigger in TRIGGERS:
+        session.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+    session.execute(text("DROP TABLE IF EXISTS player_search"))
+    session.execute(text("DROP TABLE IF EXISTS team_search"))
+    session.commit()
+
+
+def build_match_query(query):
+    """Turn free text into an FTS5 query matching every word as a prefix.
+
+    Only word characters are kept, so user input can never inject FTS5
+    syntax. Returns None when nothing searchable is left.
+    """
+    words = re.findall(r'\w+', query or '')
+    if not words:
+        return None
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def search_players(session, match, limit, offset, team_id=None, position=None, injured=None):
+    """Ranked player matches; returns (items, next_offset)."""
+    where = ["player_search MATCH :match"]
+    params = {'match': match, 'limit': limit + 1, 'offset': offset}
+    if team_id is not None:
+        where.append("p.team_id = :team_id")
+        params['team_id'] = team_id
+    if position:
+        where.append("p.position = :position")
+        params['position'] = position
+    if injured is not None:
+        where.append("p.is_injured = :injured")
+        params['injured'] = 1 if injured else 0
+    rows = session.execute(text(
+        "SELECT p.id, p.full_name, p.nationality, p.position, p.team_id, "
+        "player_search.team_name, player_search.league, p.rating, p.player_value, p.is_injured "
+        "FROM player_search JOIN players p ON p.id = player_search.rowid "
+        f"WHERE {' AND '.join(where)} "
+        f"ORDER BY bm25(player_search, {PLAYER_WEIGHTS}) LIMIT :limit OFFSET :offset"), params).all()
+    items = [{
+        'id': r.id, 'full_name': r.full_name, 'nationality': r.nationality, 'position': r.position,
+        'team_id': r.team_id, 'team_name': r.team_name, 'league': r.league, 'rating': r.rating,
+        'player_value': r.player_value, 'is_injured': bool(r.is_injured)
+    } for r in rows[:limit]]
+    return items, (offset + limit if len(rows) > limit else None)
+
+
+def search_teams(session, match, limit, offset):
+    """Ranked team matches; returns (items, next_offset)."""
+    rows = session.execute(text(
+        "SELECT t.id, t.name, t.league, t.country "
+        "FROM team_search JOIN teams t ON t.id = team_search.rowid "
+        "WHERE team_search MATCH :match "
+        f"ORDER BY bm25(team_search, {TEAM_WEIGHTS}) LIMIT :limit OFFSET :offset"),
+        {'match': match, 'limit': limit + 1, 'offset': offset}).all()
+    items = [{'id': r.id, 'name': r.name, 'league': r.league, 'country': r.country} for r in rows[:limit]]
+    return items, (offset + limit if len(rows) > limit else None)
@@ -3,16 +3,38 @@
 Usage:
     1. Start the Flask API: python app.py
     2. Run this seeder: python seed_api_data.py
+       or load your own data:
+       python seed_api_data.py --teams teams.csv --players players.csv
+       python seed_api_data.py --input league.json --batch-size 2000 --workers 8
+
+Input files may be JSON (a list, or an object with "teams"/"players" lists)
+or CSV with a header row. Players reference their team by "team_name".
 
 Idempotent: existing teams matched by name; players matched by (full_name, team_id).
+Existing state is fetched once up front and only missing rows are sent,
+in batches to the bulk endpoints.
 """
-import requests
-import datetime
+import argparse
+import csv
+import json
+import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
 
 BASE_URL = "http://localhost:5000/api"
 SESSION = requests.Session()
 
+PAGE_LIMIT = 1000
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_WORKERS = 4
+
+INT_FIELDS = {'established_year', 'current_season_position', 'jersey_number', 'rating', 'team_id'}
+FLOAT_FIELDS = {'team_value', 'height', 'weight', 'salary', 'player_value'}
+BOOL_FIELDS = {'is_injured'}
+
 TEAMS = [
     {
         "name": "FC Barcelona", "established_year": 1899, "home_stadium": "Camp Nou", "logo_url": "https://example.com/barcelona.png",
@@ -75,78 +97,163 @@ PLAYERS = [
 ]
 
 
+def configure_session(workers):
+    """Size the connection pool so concurrent batches reuse keep-alive connections."""
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(workers, 1))
+    SESSION.mount('http://', adapter)
+    SESSION.mount('https://', adapter)
+
+
+def fetch_all(path, fields):
+    """Page through a list endpoint with keyset pagination, fetching only ``fields``."""
+    url = f"{BASE_URL}/{path}"
+    params = {'fields': fields, 'limit': PAGE_LIMIT}
+    rows = []
+    while url:
+        resp = SESSION.get(url, params=params)
+        resp.raise_for_status()
+        page = resp.json()
+        rows.extend(page['items'])
+        url, params = page['next'], None
+    return rows
+
+
 def get_existing_teams():
-    resp = SESSION.get(f"{BASE_URL}/teams")
-    resp.raise_for_status()
-    return {t['name']: t for t in resp.json()}
+    return {t['name']: t['id'] for t in fetch_all('teams', 'id,name')}
 
 
 def get_existing_players():
-    resp = SESSION.get(f"{BASE_URL}/players")
-    resp.raise_for_status()
-    players = resp.json()
     # index by (full_name, team_id)
-    index = {}
-    for p in players:
-        index[(p['full_name'], p['team_id'])] = p
-    return index
+    return {(p['full_name'], p['team_id']): p['id'] for p in fetch_all('players', 'id,full_name,team_id')}
+
+
+def convert_row(row):
+    """Convert CSV strings to the JSON types the API expects; empty cells become None."""
+    converted = {}
+    for key, value in row.items():
+        if value is None or value == '':
+            converted[key] = None
+        elif key in INT_FIELDS:
+            converted[key] = int(float(value))
+        elif key in FLOAT_FIELDS:
+            converted[key] = float(value)
+        elif key in BOOL_FIELDS:
+            converted[key] = value.strip().lower() in ('1', 'true', 'yes', 'y')
+        else:
+            converted[key] = value
+    return converted
+
+
+def load_records(path, key):
+    """Load records from a CSV or JSON file; JSON may hold a list or {key: [...]}."""
+    if os.path.splitext(path)[1].lower() == '.csv':
+        with open(path, newline='', encoding='utf-8') as f:
+            return [convert_row(row) for row in csv.DictReader(f)]
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    return data.get(key, []) if isinstance(data, dict) else data
+
+
+def send_batches(path, items, batch_size, workers, label):
+    """POST ``items`` to a bulk endpoint in batches and return the created ids in order."""
+    batches = [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
 
+    def send(batch):
+        r = SESSION.post(f"{BASE_URL}/{path}/bulk", json=batch)
+        if r.status_code not in (200, 207, 400):
+            r.raise_for_status()
+        body = r.json()
+        if 'results' in body:
+            return body['results']
+        # A 400 without per-item results rejected the whole batch, e.g. a malformed payload
+        error = body.get('error', r.text)
+        if r.status_code == 400:
+            return [{'status': 'error', 'error': error}] * len(batch)
+        raise RuntimeError(f"{path} bulk request returned no results: {error}")
 
-def create_team_if_missing(team):
-    existing = get_existing_teams()
-    if team['name'] in existing:
-        print(f"Team exists: {team['name']}")
-        return existing[team['name']]['id']
-    r = SESSION.post(f"{BASE_URL}/teams", json=team)
-    if r.status_code not in (200,201):
-        print(f"Failed to create team {team['name']}: {r.status_code} {r.text}")
-        return None
-    data = r.json()
-    print(f"Created team {data['name']} (id={data['id']})")
-    return data['id']
+    ids = []
+    failed = 0
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+        for batch, results in zip(batches, pool.map(send, batches)):
+            for item, result in zip(batch, results):
+                if result['status'] == 'error':
+                    failed += 1
+                    print(f"Failed to create {label} {item.get('name') or item.get('full_name')}: {result['error']}")
+                ids.append(result.get('id'))
+    print(f"Created {len(items) - failed} {label}s in {len(batches)} batch(es)" + (f", {failed} failed" if failed else ""))
+    return ids
 
 
-def create_player_if_missing(player, team_id):
+def seed(teams, players, batch_size=DEFAULT_BATCH_SIZE, workers=DEFAULT_WORKERS):
+    name_to_id = get_existing_teams()
+    missing_teams = []
+    queued = set()
+    for t in teams:
+        if t['name'] in name_to_id or t['name'] in queued:
+            continue
+        queued.add(t['name'])
+        missing_teams.append(t)
+    if len(teams) > len(missing_teams):
+        print(f"{len(teams) - len(missing_teams)} team(s) already present")
+    # Teams must exist before their players are sent, so they go first
+    new_ids = send_batches('teams', missing_teams, batch_size, workers, 'team') if missing_teams else []
+    for t, tid in zip(missing_teams, new_ids):
+        if tid:
+            name_to_id[t['name']] = tid
+
     existing_players = get_existing_players()
-    key = (player['full_name'], team_id)
-    if key in existing_players:
-        print(f"Player exists: {player['full_name']} (team_id={team_id})")
-        return existing_players[key]['id']
-    payload = player.copy()
-    payload['team_id'] = team_id
-    r = SESSION.post(f"{BASE_URL}/players", json=payload)
-    if r.status_code not in (200,201):
-        print(f"Failed to create player {player['full_name']}: {r.status_code} {r.text}")
-        return None
-    data = r.json()
-    print(f"Created player {data['full_name']} (id={data['id']})")
-    return data['id']
+    missing_players = []
+    seen = set()
+    for p in players:
+        team_id = name_to_id.get(p.get('team_name')) or p.get('team_id')
+        if not team_id:
+            print(f"Skipping player {p['full_name']} - team missing: {p.get('team_name')}")
+            continue
+        key = (p['full_name'], team_id)
+        if key in existing_players or key in seen:
+            continue
+        seen.add(key)
+        payload = {k: v for k, v in p.items() if k != 'team_name'}
+        payload['team_id'] = team_id
+        missing_players.append(payload)
+    skipped = len(players) - len(missing_players)
+    if skipped:
+        print(f"{skipped} player(s) already present or skipped")
+    if missing_players:
+        send_batches('players', missing_players, batch_size, workers, 'player')
 
 
 def main():
+    global BASE_URL
+    parser = argparse.ArgumentParser(description='Seed the SoccerApp API with teams and players.')
+    parser.add_argument('--base-url', default=BASE_URL, help='API base URL (default: %(default)s)')
+    parser.add_argument('--input', help='JSON file with "teams" and "players" lists')
+    parser.add_argument('--teams', help='CSV or JSON file of teams')
+    parser.add_argument('--players', help='CSV or JSON file of players (team referenced by team_name)')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='concurrent batch requests')
+    args = parser.parse_args()
+
+    BASE_URL = args.base_url.rstrip('/')
+    configure_session(args.workers)
+
+    teams, players = TEAMS, PLAYERS
+    if args.input or args.teams or args.players:
+        teams = load_records(args.input, 'teams') if args.input else []
+        players = load_records(args.input, 'players') if args.input else []
+        if args.teams:
+            teams = load_records(args.teams, 'teams')
+        if args.players:
+            players = load_records(args.players, 'players')
+
     try:
-        existing = get_existing_teams()
+        SESSION.get(f"{BASE_URL}/teams", params={'fields': 'id', 'limit': 1}).raise_for_status()
     except Exception as e:
         print("API not reachable. Start the Flask server first (python app.py).")
         print(e)
         sys.exit(1)
 
-    name_to_id = {}
-    # Create teams
-    for t in TEAMS:
-        tid = create_team_if_missing(t)
-        if tid:
-            name_to_id[t['name']] = tid
-
-    # Create players
-    for p in PLAYERS:
-        team_name = p['team_name']
-        team_id = name_to_id.get(team_name)
-        if not team_id:
-            print(f"Skipping player {p['full_name']} - team missing: {team_name}")
-            continue
-        create_player_if_missing(p, team_id)
-
+    seed(teams, players, args.batch_size, args.workers)
     print("Seeding complete.")
 
 if __name__ == '__main__':
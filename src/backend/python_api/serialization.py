@@ -0,0 +1,64 @@
+"""Pluggable JSON encoding for API responses.
+
+``stdlib`` is always available; ``orjson`` is used when installed
+(``pip install orjson``). The ``JSON_BACKEND`` config key selects one
+explicitly, ``auto`` (the default) picks the fastest available. Both
+backends encode date/datetime values as ISO 8601 strings, so payloads can
+carry raw column values without a per-row ``to_dict()`` pass.
+"""
+
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from flask import Response, current_app
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def stdlib_dumps(obj):
+    return json.dumps(obj, default=_default, separators=(',', ':')).encode('utf-8')
+
+
+def orjson_dumps(obj):
+    # Report payloads are keyed by integer team ids
+    return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+BACKENDS = {'stdlib': stdlib_dumps}
+if orjson is not None:
+    BACKENDS['orjson'] = orjson_dumps
+
+
+def get_backend(name='auto'):
+    """Return the ``dumps`` function for ``name``; every backend returns bytes."""
+    if name == 'auto':
+        name = 'orjson' if 'orjson' in BACKENDS else 'stdlib'
+    if name not in BACKENDS:
+        raise ValueError(f"JSON backend '{name}' is not available (have: {', '.join(BACKENDS)})")
+    return BACKENDS[name]
+
+
+def init_app(app):
+    app.config.setdefault('JSON_BACKEND', 'auto')
+    app.extensions['json_dumps'] = get_backend(app.config['JSON_BACKEND'])
+
+
+def dumps(obj):
+    return current_app.extensions['json_dumps'](obj)
+
+
+def json_response(obj, status=200):
+    """Like ``jsonify`` but encoded with the configured backend."""
+    return Response(dumps(obj), status=status, mimetype='application/json')
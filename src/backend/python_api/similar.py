@@ -0,0 +1,139 @@
+"""Nearest-neighbour search for "players like this one".
+
+Every player is a row of standardized features (height, weight, rating,
+value, salary and date of birth, which orders players like age does);
+missing values sit at the mean. Two players are as far apart as the
+Euclidean distance between their rows, plus ``POSITION_PENALTY`` when
+they play different positions, so neighbours come from the same position
+unless nothing close is left there.
+
+``SimilarityIndexCache`` derives the index from the analytics player
+frame (see analytics.py). When that frame was patched from the change
+log, only the re-read players are recomputed here too; the mean and
+scale stay those of the last full build. A query is one matrix-vector
+product over all rows and an ``argpartition`` for the ``k`` smallest
+distances, so it takes milliseconds at millions of players;
+bench_similar.py compares it with a plain scan.
+"""
+
+import threading
+
+import numpy as np
+
+import analytics
+
+FEATURES = ('height', 'weight', 'rating', 'player_value', 'salary', 'birth_day')
+# Added to the squared distance of players in another position: four
+# standard deviations in a single feature
+POSITION_PENALTY = 16.0
+
+
+class SimilarityIndex:
+    """Standardized feature rows of the players, sorted by id."""
+
+    def __init__(self, seq, ids, matrix, position, alive, mean, scale):
+        self.seq = seq
+        self.ids = ids
+        self.matrix = matrix
+        # Queries read one feature at a time across all rows, which is
+        # several times faster on a (features, players) layout
+        self.columns = np.ascontiguousarray(matrix.T)
+        # Squared row norms; infinite for deleted rows so they are never picked
+        self.norms = np.where(alive, np.einsum('ij,ij->i', matrix, matrix), np.float32(np.inf))
+        self.position = position
+        self.alive = alive
+        self.mean = mean
+        self.scale = scale
+
+    @classmethod
+    def build(cls, frame):
+        raw = feature_columns(frame, slice(None))
+        live = raw[frame.alive]
+        with np.errstate(invalid='ignore'):
+            mean = np.nanmean(live, axis=0) if len(live) else np.zeros(len(FEATURES))
+            std = np.nanstd(live, axis=0) if len(live) else np.ones(len(FEATURES))
+        mean = np.nan_to_num(mean)
+        # Constant or empty features carry no information; leave them unscaled
+        scale = 1 / np.where(np.nan_to_num(std) > 0, std, 1)
+        return cls(frame.seq, frame.ids, standardize(raw, mean, scale), frame.position, frame.alive, mean, scale)
+
+    def patched(self, frame):
+        """A copy updated with the players ``frame`` re-read since this index's frame."""
+        changed = np.unique(frame.changed_ids)
+        slots = np.searchsorted(frame.ids, changed)
+        present = slots < len(frame.ids)
+        present[present] = frame.ids[slots[present]] == changed[present]
+        present[present] = frame.alive[slots[present]]
+        slots = slots[present]
+
+        new_rows = {
+            'matrix': standardize(feature_columns(frame, slots), self.mean, self.scale),
+            'position': frame.position[slots],
+        }
+        ids, arrays, alive = analytics.merge_rows(
+            self.ids, {'matrix': self.matrix, 'position': self.position}, self.alive,
+            changed[present], new_rows, changed[~present])
+        return SimilarityIndex(frame.seq, ids, arrays['matrix'], arrays['position'], alive, self.mean, self.scale)
+
+    def nearest(self, player_id, k):
+        """The ``k`` players closest to ``player_id`` as (ids, distances), nearest first.
+
+        Raises KeyError when the player is not in the index.
+        """
+        slot = int(np.searchsorted(self.ids, player_id))
+        if slot >= len(self.ids) or self.ids[slot] != player_id or not self.alive[slot]:
+            raise KeyError(player_id)
+        query = self.matrix[slot]
+        # |a - q|^2 = |a|^2 - 2 a.q + |q|^2, one matrix-vector product for all rows
+        distances = self.norms - 2 * (query @ self.columns) + self.norms[slot]
+        distances += (self.position != self.position[slot]) * np.float32(POSITION_PENALTY)
+        distances[slot] = np.inf
+
+        k = min(k, int(self.alive.sum()) - 1)
+        if k <= 0:
+            return np.array([], dtype=np.int64), np.array([])
+        nearest = np.argpartition(distances, k - 1)[:k]
+        # Ties are broken by id so the answer does not depend on the partition
+        nearest = nearest[np.lexsort((self.ids[nearest], distances[nearest]))]
+        return self.ids[nearest], np.sqrt(np.maximum(distances[nearest], 0))
+
+
+def feature_columns(frame, rows):
+    return np.column_stack([frame.columns[name][rows] for name in FEATURES])
+
+
+def standardize(raw, mean, scale):
+    matrix = (raw - mean) * scale
+    return np.nan_to_num(matrix, nan=0.0).astype(np.float32)
+
+
+class SimilarityIndexCache:
+    """The index for the current frame of a ``PlayerFrameCache``."""
+
+    def __init__(self, frames):
+        self.frames = frames
+        self._index = None
+        self._lock = threading.Lock()
+        self.builds = 0
+        self.patches = 0
+
+    def clear(self):
+        with self._lock:
+            self._index = None
+
+    def get(self, session):
+        frame = self.frames.get(session)
+        index = self._index
+        if index is not None and index.seq == frame.seq:
+            return index
+        with self._lock:
+            index = self._index
+            if index is None or index.seq != frame.seq:
+                if index is not None and frame.base_seq == index.seq:
+                    self.patches += 1
+                    index = index.patched(frame)
+                else:
+                    self.builds += 1
+                    index = SimilarityIndex.build(frame)
+                self._index = index
+            return index
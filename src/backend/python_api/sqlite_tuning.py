@@ -0,0 +1,101 @@
+"""SQLite connection tuning: PRAGMA profiles and connection pool settings.
+
+The active profile is chosen with the ``SQLITE_PROFILE`` config key
+(``performance`` by default) and individual pragmas can be overridden
+through ``SQLITE_PRAGMAS``. Pragmas are applied to every new DBAPI
+connection, since most of them (cache_size, mmap_size, busy_timeout, ...)
+are per-connection settings.
+"""
+
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+PROFILES = {
+    # SQLite's own defaults: rollback journal, synchronous=FULL
+    'default': {},
+    'performance': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -65536,       # negative values are KiB, i.e. 64 MiB
+        'mmap_size': 268435456,     # 256 MiB
+        'temp_store': 'MEMORY',
+        'busy_timeout': 5000,       # ms to wait on a locked database
+    },
+}
+
+POOL_DEFAULTS = {
+    'SQLITE_POOL_SIZE': 8,
+    'SQLITE_MAX_OVERFLOW': 8,
+    'SQLITE_POOL_TIMEOUT': 30,
+}
+
+
+def resolve_pragmas(profile='performance', overrides=None):
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown SQLite profile: {profile}")
+    pragmas = dict(PROFILES[profile])
+    pragmas.update(overrides or {})
+    return pragmas
+
+
+def apply_pragmas(dbapi_connection, pragmas):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+def install_pragmas(engine, pragmas):
+    """Run ``pragmas`` on every connection the engine opens."""
+    if pragmas:
+        event.listen(engine, 'connect', lambda dbapi_connection, record: apply_pragmas(dbapi_connection, pragmas))
+
+
+def pool_options(config):
+    # Pooled connections are handed between threads, which pysqlite refuses by default
+    return {
+        'connect_args': {'check_same_thread': False},
+        'poolclass': QueuePool,
+        'pool_size': config['SQLITE_POOL_SIZE'],
+        'max_overflow': config['SQLITE_MAX_OVERFLOW'],
+        'pool_timeout': config['SQLITE_POOL_TIMEOUT'],
+    }
+
+
+class TunedSQLAlchemy(SQLAlchemy):
+    """Flask-SQLAlchemy with pooled, pragma-tuned SQLite engines.
+
+    Flask-SQLAlchemy 2.x falls back to NullPool for file databases, which
+    reopens the file (and drops the page cache) on every checkout. Settings
+    are read from the config of the app each engine is created for.
+    """
+
+    def init_app(self, app):
+        for key, value in POOL_DEFAULTS.items():
+            app.config.setdefault(key, value)
+        app.config.setdefault('SQLITE_PROFILE', 'performance')
+        app.config.setdefault('SQLITE_PRAGMAS', {})
+        resolve_pragmas(app.config['SQLITE_PROFILE'])  # fail fast on an unknown profile
+        super().init_app(app)
+
+    def apply_driver_hacks(self, app, sa_url, options):
+        if sa_url.drivername == 'sqlite':
+            in_memory = sa_url.database in (None, '', ':memory:')
+            if not in_memory:
+                for key, value in pool_options(app.config).items():
+                    if key == 'connect_args':
+                        options['connect_args'] = {**value, **options.get('connect_args', {})}
+                    else:
+                        options.setdefault(key, value)
+            # Handed to create_engine below, which has no access to the app
+            options['sqlite_pragmas'] = resolve_pragmas(app.config['SQLITE_PROFILE'], app.config['SQLITE_PRAGMAS'])
+        return super().apply_driver_hacks(app, sa_url, options)
+
+    def create_engine(self, sa_url, engine_opts):
+        pragmas = engine_opts.pop('sqlite_pragmas', None)
+        engine = super().create_engine(sa_url, engine_opts)
+        install_pragmas(engine, pragmas)
+        return engine
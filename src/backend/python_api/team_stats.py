@@ -0,0 +1,286 @@
+"""Per-team aggregates kept up to date by SQLite triggers.
+
+``team_stats`` holds one row per team with its player, injury, rating and
+value totals; ``team_stat_counts`` holds the position and nationality
+histograms. Triggers on ``players`` and ``teams`` apply deltas in the
+writing transaction: an insert adds the new row's values, a delete
+subtracts the old ones, and an update does both, so every writer (ORM,
+bulk endpoints or raw SQL) keeps them current without recomputing a team.
+
+Ratings and values missing on a player count as 0, as the reports always
+did. Summing deltas of REAL values can drift from a fresh sum by rounding
+error; ``verify_team_stats`` reports drift beyond a small tolerance and
+``rebuild_team_stats`` recomputes everything:
+
+    python team_stats.py verify
+    python team_stats.py rebuild
+"""
+
+import argparse
+import sys
+
+from sqlalchemy import bindparam, text
+
+HISTOGRAM_KINDS = ('position', 'nationality')
+TOTAL_COLUMNS = ('player_count', 'injured_count', 'total_rating', 'total_value')
+# Relative tolerance for total_value, which accumulates float rounding
+VALUE_TOLERANCE = 1e-9
+
+# Subtract a player's old row from its team, then add the new one.
+# Histogram counts only move when the team or the value changed.
+_REMOVE_OLD = """
+        UPDATE team_stats SET
+            player_count = player_count - 1,
+            injured_count = injured_count - (old.is_injured IS 1),
+            total_rating = total_rating - coalesce(old.rating, 0),
+            total_value = total_value - coalesce(old.player_value, 0)
+        WHERE team_id = old.team_id;"""
+_ADD_NEW = """
+        UPDATE team_stats SET
+            player_count = player_count + 1,
+            injured_count = injured_count + (new.is_injured IS 1),
+            total_rating = total_rating + coalesce(new.rating, 0),
+            total_value = total_value + coalesce(new.player_value, 0)
+        WHERE team_id = new.team_id;"""
+
+
+def _decrement(kind, changed='1'):
+    return f"""
+        UPDATE team_stat_counts SET count = count - 1
+        WHERE team_id = old.team_id AND kind = '{kind}' AND value = old.{kind} AND {changed};"""
+
+
+def _increment(kind, changed='1'):
+    return f"""
+        INSERT INTO team_stat_counts (team_id, kind, value, count)
+        SELECT new.team_id, '{kind}', new.{kind}, 1
+        WHERE new.{kind} IS NOT NULL AND {changed}
+          AND EXISTS (SELECT 1 FROM team_stats WHERE team_id = new.team_id)
+        ON CONFLICT (team_id, kind, value) DO UPDATE SET count = count + 1;"""
+
+
+_DROP_EMPTY = """
+        DELETE FROM team_stat_counts WHERE team_id = old.team_id AND count <= 0;"""
+
+
+def _changed(kind):
+    return f"(old.team_id IS NOT new.team_id OR old.{kind} IS NOT new.{kind})"
+
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS team_stats (
+        team_id INTEGER PRIMARY KEY,
+        player_count INTEGER NOT NULL DEFAULT 0,
+        injured_count INTEGER NOT NULL DEFAULT 0,
+        total_rating INTEGER NOT NULL DEFAULT 0,
+        total_value REAL NOT NULL DEFAULT 0)""",
+    """CREATE TABLE IF NOT EXISTS team_stat_counts (
+        team_id INTEGER NOT NULL,
+        kind TEXT NOT NULL,
+        value TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (team_id, kind, value)) WITHOUT ROWID""",
+    """CREATE TRIGGER IF NOT EXISTS teams_stats_insert AFTER INSERT ON teams BEGIN
+        INSERT OR IGNORE INTO team_stats (team_id) VALUES (new.id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS teams_stats_delete AFTER DELETE ON teams BEGIN
+        DELETE FROM team_stats WHERE team_id = old.id;
+        DELETE FROM team_stat_counts WHERE team_id = old.id;
+    END""",
+    "CREATE TRIGGER IF NOT EXISTS players_stats_insert AFTER INSERT ON players BEGIN"
+    + _ADD_NEW + ''.join(_increment(kind) for kind in HISTOGRAM_KINDS) + "\n    END",
+    "CREATE TRIGGER IF NOT EXISTS players_stats_delete AFTER DELETE ON players BEGIN"
+    + _REMOVE_OLD + ''.join(_decrement(kind) for kind in HISTOGRAM_KINDS) + _DROP_EMPTY + "\n    END",
+    "CREATE TRIGGER IF NOT EXISTS players_stats_update "
+    "AFTER UPDATE OF team_id, is_injured, rating, player_value, position, nationality ON players BEGIN"
+    + _REMOVE_OLD + _ADD_NEW
+    + ''.join(_decrement(kind, _changed(kind)) + _increment(kind, _changed(kind)) for kind in HISTOGRAM_KINDS)
+    + _DROP_EMPTY + "\n    END",
+]
+
+TRIGGERS = ['teams_stats_insert', 'teams_stats_delete',
+            'players_stats_insert', 'players_stats_delete', 'players_stats_update']
+
+# The aggregates as computed from scratch, used by rebuild and verify
+FRESH_TOTALS = """
+    SELECT t.id AS team_id, count(p.id) AS player_count,
+           coalesce(sum(p.is_injured IS 1), 0) AS injured_count,
+           coalesce(sum(coalesce(p.rating, 0)), 0) AS total_rating,
+           coalesce(sum(coalesce(p.player_value, 0)), 0) AS total_value
+    FROM teams t LEFT JOIN players p ON p.team_id = t.id
+    GROUP BY t.id"""
+FRESH_COUNTS = " UNION ALL ".join(
+    f"SELECT p.team_id, '{kind}' AS kind, p.{kind} AS value, count(*) AS count "
+    f"FROM players p JOIN teams t ON t.id = p.team_id WHERE p.{kind} IS NOT NULL GROUP BY p.team_id, p.{kind}"
+    for kind in HISTOGRAM_KINDS)
+
+
+def ensure_team_stats(session):
+    """Create the tables and triggers if missing, filling them on first creation."""
+    exists = session.execute(text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'team_stats'")).first()
+    for statement in SCHEMA:
+        session.execute(text(statement))
+    if not exists:
+        rebuild_team_stats(session)
+    session.commit()
+
+
+def rebuild_team_stats(session):
+    """Recompute both tables from ``teams`` and ``players``."""
+    session.execute(text("DELETE FROM team_stats"))
+    session.execute(text("DELETE FROM team_stat_counts"))
+    session.execute(text(f"INSERT INTO team_stats ({', '.join(('team_id',) + TOTAL_COLUMNS)}) {FRESH_TOTALS}"))
+    session.execute(text(f"INSERT INTO team_stat_counts (team_id, kind, value, count) {FRESH_COUNTS}"))
+
+
+def drop_team_stats(session):
+    for trigger in TRIGGERS:
+        session.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+    session.execute(text("DROP TABLE IF EXISTS team_stats"))
+    session.execute(text("DROP TABLE IF EXISTS team_stat_counts"))
+    session.commit()
+
+
+def _differs(column, stored, actual):
+    if stored is None or actual is None:
+        return stored != actual
+    if column == 'total_value':
+        return abs(stored - actual) > VALUE_TOLERANCE * max(1.0, abs(actual))
+    return stored != actual
+
+
+def verify_team_stats(session):
+    """Compare the stored aggregates with a fresh computation.
+
+    Returns a list of mismatches as dicts with ``team_id``, ``field``,
+    ``stored`` and ``actual``; empty when everything matches.
+    """
+    problems = []
+    stored = {row.team_id: row for row in session.execute(text(
+        f"SELECT team_id, {', '.join(TOTAL_COLUMNS)} FROM team_stats"))}
+    for row in session.execute(text(FRESH_TOTALS)):
+        current = stored.pop(row.team_id, None)
+        if current is None:
+            problems.append({'team_id': row.team_id, 'field': 'row', 'stored': None, 'actual': 'present'})
+            continue
+        for column in TOTAL_COLUMNS:
+            if _differs(column, getattr(current, column), getattr(row, column)):
+                problems.append({'team_id': row.team_id, 'field': column,
+                                 'stored': getattr(current, column), 'actual': getattr(row, column)})
+    for team_id in stored:
+        problems.append({'team_id': team_id, 'field': 'row', 'stored': 'present', 'actual': None})
+
+    stored_counts = {(r.team_id, r.kind, r.value): r.count for r in session.execute(text(
+        "SELECT team_id, kind, value, count FROM team_stat_counts"))}
+    fresh_counts = {(r.team_id, r.kind, r.value): r.count for r in session.execute(text(FRESH_COUNTS))}
+    for key in sorted(set(stored_counts) | set(fresh_counts), key=repr):
+        if stored_counts.get(key) != fresh_counts.get(key):
+            team_id, kind, value = key
+            problems.append({'team_id': team_id, 'field': f"{kind}:{value}",
+                             'stored': stored_counts.get(key), 'actual': fresh_counts.get(key)})
+    return problems
+
+
+def team_totals(session, team_id):
+    """The stored totals row of a team, or None."""
+    return session.execute(text(
+        f"SELECT {', '.join(TOTAL_COLUMNS)} FROM team_stats WHERE team_id = :team_id"),
+        {'team_id': team_id}).first()
+
+
+def team_histograms(session, team_id):
+    """Position and nationality counts of a team: ``{kind: {value: count}}``."""
+    histograms = {kind: {} for kind in HISTOGRAM_KINDS}
+    rows = session.execute(text(
+        "SELECT kind, value, count FROM team_stat_counts WHERE team_id = :team_id ORDER BY kind, value"),
+        {'team_id': team_id})
+    for kind, value, count in rows:
+        histograms[kind][value] = count
+    return histograms
+
+
+def totals_of_teams(session, team_ids):
+    """Stored totals rows of several teams, keyed by team id; missing teams are left out."""
+    rows = session.execute(text(
+        f"SELECT team_id, {', '.join(TOTAL_COLUMNS)} FROM team_stats WHERE team_id IN :team_ids"
+    ).bindparams(bindparam('team_ids', expanding=True)), {'team_ids': list(team_ids)})
+    return {row.team_id: row for row in rows}
+
+
+def histograms_of_teams(session, team_ids):
+    """``team_histograms`` of several teams in one query: ``{team_id: {kind: {value: count}}}``."""
+    histograms = {team_id: {kind: {} for kind in HISTOGRAM_KINDS} for team_id in team_ids}
+    rows = session.execute(text(
+        "SELECT team_id, kind, value, count FROM team_stat_counts WHERE team_id IN :team_ids "
+        "ORDER BY team_id, kind, value").bindparams(bindparam('team_ids', expanding=True)),
+        {'team_ids': list(team_ids)})
+    for team_id, kind, value, count in rows:
+        histograms[team_id][kind][value] = count
+    return histograms
+
+
+def _team_filters(league, country):
+    where, params = [], {}
+    if league:
+        where.append("t.league = :league")
+        params['league'] = league
+    if country:
+        where.append("t.country = :country")
+        params['country'] = country
+    return (f"WHERE {' AND '.join(where)}" if where else ''), params
+
+
+def all_team_totals(session, league=None, country=None):
+    """Team identity and stored totals of every matching team, ordered by id."""
+    where, params = _team_filters(league, country)
+    return session.execute(text(
+        f"SELECT t.id, t.name, t.country, t.league, {', '.join('s.' + c for c in TOTAL_COLUMNS)} "
+        f"FROM teams t JOIN team_stats s ON s.team_id = t.id {where} ORDER BY t.id"), params).all()
+
+
+def all_team_histograms(session, league=None, country=None):
+    """(team_id, kind, value, count) rows for every matching team."""
+    where, params = _team_filters(league, country)
+    if not where:
+        return session.execute(text(
+            "SELECT team_id, kind, value, count FROM team_stat_counts ORDER BY team_id, kind, value")).all()
+    return session.execute(text(
+        "SELECT c.team_id, c.kind, c.value, c.count FROM team_stat_counts c "
+        f"JOIN teams t ON t.id = c.team_id {where} ORDER BY c.team_id, c.kind, c.value"), params).all()
+
+
+def league_totals(session):
+    """(league, teams, players, injured players) per league, summed over ``team_stats``."""
+    return session.execute(text(
+        "SELECT t.league, count(*), coalesce(sum(s.player_count), 0), coalesce(sum(s.injured_count), 0) "
+        "FROM teams t JOIN team_stats s ON s.team_id = t.id GROUP BY t.league")).all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check or repair the per-team aggregate tables.')
+    parser.add_argument('command', choices=('verify', 'rebuild'))
+    args = parser.parse_args()
+
+    from app import bump_data_version, create_app, db
+
+    app = create_app()
+    with app.app_context():
+        if args.command == 'rebuild':
+            ensure_team_stats(db.session)
+            rebuild_team_stats(db.session)
+            # Reports built from the drifted figures must not be served as current
+            bump_data_version(db.session, 'players')
+            db.session.commit()
+            print("Rebuilt team_stats")
+            return 0
+        problems = verify_team_stats(db.session)
+        for problem in problems:
+            print(f"team {problem['team_id']}: {problem['field']} stored={problem['stored']} "
+                  f"actual={problem['actual']}")
+        print(f"{len(problems)} mismatches" if problems else "team_stats is consistent")
+        return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,156 @@
+import unittest
+from datetime import date, timedelta
+
+import numpy as np
+from sqlalchemy import text
+
+import analytics
+from app import analytics_frames, db, Player
+from test_app import ApiTestCase
+
+
+class TestStatistics(unittest.TestCase):
+    def test_describe_matches_numpy(self):
+        values = np.array([5.0, 1.0, np.nan, 3.0, 9.0, 7.0])
+        summary = analytics.describe(values, percentiles=(10, 50, 90))
+        clean = values[~np.isnan(values)]
+        self.assertEqual(summary['count'], 5)
+        self.assertAlmostEqual(summary['mean'], clean.mean())
+        self.assertAlmostEqual(summary['std'], clean.std())
+        self.assertEqual((summary['min'], summary['max']), (1.0, 9.0))
+        self.assertEqual(list(summary['percentiles'].values()), list(np.percentile(clean, (10, 50, 90))))
+        self.assertIsNone(analytics.describe(np.array([np.nan]))['mean'])
+
+    def test_grouped_matches_per_group_numpy(self):
+        rng = np.random.default_rng(7)
+        codes = rng.integers(-1, 5, 2000)
+        values = rng.normal(100, 15, 2000)
+        values[::17] = np.nan
+        names = ['a', 'b', 'c', 'd', 'e']
+        result = analytics.grouped(codes, values, names, percentiles=(10, 50, 95))
+        for code, name in enumerate(names):
+            group = values[(codes == code) & ~np.isnan(values)]
+            self.assertEqual(result[name]['count'], len(group))
+            self.assertAlmostEqual(result[name]['mean'], group.mean())
+            self.assertAlmostEqual(result[name]['std'], group.std())
+            for p in (10, 50, 95):
+                self.assertAlmostEqual(result[name][f"p{p}"], np.percentile(group, p))
+
+    def test_grouped_skips_empty_and_unknown_groups(self):
+        result = analytics.grouped(np.array([0, 0, 2, 5]), np.array([1.0, 3.0, np.nan, 4.0]), ['x', 'y', 'z'])
+        self.assertEqual(list(result), ['x'])
+        self.assertEqual(result['x']['p50'], 2.0)
+
+    def test_age_curve_buckets_whole_years(self):
+        curve = analytics.age_curve(np.array([20.2, 20.9, 21.5, 50.0]), np.array([1.0, 3.0, 5.0, 7.0]), 20, 30)
+        self.assertEqual(curve[20]['count'], 2)
+        self.assertEqual(curve[20]['mean'], 2.0)
+        self.assertEqual(curve[21]['p50'], 5.0)
+        self.assertNotIn(50, curve)
+
+    def test_julian_day_matches_sqlite(self):
+        self.assertEqual(analytics.julian_day(date(2000, 1, 1)), 2451544.5)
+
+
+class TestAnalyticsEndpoints(ApiTestCase):
+    def values(self, column, *criteria):
+        return np.array([v for (v,) in db.session.query(column).filter(*criteria)], dtype=float)
+
+    def test_distribution(self):
+        body = self.client.get('/api/analytics/distribution?metric=player_value&bins=5').get_json()
+        values = self.values(Player.player_value)
+        self.assertEqual(body['summary']['count'], 30)
+        self.assertAlmostEqual(body['summary']['std'], values.std())
+        self.assertEqual(body['summary']['percentiles']['p90'], np.percentile(values, 90))
+        counts, edges = np.histogram(values, bins=5)
+        self.assertEqual(body['histogram'], {'edges': edges.tolist(), 'counts': counts.tolist()})
+
+    def test_filters(self):
+        body = self.client.get('/api/analytics/distribution?metric=rating&league=La Liga&position=Forward').get_json()
+        self.assertEqual(body['summary']['count'], 4)
+        body = self.client.get('/api/analytics/distribution?team_id=3&country=England').get_json()
+        self.assertEqual(body['summary']['count'], 10)
+        body = self.client.get('/api/analytics/distribution?league=Nowhere').get_json()
+        self.assertEqual(body['summary']['count'], 0)
+
+    def test_ratios_by_league(self):
+        db.session.execute(text("UPDATE players SET salary = player_value / 10 WHERE team_id = 3"))
+        db.session.commit()
+        groups = self.client.get('/api/analytics/groups?metric=salary_to_value&by=league').get_json()['groups']
+        # Only the Premier League players have a salary
+        self.assertEqual(list(groups), ['Premier League'])
+        self.assertAlmostEqual(groups['Premier League']['mean'], 0.1)
+
+        groups = self.client.get('/api/analytics/groups?metric=value_per_rating&by=position').get_json()['groups']
+        values = self.values(Player.player_value / Player.rating, Player.position == 'Goalkeeper')
+        self.assertEqual(groups['Goalkeeper']['count'], len(values))
+        self.assertAlmostEqual(groups['Goalkeeper']['p50'], np.median(values))
+
+    def test_age_curve(self):
+        # Odd ratings are 21.25 years old, even ones 20.25
+        for player in Player.query.filter_by(team_id=1):
+            age = 20.25 + player.rating % 2
+            player.date_of_birth = date.today() - timedelta(days=round(age * analytics.DAYS_PER_YEAR))
+        db.session.commit()
+        body = self.client.get('/api/analytics/age-curve?metric=rating&team_id=1').get_json()
+        ages = {row['age']: row for row in body['ages']}
+        self.assertEqual(list(ages), [20, 21])
+        self.assertEqual((ages[20]['count'], ages[20]['mean']), (5, 6.0))
+        self.assertEqual((ages[21]['count'], ages[21]['mean']), (5, 5.0))
+        self.assertEqual(self.client.get('/api/analytics/age-curve?metric=age').status_code, 400)
+
+    def test_invalid_arguments(self):
+        for url in ('/api/analytics/distribution?metric=height_in_feet',
+                    '/api/analytics/distribution?bins=0',
+                    '/api/analytics/distribution?team_id=x',
+                    '/api/analytics/groups?by=shirt',
+                    '/api/analytics/age-curve?min_age=40&max_age=20'):
+            self.assertEqual(self.client.get(url).status_code, 400, url)
+
+
+class TestPlayerFrameCache(ApiTestCase):
+    def assert_matches_fresh_load(self, frame):
+        fresh = analytics.load_frame(db.session)
+        live = frame.ids[frame.alive]
+        np.testing.assert_array_equal(live, fresh.ids)
+        for name in analytics.COLUMNS:
+            np.testing.assert_array_equal(frame.columns[name][frame.alive], fresh.columns[name])
+        positions = [frame.position_names[c] if c >= 0 else None for c in frame.position[frame.alive]]
+        self.assertEqual(positions, [fresh.position_names[c] if c >= 0 else None for c in fresh.position])
+
+    def test_refresh_applies_only_the_changes(self):
+        frame = analytics_frames.get(db.session)
+        self.assertIs(analytics_frames.get(db.session), frame)
+
+        self.client.put('/api/players/1', json={'rating': 99, 'position': 'Sweeper'})
+        self.client.delete('/api/players/2')
+        self.client.post('/api/players', json={'full_name': 'New', 'team_id': 3, 'player_value': 5.0})
+        self.client.post('/api/teams', json={'name': 'Team 3', 'country': 'Italy', 'league': 'Serie A'})
+        db.session.execute(text("UPDATE players SET team_id = 4 WHERE id = 30"))
+        db.session.commit()
+
+        full_loads = analytics_frames.full_loads
+        frame = analytics_frames.get(db.session)
+        self.assertEqual(analytics_frames.full_loads, full_loads)
+        self.assertEqual(len(frame), 30)
+        self.assert_matches_fresh_load(frame)
+        self.assertEqual(int(frame.mask(league='Serie A').sum()), 1)
+        self.assertEqual(int(frame.mask(position='Sweeper').sum()), 1)
+        self.assertIs(frame.mask(league='La Liga')[frame.ids == 2][0], np.False_)
+
+    def test_large_changes_reload(self):
+        analytics_frames.get(db.session)
+        analytics.MIN_DELTA_ROWS, old = 2, analytics.MIN_DELTA_ROWS
+        try:
+            db.session.execute(text("UPDATE players SET rating = rating + 1"))
+            db.session.commit()
+            full_loads = analytics_frames.full_loads
+            frame = analytics_frames.get(db.session)
+        finally:
+            analytics.MIN_DELTA_ROWS = old
+        self.assertEqual(analytics_frames.full_loads, full_loads + 1)
+        self.assert_matches_fresh_load(frame)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,529 @@
+import io
+import json
+import math
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+
+from sqlalchemy import text
+
+import app as app_module
+from app import analytics_frames, create_app, db, report_cache, similar_players, Team, Player
+import change_log
+from report_cache import ReportCache
+import search as search_index
+import team_stats
+
+app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+
+
+class ApiTestCase(unittest.TestCase):
+    def setUp(self):
+        self.ctx = app.app_context()
+        self.ctx.push()
+        db.create_all()
+        search_index.ensure_search_index(db.session)
+        team_stats.ensure_team_stats(db.session)
+        change_log.ensure_change_log(db.session)
+        self.client = app.test_client()
+        report_cache.clear()
+        analytics_frames.clear()
+        similar_players.clear()
+        self.seed()
+
+    def tearDown(self):
+        db.session.remove()
+        search_index.drop_search_index(db.session)
+        team_stats.drop_team_stats(db.session)
+        change_log.drop_change_log(db.session)
+        db.drop_all()
+        self.ctx.pop()
+
+    def seed(self):
+        positions = ['Goalkeeper', 'Defender', 'Midfielder', 'Forward']
+        for t in range(3):
+            team = Team(name=f"Team {t}", country='Spain' if t < 2 else 'England',
+                        league='La Liga' if t < 2 else 'Premier League')
+            db.session.add(team)
+            db.session.flush()
+            for p in range(10):
+                db.session.add(Player(
+                    full_name=f"Player {t}-{p}", nationality='Spain' if p % 2 else 'Brazil',
+                    position=positions[p % 4], team_id=team.id, rating=(p % 10) + 1,
+                    player_value=float((p + 1) * 1000000), is_injured=(p % 5 == 0)
+                ))
+        db.session.commit()
+
+
+class TestListEndpoints(ApiTestCase):
+    def test_legacy_list_returns_array(self):
+        resp = self.client.get('/api/players')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.get_json()), 30)
+
+    def test_keyset_pagination_walks_all_rows(self):
+        seen = []
+        url = '/api/players?limit=7'
+        while url:
+            body = self.client.get(url).get_json()
+            seen.extend(p['id'] for p in body['items'])
+            url = body['next']
+            if url:
+                self.assertIn(f"after={body['next_cursor']}", url)
+        self.assertEqual(seen, sorted(seen))
+        self.assertEqual(len(seen), 30)
+
+    def test_pagination_keeps_filters(self):
+        body = self.client.get('/api/players?team_id=1&injured=true&limit=1').get_json()
+        self.assertEqual(len(body['items']), 1)
+        self.assertIn('team_id=1', body['next'])
+        self.assertIn('injured=true', body['next'])
+        body = self.client.get(body['next']).get_json()
+        self.assertEqual(body['items'][0]['team_id'], 1)
+        self.assertIsNone(body['next'])
+
+    def test_team_id_zero_is_a_filter(self):
+        self.assertEqual(self.client.get('/api/players?team_id=0').get_json(), [])
+
+    def test_field_projection(self):
+        teams = self.client.get('/api/teams?league=La Liga&fields=name,country').get_json()
+        self.assertEqual(len(teams), 2)
+        self.assertEqual(set(teams[0]), {'name', 'country'})
+
+    def test_invalid_arguments(self):
+        self.assertEqual(self.client.get('/api/players?fields=nope').status_code, 400)
+        self.assertEqual(self.client.get('/api/players?limit=0').status_code, 400)
+        self.assertEqual(self.client.get(f"/api/players?limit={app_module.MAX_PAGE_LIMIT + 1}").status_code, 400)
+        self.assertEqual(self.client.get('/api/players?after=x').status_code, 400)
+
+
+class TestStreaming(ApiTestCase):
+    def read_ndjson(self, resp):
+        self.assertEqual(resp.mimetype, 'application/x-ndjson')
+        return [json.loads(line) for line in resp.get_data(as_text=True).splitlines()]
+
+    def test_stream_query_param(self):
+        rows = self.read_ndjson(self.client.get('/api/players?stream=1'))
+        self.assertEqual(len(rows), 30)
+        self.assertEqual([r['id'] for r in rows], sorted(r['id'] for r in rows))
+
+    def test_stream_accept_header_with_filters_and_fields(self):
+        resp = self.client.get('/api/teams?country=Spain&fields=name',
+                               headers={'Accept': 'application/x-ndjson'})
+        self.assertEqual(self.read_ndjson(resp), [{'name': 'Team 0'}, {'name': 'Team 1'}])
+
+    def test_stream_chunks(self):
+        app_module.STREAM_CHUNK_ROWS, old = 4, app_module.STREAM_CHUNK_ROWS
+        try:
+            resp = self.client.get('/api/players?stream=1&after=5&limit=10')
+            chunks = list(resp.response)
+        finally:
+            app_module.STREAM_CHUNK_ROWS = old
+        self.assertEqual(len(chunks), 3)
+        rows = [json.loads(line) for line in b''.join(chunks).decode().splitlines()]
+        self.assertEqual([r['id'] for r in rows], list(range(6, 16)))
+
+
+class TestReports(ApiTestCase):
+    def test_team_composition(self):
+        report = self.client.get('/api/reports/team-composition?team_id=1').get_json()
+        self.assertEqual(report['total_players'], 10)
+        self.assertEqual(report['positions'], {'Goalkeeper': 3, 'Defender': 3, 'Midfielder': 2, 'Forward': 2})
+        self.assertEqual(report['nationalities'], {'Spain': 5, 'Brazil': 5})
+        self.assertEqual(report['average_rating'], 5.5)
+        self.assertEqual(report['total_value'], 55000000.0)
+        self.assertEqual([p['full_name'] for p in report['injured_players']], ['Player 0-0', 'Player 0-5'])
+
+    def test_ranked_reports(self):
+        report = self.client.get('/api/reports/player-performance?team_id=2').get_json()
+        ratings = [p['rating'] for p in report['players']]
+        self.assertEqual(ratings, sorted(ratings, reverse=True))
+        self.assertEqual(report['highest_rated']['rating'], 10)
+        self.assertEqual(report['lowest_rated']['rating'], 1)
+        report = self.client.get('/api/reports/value-report?team_id=2').get_json()
+        self.assertEqual(report['most_valuable']['player_value'], 10000000.0)
+        self.assertEqual(report['average_value'], 5500000.0)
+
+    def test_injury_report(self):
+        report = self.client.get('/api/reports/injury-report?team_id=3').get_json()
+        self.assertEqual(report['total_players'], 10)
+        self.assertEqual(len(report['injured_players']), 2)
+        self.assertEqual(report['injury_rate'], 20.0)
+
+    def test_empty_team_and_errors(self):
+        db.session.add(Team(name='Empty'))
+        db.session.commit()
+        report = self.client.get('/api/reports/value-report?team_id=4').get_json()
+        self.assertEqual(report['players'], [])
+        self.assertIsNone(report['most_valuable'])
+        self.assertEqual(self.client.get('/api/reports/injury-report').status_code, 400)
+        self.assertEqual(self.client.get('/api/reports/injury-report?team_id=x').status_code, 400)
+        self.assertEqual(self.client.get('/api/reports/injury-report?team_id=99').status_code, 404)
+
+
+class TestReportBatch(ApiTestCase):
+    def test_matches_single_team_reports(self):
+        # NULLs and ties exercise the ranking order
+        db.session.execute(text("UPDATE players SET rating = NULL, player_value = NULL WHERE id IN (3, 14)"))
+        db.session.execute(text("UPDATE players SET rating = 5 WHERE team_id = 2"))
+        db.session.add(Team(name='Empty'))
+        db.session.commit()
+        body = self.client.get('/api/reports/batch?team_ids=1,2,3,4').get_json()
+        self.assertEqual(body['types'], list(app_module.REPORT_TYPES))
+        self.assertEqual(body['not_found'], [])
+        report_cache.clear()
+        for team_id in ('1', '2', '3', '4'):
+            for report_type in app_module.REPORT_TYPES:
+                single = self.client.get(f"/api/reports/{report_type}?team_id={team_id}").get_json()
+                self.assertEqual(body['reports'][team_id][report_type], single, (team_id, report_type))
+
+    def test_types_and_missing_teams(self):
+        body = self.client.get('/api/reports/batch?team_ids=3,99,1&types=injury-report,team-composition').get_json()
+        self.assertEqual(list(body['reports']), ['3', '1'])
+        self.assertEqual(list(body['reports']['1']), ['injury-report', 'team-composition'])
+        self.assertEqual(body['reports']['3']['injury-report']['injury_rate'], 20.0)
+        self.assertEqual(body['not_found'], [99])
+
+    def test_shares_the_report_cache(self):
+        self.client.get('/api/reports/value-report?team_id=1')
+        before = self.client.get('/api/reports/cache-stats').get_json()
+        self.client.get('/api/reports/batch?team_ids=1,2&types=value-report')
+        self.client.get('/api/reports/value-report?team_id=2')
+        stats = self.client.get('/api/reports/cache-stats').get_json()
+        self.assertEqual(stats['hits'] - before['hits'], 2)
+        self.assertEqual(stats['misses'] - before['misses'], 1)
+
+        self.client.put('/api/players/11', json={'player_value': 1.0})
+        body = self.client.get('/api/reports/batch?team_ids=2&types=value-report').get_json()
+        self.assertEqual(body['reports']['2']['value-report']['least_valuable']['id'], 11)
+
+    def test_invalid_arguments(self):
+        for url in ('/api/reports/batch', '/api/reports/batch?team_ids=1,x',
+                    '/api/reports/batch?team_ids=1&types=salary-report',
+                    '/api/reports/batch?team_ids=' + ','.join(str(i) for i in range(1, 102))):
+            self.assertEqual(self.client.get(url).status_code, 400, url)
+
+
+class TestLeagueReports(ApiTestCase):
+    def test_all_teams_matches_team_reports(self):
+        teams = self.client.get('/api/reports/all-teams').get_json()['teams']
+        self.assertEqual(sorted(teams), ['1', '2', '3'])
+        single = self.client.get('/api/reports/team-composition?team_id=1').get_json()
+        self.assertEqual(teams['1']['positions'], single['positions'])
+        self.assertEqual(teams['1']['nationalities'], single['nationalities'])
+        self.assertEqual(teams['1']['average_rating'], single['average_rating'])
+        self.assertEqual(teams['1']['total_value'], single['total_value'])
+        self.assertEqual(teams['1']['injury_rate'], 20.0)
+
+    def test_all_teams_filters_and_empty_team(self):
+        db.session.add(Team(name='Empty', league='Premier League', country='England'))
+        db.session.commit()
+        teams = self.client.get('/api/reports/all-teams?league=Premier League').get_json()['teams']
+        self.assertEqual(sorted(teams), ['3', '4'])
+        self.assertEqual(teams['4']['total_players'], 0)
+        self.assertEqual(teams['4']['positions'], {})
+
+    def test_league_summary(self):
+        leagues = self.client.get('/api/reports/league-summary?country=Spain').get_json()['leagues']
+        self.assertEqual(list(leagues), ['La Liga'])
+        summary = leagues['La Liga']
+        self.assertEqual(summary['team_count'], 2)
+        self.assertEqual(summary['total_players'], 20)
+        self.assertEqual(summary['injured_players'], 4)
+        self.assertEqual(summary['average_rating'], 5.5)
+        self.assertEqual(sorted(summary['teams']), ['1', '2'])
+
+
+class TestReportCache(ApiTestCase):
+    def test_hits_and_write_invalidation(self):
+        # Counters are process-wide, so compare against a starting snapshot
+        before = self.client.get('/api/reports/cache-stats').get_json()
+        url = '/api/reports/injury-report?team_id=1'
+        self.assertEqual(self.client.get(url).get_json()['total_players'], 10)
+        self.client.get(url)
+        self.client.get('/api/reports/injury-report?team_id=2')
+        stats = self.client.get('/api/reports/cache-stats').get_json()
+        self.assertEqual(stats['hits'] - before['hits'], 1)
+        self.assertEqual(stats['misses'] - before['misses'], 2)
+        self.assertEqual(stats['size'], 2)
+
+        self.client.post('/api/players', json={'full_name': 'New', 'team_id': 1, 'is_injured': True})
+        self.assertEqual(self.client.get('/api/reports/cache-stats').get_json()['size'], 1)
+        # The next GET sees the new players version and drops the rest as well
+        self.assertEqual(self.client.get(url).get_json()['total_players'], 11)
+        stats = self.client.get('/api/reports/cache-stats').get_json()
+        self.assertEqual(stats['invalidations'] - before['invalidations'], 2)
+        self.assertEqual(stats['size'], 1)
+
+    def test_player_move_invalidates_both_teams(self):
+        self.client.get('/api/reports/team-composition?team_id=1')
+        self.client.get('/api/reports/team-composition?team_id=2')
+        self.client.get('/api/reports/team-composition?team_id=3')
+        self.client.put('/api/players/1', json={'team_id': 2})
+        self.assertEqual(self.client.get('/api/reports/cache-stats').get_json()['size'], 1)
+        self.assertEqual(self.client.get('/api/reports/team-composition?team_id=2').get_json()['total_players'], 11)
+
+    def test_league_reports_dropped_on_any_write(self):
+        self.client.get('/api/reports/all-teams')
+        self.client.delete('/api/players/30')
+        teams = self.client.get('/api/reports/all-teams').get_json()['teams']
+        self.assertEqual(teams['3']['total_players'], 9)
+
+    def test_sync_sees_writes_from_other_processes(self):
+        url = '/api/reports/injury-report?team_id=1'
+        self.assertEqual(self.client.get(url).get_json()['injury_rate'], 20.0)
+        # Another worker's write reaches the database but not this process's cache
+        db.session.execute(text("UPDATE players SET is_injured = 1 WHERE team_id = 1"))
+        app_module.bump_data_version(db.session, 'players')
+        db.session.commit()
+        self.assertEqual(self.client.get(url).get_json()['injury_rate'], 100.0)
+
+    def test_two_caches_share_one_database(self):
+        # Each worker process holds its own cache; swap in a second one as process B
+        other = ReportCache()
+        url = '/api/reports/team-composition?team_id=1'
+        first = self.client.get(url)
+        with mock.patch.object(app_module, 'report_cache', other):
+            self.assertEqual(self.client.get(url).get_json()['total_players'], 10)
+            self.client.post('/api/players', json={'full_name': 'New', 'team_id': 1})
+            self.assertEqual(self.client.get(url).get_json()['total_players'], 11)
+        # Process A revalidates with its old tag and must not get its stale report
+        resp = self.client.get(url, headers={'If-None-Match': first.headers['ETag']})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.get_json()['total_players'], 11)
+        self.assertNotEqual(resp.headers['ETag'], first.headers['ETag'])
+
+    def interleave_write(self, builder):
+        """Wrap ``builder`` so a write to team 1 commits after it read the rows."""
+        def build(*args):
+            report = builder(*args)
+            db.session.execute(text("UPDATE players SET is_injured = 1 WHERE team_id = 1"))
+            app_module.bump_data_version(db.session, 'players')
+            db.session.commit()
+            report_cache.invalidate_teams(1)
+            return report
+        return build
+
+    def test_report_built_before_a_write_is_not_cached(self):
+        url = '/api/reports/injury-report?team_id=1'
+        build = self.interleave_write(app_module.build_injury_report)
+        with mock.patch.object(app_module, 'build_injury_report', build):
+            self.assertEqual(self.client.get(url).get_json()['injury_rate'], 20.0)
+        self.assertEqual(self.client.get(url).get_json()['injury_rate'], 100.0)
+
+    def test_batch_built_before_a_write_is_not_cached(self):
+        build = self.interleave_write(app_module.build_report_batch)
+        with mock.patch.object(app_module, 'build_report_batch', build):
+            self.client.get('/api/reports/batch?types=injury-report&team_ids=1')
+        self.assertEqual(self.client.get('/api/reports/injury-report?team_id=1').get_json()['injury_rate'], 100.0)
+
+
+class TestConditionalGet(ApiTestCase):
+    def test_not_modified_until_write(self):
+        first = self.client.get('/api/players')
+        etag = first.headers['ETag']
+        again = self.client.get('/api/players', headers={'If-None-Match': etag})
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again.get_data(), b'')
+        self.assertEqual(again.headers['ETag'], etag)
+
+        self.client.put('/api/players/1', json={'rating': 3})
+        changed = self.client.get('/api/players', headers={'If-None-Match': etag})
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed.headers['ETag'], etag)
+
+    def test_unrelated_table_write_keeps_etag(self):
+        etag = self.client.get('/api/teams/1').headers['ETag']
+        self.client.put('/api/players/1', json={'rating': 3})
+        resp = self.client.get('/api/teams/1', headers={'If-None-Match': etag})
+        self.assertEqual(resp.status_code, 304)
+
+    def test_noop_update_keeps_etag(self):
+        etag = self.client.get('/api/reports/injury-report?team_id=1').headers['ETag']
+        self.client.put('/api/teams/1', json={'name': 'Team 0'})
+        resp = self.client.get('/api/reports/injury-report?team_id=1', headers={'If-None-Match': etag})
+        self.assertEqual(resp.status_code, 304)
+
+    def test_etag_depends_on_url(self):
+        a = self.client.get('/api/players?team_id=1').headers['ETag']
+        b = self.client.get('/api/players?team_id=2').headers['ETag']
+        self.assertNotEqual(a, b)
+        resp = self.client.get('/api/players?team_id=2', headers={'If-None-Match': a})
+        self.assertEqual(resp.status_code, 200)
+
+    def test_errors_carry_no_etag(self):
+        resp = self.client.get('/api/players/999')
+        self.assertEqual(resp.status_code, 404)
+        self.assertNotIn('ETag', resp.headers)
+
+
+class TestStatsSummary(ApiTestCase):
+    def test_summary(self):
+        stats = self.client.get('/api/stats/summary').get_json()
+        self.assertEqual(stats['total_teams'], 3)
+        self.assertEqual(stats['total_players'], 30)
+        self.assertEqual(stats['injured_players'], 6)
+        self.assertEqual(stats['average_player_value'], 5500000.0)
+        self.assertEqual(stats['value_percentiles'],
+                         {'p25': 3000000.0, 'p50': 5000000.0, 'p75': 8000000.0, 'p90': 9000000.0})
+        self.assertEqual(stats['leagues']['La Liga'], {'teams': 2, 'players': 20, 'injured_players': 4})
+        self.assertEqual(stats['leagues']['Premier League']['teams'], 1)
+
+    def test_value_percentiles_with_ties_and_missing_values(self):
+        db.session.execute(text("UPDATE players SET player_value = NULL WHERE id % 7 = 0"))
+        db.session.execute(text("UPDATE players SET player_value = 4000000 WHERE id BETWEEN 10 AND 20"))
+        db.session.commit()
+        values = sorted(v for (v,) in db.session.query(Player.player_value) if v is not None)
+        expected = {f"p{p}": values[max(math.ceil(p / 100 * len(values)), 1) - 1] for p in (25, 50, 75, 90)}
+        self.assertEqual(self.client.get('/api/stats/summary').get_json()['value_percentiles'], expected)
+
+    def test_summary_refreshes_after_write(self):
+        self.client.get('/api/stats/summary')
+        self.client.post('/api/teams', json={'name': 'New', 'league': 'Serie A'})
+        stats = self.client.get('/api/stats/summary').get_json()
+        self.assertEqual(stats['total_teams'], 4)
+        self.assertEqual(stats['leagues']['Serie A'], {'teams': 1, 'players': 0, 'injured_players': 0})
+
+
+class TestBulkEndpoints(ApiTestCase):
+    def test_bulk_create_players_with_per_item_status(self):
+        resp = self.client.post('/api/players/bulk', json=[
+            {'full_name': 'Bulk A', 'team_id': 1, 'date_of_birth': '1990-01-02'},
+            {'full_name': 'Bulk B', 'team_id': 99},
+            {'team_id': 1},
+            {'full_name': 'Bulk C', 'team_id': 2, 'contract_end': 'soon'},
+        ])
+        self.assertEqual(resp.status_code, 207)
+        body = resp.get_json()
+        self.assertEqual((body['created'], body['errors']), (1, 3))
+        self.assertEqual([r['status'] for r in body['results']], ['created', 'error', 'error', 'error'])
+        created = self.client.get(f"/api/players/{body['results'][0]['id']}").get_json()
+        self.assertEqual(created['date_of_birth'], '1990-01-02')
+        self.assertFalse(created['is_injured'])
+
+    def test_bulk_upsert_players_on_natural_key(self):
+        resp = self.client.post('/api/players/bulk?mode=upsert', json={'items': [
+            {'full_name': 'Player 0-1', 'team_id': 1, 'rating': 2},
+            {'full_name': 'Player 0-1', 'team_id': 2},
+        ]})
+        body = resp.get_json()
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual((body['created'], body['updated']), (1, 1))
+        self.assertEqual(body['results'][0], {'index': 0, 'status': 'updated', 'id': 2})
+        player = self.client.get('/api/players/2').get_json()
+        self.assertEqual((player['rating'], player['nationality']), (2, 'Spain'))
+
+    def test_bulk_update_and_delete_players(self):
+        report = self.client.get('/api/reports/injury-report?team_id=1').get_json()
+        self.assertEqual(report['total_players'], 10)
+        resp = self.client.put('/api/players/bulk', json=[{'id': 1, 'team_id': 2}, {'id': 999}])
+        self.assertEqual(resp.status_code, 207)
+        resp = self.client.delete('/api/players/bulk', json={'ids': [2, 3, 999]})
+        body = resp.get_json()
+        self.assertEqual(body['deleted'], 2)
+        self.assertEqual(body['results'][2]['status'], 'error')
+        report = self.client.get('/api/reports/injury-report?team_id=1').get_json()
+        self.assertEqual(report['total_players'], 7)
+
+    def test_bulk_teams(self):
+        etag = self.client.get('/api/teams').headers['ETag']
+        resp = self.client.post('/api/teams/bulk?mode=upsert', json=[
+            {'name': 'Team 0', 'league': 'Serie A'}, {'name': 'Team 9'}, {'league': 'x'}])
+        body = resp.get_json()
+        self.assertEqual((body['created'], body['updated'], body['errors']), (1, 1, 1))
+        self.assertEqual(self.client.get('/api/teams', headers={'If-None-Match': etag}).status_code, 200)
+        self.assertEqual(self.client.get('/api/teams/1').get_json()['league'], 'Serie A')
+
+        resp = self.client.delete('/api/teams/bulk', json=[1, 2])
+        self.assertEqual(resp.get_json()['deleted'], 2)
+        self.assertEqual(len(self.client.get('/api/players').get_json()), 10)
+
+    def test_bulk_rejects_bad_payload(self):
+        self.assertEqual(self.client.post('/api/players/bulk', json={'items': 'x'}).status_code, 400)
+        self.assertEqual(self.client.delete('/api/players/bulk', json=['a']).status_code, 400)
+        self.assertEqual(self.client.post('/api/teams/bulk', json=[{'name': ['x']}]).status_code, 400)
+
+
+class TestSearch(ApiTestCase):
+    def test_prefix_search_ranks_name_matches(self):
+        db.session.add(Player(full_name='Thomas Müller', nationality='Germany', team_id=1))
+        db.session.commit()
+        body = self.client.get('/api/search?q=mull&type=players').get_json()
+        self.assertEqual([p['full_name'] for p in body['players']['items']], ['Thomas Müller'])
+        self.assertEqual(body['players']['items'][0]['team_name'], 'Team 0')
+        self.assertNotIn('teams', body)
+
+    def test_team_fields_and_rename_sync(self):
+        body = self.client.get('/api/search?q=premier&type=players&limit=5').get_json()
+        self.assertEqual(len(body['players']['items']), 5)
+        self.assertEqual(body['players']['next_offset'], 5)
+        body = self.client.get('/api/search?q=premier&type=players&limit=5&offset=5').get_json()
+        self.assertIsNone(body['players']['next_offset'])
+
+        self.client.put('/api/teams/3', json={'name': 'Arsenal'})
+        body = self.client.get('/api/search?q=arsen').get_json()
+        self.assertEqual(body['teams']['items'], [{'id': 3, 'name': 'Arsenal', 'league': 'Premier League', 'country': 'England'}])
+        self.assertEqual(len(body['players']['items']), 10)
+
+    def test_filters_updates_and_deletes(self):
+        body = self.client.get('/api/search?q=player 0&type=players&team_id=1&injured=true').get_json()
+        self.assertEqual({p['id'] for p in body['players']['items']}, {1, 6})
+        self.client.put('/api/players/1', json={'full_name': 'Renamed Keeper'})
+        self.client.delete('/api/players/6')
+        body = self.client.get('/api/search?q=player 0&type=players&team_id=1&injured=true').get_json()
+        self.assertEqual(body['players']['items'], [])
+        body = self.client.get('/api/search?q=keeper').get_json()
+        self.assertEqual(body['players']['items'][0]['id'], 1)
+
+    def test_bulk_writes_are_indexed(self):
+        self.client.post('/api/players/bulk', json=[{'full_name': 'Zlatan Ibra', 'team_id': 2}])
+        body = self.client.get('/api/search?q=zla').get_json()
+        self.assertEqual(body['players']['items'][0]['team_name'], 'Team 1')
+        self.client.delete('/api/teams/bulk', json=[2])
+        self.assertEqual(self.client.get('/api/search?q=zla').get_json()['players']['items'], [])
+
+    def test_invalid_queries(self):
+        self.assertEqual(self.client.get('/api/search?q=%22*').status_code, 400)
+        self.assertEqual(self.client.get('/api/search?q=a&type=x').status_code, 400)
+        self.assertEqual(self.client.get('/api/search?q=a&limit=0').status_code, 400)
+
+
+class TestLegacyMigration(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        self.uri = f"sqlite:///{os.path.join(tmpdir, 'legacy.db')}"
+        # The model-named tables of older releases, holding the only data
+        conn = sqlite3.connect(os.path.join(tmpdir, 'legacy.db'))
+        for name, model in (('team', Team), ('player', Player)):
+            conn.execute(f"CREATE TABLE {name} ({', '.join(model.__table__.columns.keys())})")
+        conn.execute("INSERT INTO team (id, name, country, league) VALUES (1, 'Legacy FC', 'England', 'Premier League')")
+        conn.execute("INSERT INTO player (id, full_name, team_id) VALUES (1, 'Legacy Player', 1)")
+        conn.commit()
+        conn.close()
+
+    def start(self):
+        legacy_app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': self.uri})
+        with redirect_stdout(io.StringIO()):
+            app_module.prepare_database(legacy_app)
+        self.addCleanup(app_module.dispose_engines, legacy_app)
+        return legacy_app
+
+    def test_migrates_once(self):
+        client = self.start().test_client()
+        self.assertEqual([t['name'] for t in client.get('/api/teams').get_json()], ['Legacy FC'])
+        self.assertEqual(client.delete('/api/players/1').status_code, 200)
+        self.assertEqual(client.delete('/api/teams/1').status_code, 200)
+
+        # A restart must not copy the old rows back into the emptied tables
+        client = self.start().test_client()
+        self.assertEqual(client.get('/api/teams').get_json(), [])
+        self.assertEqual(client.get('/api/players').get_json(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
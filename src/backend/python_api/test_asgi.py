@@ -0,0 +1,201 @@
+"""Run the API test cases against the ASGI app.
+
+Each case from test_app.py is repeated with ``self.client`` swapped for a
+client that speaks ASGI, so both serving modes share one suite.
+"""
+
+import asyncio
+import importlib.util
+import os
+import unittest
+from json import dumps
+from types import SimpleNamespace
+from unittest import mock
+from urllib.parse import urlsplit
+
+from flask import Flask, Response
+
+import asgi
+import test_app
+from asgi import build_environ, create_asgi_app
+from report_cache import ReportCache
+
+asgi_app = create_asgi_app(test_app.app, max_threads=4, prepare=False)
+
+
+class AsgiTestClient:
+    """Synchronous client calling an ASGI app in-process, like ``app.test_client()``."""
+
+    def __init__(self, app):
+        self.app = app
+
+    def open(self, url, method='GET', json=None, headers=None):
+        parts = urlsplit(url)
+        body = b'' if json is None else dumps(json).encode()
+        raw_headers = [(b'host', b'localhost')]
+        if json is not None:
+            raw_headers.append((b'content-type', b'application/json'))
+        raw_headers += [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                        for name, value in (headers or {}).items()]
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+            'method': method, 'scheme': 'http', 'path': parts.path, 'raw_path': parts.path.encode(),
+            'query_string': parts.query.encode(), 'root_path': '', 'headers': raw_headers,
+            'client': ('127.0.0.1', 50000), 'server': ('localhost', 80),
+        }
+        messages = asyncio.run(self._call(scope, body))
+        start = messages[0]
+        self.assert_protocol(messages)
+        chunks = [m['body'] for m in messages[1:] if m['body']]
+        return Response(chunks, status=start['status'],
+                        headers=[(k.decode('latin-1'), v.decode('latin-1')) for k, v in start['headers']])
+
+    @staticmethod
+    def assert_protocol(messages):
+        assert messages[0]['type'] == 'http.response.start', messages[0]
+        assert all(m['type'] == 'http.response.body' for m in messages[1:])
+        assert not messages[-1].get('more_body', False)
+
+    async def _call(self, scope, body):
+        messages = []
+        requests = [{'type': 'http.request', 'body': body, 'more_body': False}]
+
+        async def receive():
+            return requests.pop(0) if requests else {'type': 'http.disconnect'}
+
+        async def send(message):
+            messages.append(message)
+
+        await self.app(scope, receive, send)
+        return messages
+
+    def get(self, url, **kwargs):
+        return self.open(url, 'GET', **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.open(url, 'POST', **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.open(url, 'PUT', **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.open(url, 'DELETE', **kwargs)
+
+
+class AsgiClientMixin:
+    def setUp(self):
+        super().setUp()
+        self.client = AsgiTestClient(asgi_app)
+
+
+class TestListEndpointsAsgi(AsgiClientMixin, test_app.TestListEndpoints):
+    pass
+
+
+class TestStreamingAsgi(AsgiClientMixin, test_app.TestStreaming):
+    pass
+
+
+class TestReportsAsgi(AsgiClientMixin, test_app.TestReports):
+    pass
+
+
+class TestReportBatchAsgi(AsgiClientMixin, test_app.TestReportBatch):
+    pass
+
+
+class TestLeagueReportsAsgi(AsgiClientMixin, test_app.TestLeagueReports):
+    pass
+
+
+class TestReportCacheAsgi(AsgiClientMixin, test_app.TestReportCache):
+    pass
+
+
+class TestConditionalGetAsgi(AsgiClientMixin, test_app.TestConditionalGet):
+    pass
+
+
+class TestStatsSummaryAsgi(AsgiClientMixin, test_app.TestStatsSummary):
+    pass
+
+
+class TestBulkEndpointsAsgi(AsgiClientMixin, test_app.TestBulkEndpoints):
+    pass
+
+
+class TestSearchAsgi(AsgiClientMixin, test_app.TestSearch):
+    pass
+
+
+class TestWorkerProcessesAsgi(test_app.ApiTestCase):
+    """Two ``uvicorn asgi:app --workers 2`` processes: separate report caches, one database."""
+
+    def test_write_served_by_another_worker(self):
+        worker_a = AsgiTestClient(asgi_app)
+        worker_b = AsgiTestClient(create_asgi_app(test_app.app, max_threads=4, prepare=False))
+        cache_b = ReportCache()
+        url = '/api/reports/injury-report?team_id=1'
+
+        def on_b(method, *args, **kwargs):
+            with mock.patch.object(test_app.app_module, 'report_cache', cache_b):
+                return getattr(worker_b, method)(*args, **kwargs)
+
+        stale = on_b('get', url)
+        self.assertEqual(worker_a.get(url).get_json()['total_players'], 10)
+        worker_a.post('/api/players', json={'full_name': 'New', 'team_id': 1, 'is_injured': True})
+
+        resp = on_b('get', url, headers={'If-None-Match': stale.headers['ETag']})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.get_json()['total_players'], 11)
+        self.assertEqual(resp.get_json()['total_players'], worker_a.get(url).get_json()['total_players'])
+        self.assertEqual(resp.headers['ETag'], worker_a.get(url).headers['ETag'])
+
+
+class TestAsgiAdapter(unittest.TestCase):
+    def test_build_environ(self):
+        environ = build_environ({
+            'type': 'http', 'http_version': '1.1', 'method': 'GET', 'path': '/api/teams',
+            'query_string': b'league=La%20Liga', 'headers': [(b'accept', b'a'), (b'accept', b'b'),
+                                                              (b'content-type', b'application/json')],
+        }, b'{}')
+        self.assertEqual(environ['QUERY_STRING'], 'league=La%20Liga')
+        self.assertEqual(environ['HTTP_ACCEPT'], 'a,b')
+        self.assertEqual(environ['CONTENT_TYPE'], 'application/json')
+        self.assertEqual(environ['CONTENT_LENGTH'], '2')
+        self.assertEqual(environ['wsgi.input'].read(), b'{}')
+
+    def test_lifespan(self):
+        calls = []
+        app = create_asgi_app(test_app.app, max_threads=1, prepare=False)
+        app.on_startup = lambda: calls.append('startup')
+        app.on_shutdown = lambda: calls.append('shutdown')
+        events = [{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}]
+        sent = []
+
+        async def receive():
+            return events.pop(0)
+
+        async def send(message):
+            sent.append(message['type'])
+
+        asyncio.run(app({'type': 'lifespan'}, receive, send))
+        self.assertEqual(calls, ['startup', 'shutdown'])
+        self.assertEqual(sent, ['lifespan.startup.complete', 'lifespan.shutdown.complete'])
+
+
+    def test_gunicorn_post_fork_unwraps_the_flask_app(self):
+        # Loading the config sets environment defaults; keep them out of the other tests
+        with mock.patch.dict(os.environ):
+            spec = importlib.util.spec_from_file_location(
+                'gunicorn_conf', os.path.join(os.path.dirname(__file__), 'gunicorn.conf.py'))
+            config = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(config)
+        self.assertIsInstance(asgi.app.flask_app, Flask)
+        worker = SimpleNamespace(app=SimpleNamespace(wsgi=lambda: asgi.app))
+        config.post_fork(None, worker)
+        worker = SimpleNamespace(app=SimpleNamespace(wsgi=lambda: test_app.app))
+        config.post_fork(None, worker)
+
+if __name__ == '__main__':
+    unittest.main()
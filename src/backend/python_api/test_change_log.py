@@ -0,0 +1,95 @@
+import unittest
+
+from sqlalchemy import text
+
+from app import db, Player
+import change_log
+from test_app import ApiTestCase
+
+
+class TestChangeFeed(ApiTestCase):
+    def changes(self, since, **params):
+        query = ''.join(f"&{k}={v}" for k, v in params.items())
+        resp = self.client.get(f"/api/changes?since={since}{query}")
+        self.assertEqual(resp.status_code, 200, resp.get_data(as_text=True))
+        return resp.get_json()
+
+    def head(self):
+        return self.client.get('/api/changes').get_json()['next_since']
+
+    def test_seed_is_logged(self):
+        # 3 teams and 30 players were inserted by setUp
+        self.assertEqual(self.head(), 33)
+        body = self.changes(0, limit=1000)
+        self.assertEqual(len(body['changes']), 33)
+        self.assertEqual(body['changes'][0], {'seq': 1, 'table': 'teams', 'id': 1, 'op': 'upsert',
+                                              'data': body['changes'][0]['data']})
+        self.assertEqual(body['changes'][0]['data']['name'], 'Team 0')
+        self.assertFalse(body['has_more'])
+
+    def test_writes_since_cursor(self):
+        cursor = self.head()
+        self.assertEqual(self.changes(cursor), {'changes': [], 'next_since': cursor, 'has_more': False})
+
+        self.client.put('/api/players/1', json={'rating': 9})
+        self.client.put('/api/players/1', json={'rating': 8})
+        new_id = self.client.post('/api/players', json={'full_name': 'New', 'team_id': 2}).get_json()['id']
+        self.client.delete('/api/players/2')
+        self.client.put('/api/teams/3', json={'league': 'Serie A'})
+
+        body = self.changes(cursor)
+        summary = [(c['table'], c['id'], c['op']) for c in body['changes']]
+        # Both updates of player 1 collapse into its latest entry
+        self.assertEqual(summary, [('players', 1, 'upsert'), ('players', new_id, 'upsert'),
+                                   ('players', 2, 'delete'), ('teams', 3, 'upsert')])
+        self.assertEqual(body['changes'][0]['data']['rating'], 8)
+        self.assertNotIn('data', body['changes'][2])
+        self.assertEqual(body['next_since'], cursor + 5)
+        self.assertEqual(self.changes(body['next_since'])['changes'], [])
+
+    def test_bulk_and_cascading_deletes_are_logged(self):
+        cursor = self.head()
+        self.client.put('/api/players/bulk', json=[{'id': i, 'rating': 2} for i in (3, 4)])
+        self.client.delete('/api/teams/1')
+        changes = self.changes(cursor, limit=1000)['changes']
+        deleted = {c['id'] for c in changes if c['table'] == 'players' and c['op'] == 'delete'}
+        self.assertEqual(deleted, set(range(1, 11)))
+        self.assertIn({'seq': changes[-1]['seq'], 'table': 'teams', 'id': 1, 'op': 'delete'}, changes)
+
+    def test_rolled_back_write_is_not_logged(self):
+        cursor = self.head()
+        db.session.add(Player(full_name='Ghost', team_id=1))
+        db.session.flush()
+        db.session.rollback()
+        self.assertEqual(self.changes(cursor)['changes'], [])
+        self.assertEqual(self.head(), cursor)
+
+    def test_pagination(self):
+        seen = []
+        since = 0
+        while True:
+            body = self.changes(since, limit=10)
+            seen.extend(c['seq'] for c in body['changes'])
+            since = body['next_since']
+            if not body['has_more']:
+                break
+        self.assertEqual(seen, list(range(1, 34)))
+
+    def test_pruned_cursor_is_gone(self):
+        change_log.prune_change_log(db.session, keep=5)
+        db.session.commit()
+        self.assertEqual(self.client.get('/api/changes?since=10').status_code, 410)
+        self.assertEqual(len(self.changes(28)['changes']), 5)
+        db.session.execute(text("DELETE FROM change_log"))
+        db.session.commit()
+        self.assertEqual(self.client.get('/api/changes?since=32').status_code, 410)
+        self.assertEqual(self.changes(33)['changes'], [])
+
+    def test_invalid_arguments(self):
+        self.assertEqual(self.client.get('/api/changes?since=x').status_code, 400)
+        self.assertEqual(self.client.get('/api/changes?since=-1').status_code, 400)
+        self.assertEqual(self.client.get('/api/changes?since=0&limit=0').status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import csv
+import io
+import unittest
+from unittest import mock
+
+import app as app_module
+import export
+from test_app import ApiTestCase
+
+
+def read_csv(resp):
+    return list(csv.DictReader(io.StringIO(resp.get_data(as_text=True))))
+
+
+class TestPlayerExport(ApiTestCase):
+    def test_csv_with_filters(self):
+        resp = self.client.get('/api/export/players?team_id=1&injured=true')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.mimetype, 'text/csv')
+        self.assertEqual(resp.headers['Content-Disposition'], 'attachment; filename="players.csv"')
+        rows = read_csv(resp)
+        self.assertEqual([r['full_name'] for r in rows], ['Player 0-0', 'Player 0-5'])
+        self.assertEqual(rows[0]['is_injured'], 'true')
+        self.assertEqual(rows[0]['date_of_birth'], '')
+        self.assertEqual(rows[0]['player_value'], '1000000.0')
+
+    def test_fields_and_chunks(self):
+        app_module.STREAM_CHUNK_ROWS, old = 4, app_module.STREAM_CHUNK_ROWS
+        try:
+            resp = self.client.get('/api/export/players?position=Forward&fields=id,full_name')
+            chunks = list(resp.response)
+        finally:
+            app_module.STREAM_CHUNK_ROWS = old
+        rows = list(csv.DictReader(io.StringIO(b''.join(chunks).decode())))
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(set(rows[0]), {'id', 'full_name'})
+        self.assertEqual(len(chunks), 2)
+
+    def test_empty_export_has_header(self):
+        resp = self.client.get('/api/export/players?team_id=99&fields=id,rating')
+        self.assertEqual(resp.get_data(as_text=True), 'id,rating\r\n')
+
+    def test_invalid_arguments(self):
+        self.assertEqual(self.client.get('/api/export/players?format=xml').status_code, 400)
+        self.assertEqual(self.client.get('/api/export/players?team_id=x').status_code, 400)
+        self.assertEqual(self.client.get('/api/export/players?fields=nope').status_code, 400)
+
+    def test_arrow_needs_pyarrow(self):
+        with mock.patch.object(export, 'pyarrow', None):
+            self.assertEqual(self.client.get('/api/export/players?format=arrow').status_code, 501)
+
+    @unittest.skipUnless(export.arrow_available(), 'pyarrow is not installed')
+    def test_arrow_stream(self):
+        import pyarrow
+
+        app_module.STREAM_CHUNK_ROWS, old = 7, app_module.STREAM_CHUNK_ROWS
+        try:
+            resp = self.client.get('/api/export/players?format=arrow&team_id=2')
+        finally:
+            app_module.STREAM_CHUNK_ROWS = old
+        self.assertEqual(resp.mimetype, 'application/vnd.apache.arrow.stream')
+        batches = list(pyarrow.ipc.open_stream(resp.get_data()))
+        self.assertEqual([b.num_rows for b in batches], [7, 3])
+        table = pyarrow.Table.from_batches(batches)
+        self.assertEqual(str(table.schema.field('is_injured').type), 'bool')
+        self.assertEqual(str(table.schema.field('date_of_birth').type), 'date32[day]')
+        self.assertEqual(table.column('rating').to_pylist(), list(range(1, 11)))
+
+
+class TestReportExport(ApiTestCase):
+    def test_ranked_reports_follow_report_order(self):
+        rows = read_csv(self.client.get('/api/export/reports/player-performance?team_id=2'))
+        self.assertEqual([int(r['rating']) for r in rows], list(range(10, 0, -1)))
+        report = self.client.get('/api/reports/value-report?team_id=2').get_json()
+        rows = read_csv(self.client.get('/api/export/reports/value-report?team_id=2'))
+        self.assertEqual([int(r['id']) for r in rows], [p['id'] for p in report['players']])
+
+    def test_injury_and_composition(self):
+        rows = read_csv(self.client.get('/api/export/reports/injury-report?team_id=1'))
+        self.assertEqual(len(rows), 2)
+        resp = self.client.get('/api/export/reports/team-composition?team_id=1')
+        self.assertEqual(resp.headers['Content-Disposition'], 'attachment; filename="team-composition-team-1.csv"')
+        rows = read_csv(resp)
+        self.assertIn({'breakdown': 'position', 'value': 'Goalkeeper', 'players': '3'}, rows)
+        self.assertIn({'breakdown': 'nationality', 'value': 'Brazil', 'players': '5'}, rows)
+
+    def test_all_teams(self):
+        rows = read_csv(self.client.get('/api/export/reports/all-teams?league=La Liga'))
+        self.assertEqual([r['team_id'] for r in rows], ['1', '2'])
+        self.assertEqual(float(rows[0]['injury_rate']), 20.0)
+        self.assertEqual(float(rows[0]['average_rating']), 5.5)
+
+    def test_errors(self):
+        self.assertEqual(self.client.get('/api/export/reports/nope?team_id=1').status_code, 404)
+        self.assertEqual(self.client.get('/api/export/reports/value-report').status_code, 400)
+        self.assertEqual(self.client.get('/api/export/reports/value-report?team_id=99').status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import hashlib
+import sqlite3
+import unittest
+
+import generate_league
+
+
+def generate(seed=1, teams=120, players=6000):
+    conn = sqlite3.connect(':memory:')
+    counts = generate_league.load_league(conn, teams, players, seed=seed)
+    return conn, counts
+
+
+def digest(conn):
+    h = hashlib.sha1()
+    for table in ('teams', 'players'):
+        for row in conn.execute(f"SELECT * FROM {table} ORDER BY id"):
+            h.update(repr(row).encode())
+    return h.hexdigest()
+
+
+class TestGenerateLeague(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.conn, cls.counts = generate()
+
+    def scalar(self, sql):
+        return self.conn.execute(sql).fetchone()[0]
+
+    def test_counts_and_squad_sizes(self):
+        self.assertEqual(self.counts, (120, 6000))
+        sizes = {n for (n,) in self.conn.execute("SELECT count(*) FROM players GROUP BY team_id")}
+        self.assertEqual(sizes, {50})
+        self.assertEqual(self.scalar("SELECT count(*) FROM players WHERE team_id NOT IN (SELECT id FROM teams)"), 0)
+
+    def test_deterministic_per_seed(self):
+        self.assertEqual(digest(generate()[0]), digest(self.conn))
+        self.assertNotEqual(digest(generate(seed=2)[0]), digest(self.conn))
+
+    def test_indexes_created(self):
+        names = {n for (n,) in self.conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        self.assertIn('idx_players_team_rating', names)
+
+    def test_distributions(self):
+        self.assertAlmostEqual(self.scalar("SELECT avg(is_injured) FROM players"), generate_league.INJURY_RATE, delta=0.02)
+        self.assertEqual(self.scalar("SELECT count(*) FROM players WHERE rating NOT BETWEEN 1 AND 10"), 0)
+        self.assertEqual(self.scalar("SELECT count(*) FROM players WHERE is_injured = 1 AND injury_details IS NULL"), 0)
+        keepers = self.scalar("SELECT avg(position = 'Goalkeeper') FROM players")
+        self.assertAlmostEqual(keepers, 3 / sum(generate_league.POSITION_WEIGHTS), delta=0.03)
+        # Top divisions are rated and valued above the lower tiers
+        top, rest = self.conn.execute(
+            "SELECT avg(CASE WHEN t.league NOT LIKE '% Division %' "
+            "THEN p.rating END), avg(CASE WHEN t.league LIKE '% Division %' THEN p.rating END) "
+            "FROM players p JOIN teams t ON t.id = p.team_id").fetchone()
+        self.assertGreater(top, rest)
+        self.assertEqual(self.scalar("SELECT count(*) FROM teams WHERE team_value IS NULL"), 0)
+
+    def test_leagues_hold_at_most_twenty_teams(self):
+        largest = self.scalar("SELECT max(n) FROM (SELECT count(*) AS n FROM teams GROUP BY league)")
+        self.assertLessEqual(largest, generate_league.TEAMS_PER_LEAGUE)
+
+    def test_place_team(self):
+        self.assertEqual(generate_league.place_team(0), (1, 1, 1))
+        self.assertEqual(generate_league.place_team(19), (1, 1, 20))
+        self.assertEqual(generate_league.place_team(45), (2, 2, 6))
+        self.assertEqual(generate_league.place_team(60), (3, 1, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
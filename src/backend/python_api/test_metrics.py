@@ -0,0 +1,125 @@
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+from app import metrics
+from metrics import HistogramMetric, MetricsRegistry, StackSampler, collapse_stack
+from test_app import ApiTestCase, app
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    def test_histogram_buckets_are_cumulative(self):
+        registry = MetricsRegistry()
+        hist = registry.histogram('latency_seconds', 'Latency.', ('endpoint',), buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.7, 3.0):
+            hist.observe(value, ('/api/teams',))
+        text = registry.render()
+        self.assertIn('# TYPE latency_seconds histogram', text)
+        self.assertIn('latency_seconds_bucket{endpoint="/api/teams",le="0.1"} 1', text)
+        self.assertIn('latency_seconds_bucket{endpoint="/api/teams",le="1.0"} 3', text)
+        self.assertIn('latency_seconds_bucket{endpoint="/api/teams",le="+Inf"} 4', text)
+        self.assertIn('latency_seconds_count{endpoint="/api/teams"} 4', text)
+        self.assertEqual(hist.get(('/api/teams',)), (4.25, 4))
+
+    def test_label_values_are_escaped(self):
+        registry = MetricsRegistry()
+        registry.counter('hits_total', 'Hits.', ('path',)).inc(('a"b\\c',))
+        self.assertIn('hits_total{path="a\\"b\\\\c"} 1', registry.render())
+
+    def test_histogram_without_labels(self):
+        hist = HistogramMetric('h', 'H.', buckets=(1,))
+        hist.observe(2)
+        self.assertEqual(list(hist.samples())[-1], ('h_count', '', 1))
+
+
+class TestStackSampler(unittest.TestCase):
+    def test_collapse_stack_is_root_first(self):
+        stack = collapse_stack(sys._getframe())
+        self.assertTrue(stack.endswith('test_collapse_stack_is_root_first (test_metrics.py:' +
+                                       str(self.test_collapse_stack_is_root_first.__code__.co_firstlineno) + ')'))
+
+    def test_samples_registered_thread(self):
+        sampler = StackSampler(interval=0.001)
+        ident = threading.get_ident()
+        sampler.start(ident)
+        deadline = time.perf_counter() + 0.05
+        while time.perf_counter() < deadline:
+            pass
+        stacks = sampler.stop(ident)
+        self.assertTrue(stacks)
+        self.assertTrue(all('test_samples_registered_thread' in s for s in stacks))
+
+
+class TestMetricsEndpoint(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        app.config['METRICS_ENABLED'] = True
+
+    def tearDown(self):
+        app.config['METRICS_ENABLED'] = False
+        app.config['PROFILE_SLOW_MS'] = 0
+        app.config['PROFILE_INTERVAL_MS'] = 5
+        app.config['PROFILE_DIR'] = 'profiles'
+        super().tearDown()
+
+    def test_disabled_by_default(self):
+        app.config['METRICS_ENABLED'] = False
+        self.assertEqual(self.client.get('/api/_metrics').status_code, 404)
+
+    def test_records_latency_sql_and_serialization(self):
+        labels = ('GET', '/api/teams/<int:team_id>')
+        sql_before = metrics.sql_queries.get(labels)
+        encode_before = metrics.serialize_time.get(labels)
+        ok_before = metrics.requests.get(labels + ('200',))
+        self.assertEqual(self.client.get('/api/teams/1').status_code, 200)
+        self.assertEqual(self.client.get('/api/teams/999').status_code, 404)
+
+        queries, count = metrics.sql_queries.get(labels)
+        self.assertEqual(count - sql_before[1], 2)
+        self.assertGreaterEqual(queries - sql_before[0], 2)
+        self.assertEqual(metrics.serialize_time.get(labels)[1] - encode_before[1], 2)
+        self.assertGreater(metrics.serialize_time.get(labels)[0], encode_before[0])
+        self.assertEqual(metrics.requests.get(labels + ('200',)) - ok_before, 1)
+
+        resp = self.client.get('/api/_metrics')
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.content_type.startswith('text/plain; version=0.0.4'))
+        text = resp.get_data(as_text=True)
+        self.assertIn('http_requests_total{method="GET",endpoint="/api/teams/<int:team_id>",status="404"}', text)
+        self.assertIn('http_request_duration_seconds_bucket{method="GET",endpoint="/api/teams/<int:team_id>",le="+Inf"}', text)
+
+    def test_streamed_response_counts_queries(self):
+        labels = ('GET', '/api/players')
+        before = metrics.sql_queries.get(labels)
+        resp = self.client.get('/api/players?stream=1')
+        self.assertEqual(len(resp.get_data(as_text=True).splitlines()), 30)
+        queries, count = metrics.sql_queries.get(labels)
+        self.assertEqual(count - before[1], 1)
+        self.assertGreaterEqual(queries - before[0], 1)
+
+    def test_slow_request_profile(self):
+        profile_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, profile_dir)
+        app.config['PROFILE_SLOW_MS'] = 0.001
+        app.config['PROFILE_INTERVAL_MS'] = 0.5
+        app.config['PROFILE_DIR'] = profile_dir
+        labels = ('GET', '/api/players')
+        before = metrics.profiles.get(labels)
+        for _ in range(20):
+            self.client.get('/api/players')
+            if metrics.profiles.get(labels) > before:
+                break
+        files = os.listdir(profile_dir)
+        self.assertTrue(files)
+        with open(os.path.join(profile_dir, files[0])) as f:
+            stack, count = f.readline().rsplit(' ', 1)
+        self.assertIn(';', stack)
+        self.assertGreater(int(count), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,255 @@
+"""Query budget for every route: fail when an endpoint starts issuing N+1 queries.
+
+Each case runs one request against a generated league and counts the SQL
+statements executed and the rows fetched from SQLite. The budgets are small
+constants (or scale with the page/batch size, never with the number of
+teams), so a lazy load per row blows through them. Every route in app.py
+must have at least one case.
+
+Per-endpoint timings are printed after the run; set QUERY_BUDGET_REPORT to
+a path to also write them, with the measured counts, as JSON:
+
+    QUERY_BUDGET_REPORT=budget.json python -m pytest -q test_query_budget.py
+"""
+
+import json
+import os
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import unittest
+from collections import namedtuple
+
+from sqlalchemy import event
+
+from app import analytics_frames, create_app, db, report_cache, similar_players
+from generate_league import FOREIGN_NATIONALITIES, POSITIONS, load_league
+import change_log
+import search as search_index
+import team_stats
+
+TEAMS = 40
+PLAYERS_PER_TEAM = 25
+PLAYERS = TEAMS * PLAYERS_PER_TEAM
+PAGE = 50
+BATCH = 100
+TIMING_RUNS = 5
+# Domestic players plus every foreign nationality the generator draws from
+NATIONALITIES = len(FOREIGN_NATIONALITIES) + 1
+
+Budget = namedtuple('Budget', 'method url body status max_queries max_rows')
+
+
+def get(url, max_queries, max_rows, status=200):
+    return Budget('GET', url, None, status, max_queries, max_rows)
+
+
+def write(method, url, body, max_queries, max_rows, status=200):
+    return Budget(method, url, body, status, max_queries, max_rows)
+
+
+# Ids are predictable: the dataset is loaded into an empty database and
+# SQLite hands out max(id) + 1, so the bulk teams follow the new team and the
+# bulk players reuse the id of the new player deleted before them.
+NEW_TEAM = TEAMS + 1
+NEW_PLAYER = PLAYERS + 1
+BULK_TEAMS = list(range(NEW_TEAM + 1, NEW_TEAM + 1 + BATCH))
+BULK_PLAYERS = list(range(NEW_PLAYER, NEW_PLAYER + BATCH))
+
+# Reads run first against the untouched dataset, then the writes in order.
+# The change feed is read last, once the writes have filled it.
+BUDGETS = [
+    get('/api/teams', 2, TEAMS + 2),
+    get('/api/teams?league=Premier League', 2, TEAMS + 2),
+    get(f'/api/teams?limit={PAGE}', 2, TEAMS + 2),
+    get('/api/teams/1', 2, 2),
+    get('/api/teams/999999', 2, 1, status=404),
+    get('/api/players', 2, PLAYERS + 2),
+    get('/api/players?team_id=1', 2, PLAYERS_PER_TEAM + 2),
+    get(f'/api/players?limit={PAGE}&after=100&fields=id,full_name,team_id', 2, PAGE + 3),
+    get('/api/players?position=Forward&stream=1', 2, PLAYERS + 2),
+    get('/api/players/1', 2, 2),
+    # Loads the player arrays behind the index, then one query for the neighbours
+    get('/api/players/1/similar?k=20', 7, PLAYERS + TEAMS + len(POSITIONS) + 22),
+    get('/api/reports/team-composition?team_id=1', 5, 20),
+    get('/api/reports/player-performance?team_id=1', 4, PLAYERS_PER_TEAM + 5),
+    get('/api/reports/value-report?team_id=1', 4, PLAYERS_PER_TEAM + 5),
+    get('/api/reports/injury-report?team_id=1', 4, PLAYERS_PER_TEAM + 5),
+    get('/api/reports/all-teams', 3, TEAMS * (len(POSITIONS) + NATIONALITIES + 2) + 2),
+    get('/api/reports/league-summary', 3, TEAMS * (len(POSITIONS) + NATIONALITIES + 2) + 2),
+    # One query each for the teams, totals, histograms and players of the whole set
+    get(f"/api/reports/batch?team_ids={','.join(map(str, range(1, 11)))}", 5,
+        10 * (PLAYERS_PER_TEAM + len(POSITIONS) + NATIONALITIES + 2) + 1),
+    get(f"/api/reports/batch?team_ids={','.join(map(str, range(1, 11)))}&types=injury-report", 4,
+        10 * (PLAYERS_PER_TEAM + 2) + 1),
+    get('/api/reports/cache-stats', 0, 0),
+    get('/api/export/players', 2, PLAYERS + 1),
+    get('/api/export/players?team_id=1&fields=id,full_name', 2, PLAYERS_PER_TEAM + 1),
+    get('/api/export/reports/value-report?team_id=1', 3, PLAYERS_PER_TEAM + 2),
+    get('/api/export/reports/team-composition?team_id=1', 3, len(POSITIONS) + NATIONALITIES + 2),
+    get('/api/export/reports/all-teams', 2, TEAMS + 1),
+    get('/api/search?q=sa', 3, 2 * 20 + 4),
+    get('/api/search?q=united&type=teams&limit=10', 2, 11),
+    # At most one probe per value percentile, one row per league
+    get('/api/stats/summary', 3 + 4, TEAMS + 5),
+    get('/api/_metrics', 0, 0, status=404),
+    get('/api/changes', 1, 1),
+    # The first analytics request loads the player arrays; later ones only check the change log
+    get('/api/analytics/distribution?metric=salary&bins=10', 6, PLAYERS + TEAMS + len(POSITIONS) + 3),
+    get('/api/analytics/groups?metric=value_per_rating&by=league', 2, 2),
+    get('/api/analytics/age-curve?metric=rating&league=Premier League', 2, 2),
+
+    write('POST', '/api/teams', {'name': 'Budget FC', 'country': 'Spain', 'league': 'La Liga'}, 3, 1, status=201),
+    write('PUT', f'/api/teams/{NEW_TEAM}', {'home_stadium': 'Budget Park'}, 4, 2),
+    write('POST', '/api/players', {'full_name': 'Budget Player', 'team_id': NEW_TEAM, 'position': 'Forward'},
+          3, 1, status=201),
+    write('PUT', f'/api/players/{NEW_PLAYER}', {'rating': 9}, 4, 2),
+    write('DELETE', f'/api/players/{NEW_PLAYER}', None, 3, 1),
+    # return_defaults makes bulk_insert_mappings insert row by row to collect the new ids
+    write('POST', '/api/teams/bulk', [{'name': f'Bulk Team {i}'} for i in range(BATCH)], BATCH + 1, 0),
+    write('PUT', '/api/teams/bulk', [{'id': i, 'league': 'Bulk League'} for i in BULK_TEAMS], 3, BATCH),
+    write('POST', '/api/teams/bulk?mode=upsert', [{'name': f'Bulk Team {i}', 'country': 'Spain'} for i in range(BATCH)],
+          3, BATCH),
+    write('POST', '/api/players/bulk', [{'full_name': f'Bulk Player {i}', 'team_id': BULK_TEAMS[i % 10]}
+                                        for i in range(BATCH)], BATCH + 2, 10),
+    write('PUT', '/api/players/bulk', [{'id': i, 'rating': 5} for i in BULK_PLAYERS], 4, BATCH + 10),
+    write('POST', '/api/players/bulk?mode=upsert', [{'full_name': f'Bulk Player {i}', 'team_id': BULK_TEAMS[i % 10],
+                                                     'rating': 6} for i in range(BATCH)], 4, BATCH + 10),
+    write('DELETE', '/api/players/bulk', {'ids': BULK_PLAYERS}, 3, BATCH),
+    write('DELETE', '/api/teams/bulk', {'ids': BULK_TEAMS}, 5, BATCH),
+    write('DELETE', f'/api/teams/{NEW_TEAM}', None, 4, 1),
+    # The change feed over everything written above: log page plus one row query per table
+    get(f'/api/changes?since=0&limit={PAGE}', 4, 3 * PAGE + 3),
+    # Applying the writes to the arrays: the log, the teams and the changed players
+    get('/api/analytics/groups?metric=rating&by=team', 8, 3 * BATCH + TEAMS + 10),
+    get('/api/players/1/similar', 3, 12),
+]
+
+
+class RowCountingCursor(sqlite3.Cursor):
+    rows = 0
+
+    def fetchone(self):
+        row = super().fetchone()
+        if row is not None:
+            RowCountingCursor.rows += 1
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = super().fetchmany(*args, **kwargs)
+        RowCountingCursor.rows += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = super().fetchall()
+        RowCountingCursor.rows += len(rows)
+        return rows
+
+
+class RowCountingConnection(sqlite3.Connection):
+    def cursor(self, factory=RowCountingCursor):
+        return super().cursor(factory)
+
+
+class TestQueryBudget(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.mkdtemp()
+        cls.app = create_app({
+            'TESTING': True,
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(cls.tmpdir, 'budget.db')}",
+            'SQLALCHEMY_ENGINE_OPTIONS': {'connect_args': {'check_same_thread': False, 'factory': RowCountingConnection}},
+        })
+        cls.ctx = cls.app.app_context()
+        cls.ctx.push()
+        db.create_all()
+        conn = db.engine.raw_connection()
+        try:
+            load_league(conn.connection, TEAMS, PLAYERS, seed=15, create_schema=False)
+        finally:
+            conn.close()
+        search_index.ensure_search_index(db.session)
+        team_stats.ensure_team_stats(db.session)
+        change_log.ensure_change_log(db.session)
+        analytics_frames.clear()
+        similar_players.clear()
+        cls.client = cls.app.test_client()
+        cls.timings = {}
+
+    @classmethod
+    def tearDownClass(cls):
+        db.session.remove()
+        db.engine.dispose()
+        cls.ctx.pop()
+        shutil.rmtree(cls.tmpdir)
+        cls.report()
+
+    @classmethod
+    def report(cls):
+        if not cls.timings:
+            return
+        out = sys.__stdout__
+        out.write(f"\n{'endpoint':<60} {'queries':>7} {'rows':>6} {'median ms':>10}\n")
+        for key, result in cls.timings.items():
+            out.write(f"{key:<60} {result['queries']:>7} {result['rows']:>6} {result['median_ms']:>10.2f}\n")
+        path = os.environ.get('QUERY_BUDGET_REPORT')
+        if path:
+            with open(path, 'w') as f:
+                json.dump({'teams': TEAMS, 'players': PLAYERS, 'endpoints': cls.timings}, f, indent=2)
+
+    def request(self, budget):
+        kwargs = {} if budget.body is None else {'json': budget.body}
+        return self.client.open(budget.url, method=budget.method, **kwargs)
+
+    def measure(self, budget):
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        # Cached payloads would hide the queries behind a report
+        report_cache.clear()
+        db.session.expire_all()
+        engine = db.engine
+        event.listen(engine, 'before_cursor_execute', record)
+        RowCountingCursor.rows = 0
+        start = time.perf_counter()
+        try:
+            resp = self.request(budget)
+            resp.get_data()
+        finally:
+            elapsed = time.perf_counter() - start
+            event.remove(engine, 'before_cursor_execute', record)
+        return resp, statements, RowCountingCursor.rows, elapsed
+
+    def test_every_route_has_a_budget(self):
+        adapter = self.app.url_map.bind('localhost')
+        covered = {(adapter.match(b.url.split('?')[0], method=b.method)[0], b.method) for b in BUDGETS}
+        for rule in self.app.url_map.iter_rules():
+            if rule.endpoint == 'static':
+                continue
+            for method in rule.methods - {'HEAD', 'OPTIONS'}:
+                self.assertIn((rule.endpoint, method), covered, f"No query budget for {method} {rule.rule}")
+
+    def test_query_budgets(self):
+        for budget in BUDGETS:
+            key = f"{budget.method} {budget.url}"[:60]
+            with self.subTest(endpoint=key):
+                resp, statements, rows, elapsed = self.measure(budget)
+                self.assertEqual(resp.status_code, budget.status, resp.get_data(as_text=True)[:200])
+                self.assertLessEqual(len(statements), budget.max_queries,
+                                     f"{key} ran {len(statements)} statements:\n" + '\n'.join(statements))
+                self.assertLessEqual(rows, budget.max_rows, f"{key} fetched {rows} rows")
+                times = [elapsed]
+                if budget.method == 'GET':
+                    for _ in range(TIMING_RUNS - 1):
+                        times.append(self.measure(budget)[3])
+                self.timings[key] = {'queries': len(statements), 'rows': rows,
+                                     'median_ms': statistics.median(times) * 1000}
+
+
+if __name__ == '__main__':
+    unittest.main()
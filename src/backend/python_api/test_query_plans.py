@@ -0,0 +1,66 @@
+"""Fail when a hot query stops using an index and falls back to a table scan."""
+
+import re
+import unittest
+
+from sqlalchemy import event
+
+from test_app import ApiTestCase
+from app import db
+
+HOT_ENDPOINTS = [
+    '/api/teams/1',
+    '/api/teams?league=La Liga',
+    '/api/teams?country=Spain&limit=1',
+    '/api/players/1',
+    '/api/players?team_id=1',
+    '/api/players?team_id=1&limit=3&after=2',
+    '/api/players?position=Forward',
+    '/api/players?limit=5&after=10',
+    '/api/reports/team-composition?team_id=1',
+    '/api/reports/player-performance?team_id=1',
+    '/api/reports/value-report?team_id=1',
+    '/api/reports/injury-report?team_id=1',
+]
+
+# "SCAN players" without "USING ... INDEX" means every row is visited
+TABLE_SCAN = re.compile(r'^SCAN (TABLE )?(teams|players)\b(?!.*USING)')
+
+
+class TestQueryPlans(ApiTestCase):
+    def capture_statements(self, url):
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith('SELECT'):
+                statements.append((statement, parameters))
+
+        engine = db.engine
+        event.listen(engine, 'before_cursor_execute', record)
+        try:
+            resp = self.client.get(url)
+        finally:
+            event.remove(engine, 'before_cursor_execute', record)
+        self.assertEqual(resp.status_code, 200, url)
+        return statements
+
+    def query_plan(self, statement, parameters):
+        cursor = db.session.connection().connection.cursor()
+        try:
+            return [row[3] for row in cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+        finally:
+            cursor.close()
+
+    def test_hot_queries_use_indexes(self):
+        for url in HOT_ENDPOINTS:
+            with self.subTest(url=url):
+                statements = self.capture_statements(url)
+                self.assertTrue(statements)
+                for statement, parameters in statements:
+                    plan = self.query_plan(statement, parameters)
+                    scans = [line for line in plan if TABLE_SCAN.match(line)]
+                    self.assertFalse(scans, f"{url} runs a table scan:\n{statement}\n{plan}")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+
+from report_cache import ReportCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestReportCache(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = ReportCache(maxsize=2, ttl=10, clock=self.clock)
+
+    def test_hit_and_miss(self):
+        key = ReportCache.make_key('injury-report', 1)
+        self.assertIsNone(self.cache.get(key))
+        self.cache.set(key, {'a': 1})
+        self.assertEqual(self.cache.get(key), {'a': 1})
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_lru_eviction(self):
+        self.cache.set(('r', 1), 1)
+        self.cache.set(('r', 2), 2)
+        self.cache.get(('r', 1))
+        self.cache.set(('r', 3), 3)
+        self.assertIsNone(self.cache.get(('r', 2)))
+        self.assertEqual(self.cache.get(('r', 1)), 1)
+        self.assertEqual(self.cache.evictions, 1)
+
+    def test_ttl_expiry(self):
+        self.cache.set(('r', 1), 1)
+        self.clock.now = 11
+        self.assertIsNone(self.cache.get(('r', 1)))
+        self.assertEqual(self.cache.evictions, 1)
+
+    def test_invalidate_teams_keeps_other_teams(self):
+        self.cache.maxsize = 10
+        self.cache.set(ReportCache.make_key('value-report', 1), 1)
+        self.cache.set(ReportCache.make_key('value-report', 2), 2)
+        self.cache.set(ReportCache.make_key('all-teams', None, 'La Liga', None), 3)
+        self.cache.invalidate_teams(1)
+        self.assertEqual(self.cache.stats()['size'], 1)
+        self.assertEqual(self.cache.get(ReportCache.make_key('value-report', 2)), 2)
+        self.assertEqual(self.cache.invalidations, 2)
+
+    def test_sync_clears_when_another_process_wrote(self):
+        self.cache.sync({'teams': 1, 'players': 4})
+        self.cache.set(('r', 1), 1)
+        self.cache.sync({'teams': 1})
+        self.assertEqual(self.cache.get(('r', 1)), 1)
+        self.cache.sync({'players': 5})
+        self.assertIsNone(self.cache.get(('r', 1)))
+        self.assertEqual(self.cache.invalidations, 1)
+
+    def test_set_skipped_after_invalidation_since_token(self):
+        self.cache.maxsize = 10
+        token = self.cache.token()
+        # A write commits and invalidates while the reader builds the payload
+        self.cache.invalidate_teams(2)
+        self.cache.set(('r', 1), 'stale', token)
+        self.assertIsNone(self.cache.get(('r', 1)))
+        self.cache.set(('r', 1), 'fresh', self.cache.token())
+        self.assertEqual(self.cache.get(('r', 1)), 'fresh')
+
+    def test_get_or_compute_does_not_cache_across_invalidation(self):
+        def compute():
+            self.cache.clear()
+            return 'stale'
+
+        self.assertEqual(self.cache.get_or_compute(('r', 1), compute), 'stale')
+        self.assertIsNone(self.cache.get(('r', 1)))
+        self.assertEqual(self.cache.get_or_compute(('r', 1), lambda: 'fresh'), 'fresh')
+        self.assertEqual(self.cache.get(('r', 1)), 'fresh')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import json
+import unittest
+from datetime import date
+
+from flask import Flask
+
+import serialization
+
+PAYLOAD = {'teams': {1: {'name': 'Team', 'founded': date(1899, 11, 29), 'value': 1.5, 'tags': [None, True]}}}
+EXPECTED = {'teams': {'1': {'name': 'Team', 'founded': '1899-11-29', 'value': 1.5, 'tags': [None, True]}}}
+
+
+class TestSerialization(unittest.TestCase):
+    def test_backends_agree(self):
+        for name in serialization.BACKENDS:
+            with self.subTest(backend=name):
+                self.assertEqual(json.loads(serialization.get_backend(name)(PAYLOAD)), EXPECTED)
+
+    def test_auto_prefers_orjson(self):
+        expected = 'orjson' if serialization.orjson is not None else 'stdlib'
+        self.assertIs(serialization.get_backend('auto'), serialization.BACKENDS[expected])
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            serialization.get_backend('simdjson')
+
+    def test_json_response_uses_configured_backend(self):
+        app = Flask(__name__)
+        app.config['JSON_BACKEND'] = 'stdlib'
+        serialization.init_app(app)
+        with app.app_context():
+            resp = serialization.json_response(PAYLOAD, status=201)
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(resp.mimetype, 'application/json')
+        self.assertEqual(resp.get_json(), EXPECTED)
+
+
+if __name__ == '__main__':
+    unittest.main()
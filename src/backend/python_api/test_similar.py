@@ -0,0 +1,111 @@
+import unittest
+
+import numpy as np
+from sqlalchemy import text
+
+import analytics
+import similar
+from app import db, similar_players
+from test_app import ApiTestCase
+
+
+def brute_force(index, player_id, k):
+    """Sort every live player by exact float64 distance."""
+    slot = int(np.searchsorted(index.ids, player_id))
+    matrix = index.matrix.astype(np.float64)
+    distances = ((matrix - matrix[slot]) ** 2).sum(axis=1)
+    distances += np.where(index.position == index.position[slot], 0, similar.POSITION_PENALTY)
+    candidates = [i for i in range(len(index.ids)) if index.alive[i] and i != slot]
+    candidates.sort(key=lambda i: (distances[i], index.ids[i]))
+    return [int(index.ids[i]) for i in candidates[:k]], np.sqrt(distances[candidates[:k]])
+
+
+class TestSimilarityIndex(unittest.TestCase):
+    def frame(self, n=500, seed=3):
+        rng = np.random.default_rng(seed)
+        columns = {name: rng.normal(50, 10, n) for name in analytics.COLUMNS}
+        columns['salary'][::7] = np.nan
+        columns['weight'][:] = 70.0
+        ids = np.arange(1, n + 1) * 2
+        return analytics.PlayerFrame(1, ids, columns, rng.integers(0, 4, n), ['A', 'B', 'C', 'D'],
+                                     np.ones(n, dtype=bool), teams=None)
+
+    def test_nearest_matches_brute_force(self):
+        index = similar.SimilarityIndex.build(self.frame())
+        for player_id in (2, 250, 1000):
+            ids, distances = index.nearest(player_id, 15)
+            expected_ids, expected_distances = brute_force(index, player_id, 15)
+            self.assertEqual(ids.tolist(), expected_ids)
+            np.testing.assert_allclose(distances, expected_distances, rtol=1e-4, atol=1e-4)
+
+    def test_standardized_features(self):
+        index = similar.SimilarityIndex.build(self.frame())
+        np.testing.assert_allclose(index.matrix.mean(axis=0), 0, atol=1e-5)
+        # The constant weight column stays zero instead of dividing by zero
+        self.assertTrue((index.matrix[:, similar.FEATURES.index('weight')] == 0).all())
+        self.assertFalse(np.isnan(index.matrix).any())
+
+    def test_unknown_player(self):
+        index = similar.SimilarityIndex.build(self.frame())
+        with self.assertRaises(KeyError):
+            index.nearest(3, 5)
+
+
+class TestSimilarPlayers(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        db.session.execute(text(
+            "UPDATE players SET height = 160 + (id * 7) % 40, weight = 60 + (id * 3) % 30, "
+            "salary = player_value / (2 + id % 5), date_of_birth = date('1990-01-01', '+' || (id * 97) || ' days')"))
+        db.session.commit()
+
+    def test_similar_players(self):
+        resp = self.client.get('/api/players/5/similar?k=5')
+        self.assertEqual(resp.status_code, 200)
+        body = resp.get_json()
+        self.assertEqual(body['features'], list(similar.FEATURES))
+        expected_ids, _ = brute_force(similar_players.get(db.session), 5, 5)
+        self.assertEqual([item['id'] for item in body['items']], expected_ids)
+        distances = [item['distance'] for item in body['items']]
+        self.assertEqual(distances, sorted(distances))
+        # Eight other players are goalkeepers too, so the five nearest are
+        position = self.client.get('/api/players/5').get_json()['position']
+        self.assertEqual({item['position'] for item in body['items']}, {position})
+        self.assertIn('full_name', body['items'][0])
+
+    def test_k_larger_than_league(self):
+        items = self.client.get('/api/players/1/similar?k=100').get_json()['items']
+        self.assertEqual(len(items), 29)
+        self.assertNotIn(1, [item['id'] for item in items])
+
+    def test_errors(self):
+        self.assertEqual(self.client.get('/api/players/999/similar').status_code, 404)
+        self.assertEqual(self.client.get('/api/players/1/similar?k=0').status_code, 400)
+        self.assertEqual(self.client.get('/api/players/1/similar?k=x').status_code, 400)
+
+    def test_writes_patch_the_index(self):
+        index = similar_players.get(db.session)
+        self.client.put('/api/players/1', json={'rating': 10, 'height': 199})
+        self.client.delete('/api/players/2')
+        new_id = self.client.post('/api/players', json={'full_name': 'New', 'team_id': 1, 'position': 'Forward',
+                                                        'height': 180, 'rating': 4}).get_json()['id']
+
+        builds = similar_players.builds
+        patched = similar_players.get(db.session)
+        self.assertEqual(similar_players.builds, builds)
+        self.assertEqual((patched.mean.tolist(), patched.scale.tolist()), (index.mean.tolist(), index.scale.tolist()))
+
+        # Same rows as standardizing the current players with the original mean and scale
+        frame = analytics.load_frame(db.session)
+        expected = similar.standardize(similar.feature_columns(frame, slice(None)), index.mean, index.scale)
+        np.testing.assert_array_equal(patched.ids[patched.alive], frame.ids)
+        np.testing.assert_array_equal(patched.matrix[patched.alive], expected)
+
+        items = self.client.get('/api/players/3/similar?k=50').get_json()['items']
+        self.assertIn(new_id, [item['id'] for item in items])
+        self.assertNotIn(2, [item['id'] for item in items])
+        self.assertEqual(self.client.get('/api/players/2/similar').status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
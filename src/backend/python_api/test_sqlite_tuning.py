@@ -0,0 +1,52 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from sqlalchemy import create_engine, text
+
+from app import create_app, db
+from sqlite_tuning import install_pragmas, pool_options, resolve_pragmas, POOL_DEFAULTS
+
+
+class TestSqliteTuning(unittest.TestCase):
+    def test_resolve_pragmas(self):
+        self.assertEqual(resolve_pragmas('default'), {})
+        pragmas = resolve_pragmas('performance', {'busy_timeout': 100})
+        self.assertEqual(pragmas['journal_mode'], 'WAL')
+        self.assertEqual(pragmas['busy_timeout'], 100)
+        with self.assertRaises(ValueError):
+            resolve_pragmas('turbo')
+
+    def test_pragmas_applied_to_pooled_connections(self):
+        fd, path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        engine = create_engine(f"sqlite:///{path}", **pool_options(POOL_DEFAULTS))
+        install_pragmas(engine, resolve_pragmas('performance'))
+        try:
+            with engine.connect() as conn:
+                self.assertEqual(conn.execute(text('PRAGMA journal_mode')).scalar(), 'wal')
+                self.assertEqual(conn.execute(text('PRAGMA synchronous')).scalar(), 1)
+                self.assertEqual(conn.execute(text('PRAGMA busy_timeout')).scalar(), 5000)
+        finally:
+            engine.dispose()
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+
+    def test_profile_is_per_app(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        modes = {}
+        for profile in ('performance', 'default'):
+            app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmpdir, profile)}.db",
+                              'SQLITE_PROFILE': profile})
+            with app.app_context():
+                with db.engine.connect() as conn:
+                    modes[profile] = conn.execute(text('PRAGMA journal_mode')).scalar()
+                db.engine.dispose()
+        self.assertEqual(modes, {'performance': 'wal', 'default': 'delete'})
+
+
+if __name__ == '__main__':
+    unittest.main()
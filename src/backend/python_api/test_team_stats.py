@@ -0,0 +1,92 @@
+import unittest
+
+from sqlalchemy import text
+
+from app import db
+import team_stats
+from test_app import ApiTestCase
+
+
+class TestTeamStats(ApiTestCase):
+    def totals(self, team_id):
+        row = team_stats.team_totals(db.session, team_id)
+        return None if row is None else dict(row._mapping)
+
+    def assertConsistent(self):
+        self.assertEqual(team_stats.verify_team_stats(db.session), [])
+
+    def test_built_from_existing_rows(self):
+        self.assertEqual(self.totals(1), {'player_count': 10, 'injured_count': 2,
+                                          'total_rating': 55, 'total_value': 55000000.0})
+        self.assertEqual(team_stats.team_histograms(db.session, 1)['nationality'], {'Brazil': 5, 'Spain': 5})
+        self.assertConsistent()
+
+    def test_player_writes_apply_deltas(self):
+        self.client.post('/api/players', json={'full_name': 'New', 'team_id': 1, 'position': 'Coach',
+                                               'rating': 4, 'is_injured': True})
+        self.assertEqual(self.totals(1)['player_count'], 11)
+        self.assertEqual(team_stats.team_histograms(db.session, 1)['position']['Coach'], 1)
+
+        self.client.put('/api/players/1', json={'team_id': 2, 'position': 'Forward', 'rating': 7})
+        self.assertEqual(self.totals(1)['player_count'], 10)
+        self.assertEqual(self.totals(2)['player_count'], 11)
+        self.assertEqual(self.totals(1)['total_rating'], 58)
+        self.assertEqual(team_stats.team_histograms(db.session, 1)['position']['Goalkeeper'], 2)
+        self.assertEqual(team_stats.team_histograms(db.session, 2)['position']['Forward'], 3)
+        self.assertConsistent()
+
+        self.client.put('/api/players/2', json={'is_injured': True, 'player_value': None})
+        self.client.delete('/api/players/3')
+        self.assertEqual(self.totals(1)['injured_count'], 3)
+        self.assertConsistent()
+
+    def test_team_delete_drops_rows(self):
+        self.client.post('/api/teams', json={'name': 'New Team'})
+        self.assertEqual(self.totals(4)['player_count'], 0)
+        self.client.delete('/api/teams/1')
+        self.assertIsNone(self.totals(1))
+        self.assertEqual(db.session.execute(text(
+            "SELECT count(*) FROM team_stat_counts WHERE team_id = 1")).scalar(), 0)
+        self.assertConsistent()
+
+    def test_bulk_and_raw_sql_writes(self):
+        self.client.post('/api/players/bulk', json=[{'full_name': f"Bulk {i}", 'team_id': 2, 'rating': 1}
+                                                    for i in range(5)])
+        self.client.put('/api/players/bulk', json=[{'id': i, 'position': 'Forward'} for i in range(11, 16)])
+        self.client.delete('/api/players/bulk', json={'ids': [16, 17]})
+        self.client.delete('/api/teams/bulk', json={'ids': [3]})
+        db.session.execute(text("UPDATE players SET player_value = player_value * 1.1 WHERE team_id = 2"))
+        db.session.commit()
+        self.assertEqual(self.totals(2)['player_count'], 13)
+        self.assertIsNone(self.totals(3))
+        self.assertConsistent()
+
+    def test_verify_reports_drift_and_rebuild_repairs(self):
+        db.session.execute(text("UPDATE team_stats SET player_count = 3 WHERE team_id = 2"))
+        db.session.execute(text("DELETE FROM team_stat_counts WHERE team_id = 1 AND kind = 'position'"))
+        problems = team_stats.verify_team_stats(db.session)
+        self.assertIn({'team_id': 2, 'field': 'player_count', 'stored': 3, 'actual': 10}, problems)
+        self.assertIn({'team_id': 1, 'field': 'position:Forward', 'stored': None, 'actual': 2}, problems)
+        team_stats.rebuild_team_stats(db.session)
+        self.assertConsistent()
+
+    def test_reports_read_aggregates(self):
+        db.session.execute(text("UPDATE team_stats SET total_rating = 0 WHERE team_id = 1"))
+        db.session.commit()
+        report = self.client.get('/api/reports/team-composition?team_id=1').get_json()
+        self.assertEqual(report['average_rating'], 0)
+        teams = self.client.get('/api/reports/all-teams').get_json()['teams']
+        self.assertEqual(teams['1']['average_rating'], 0)
+        self.assertEqual(teams['2']['positions'], {'Goalkeeper': 3, 'Defender': 3, 'Midfielder': 2, 'Forward': 2})
+
+
+    def test_multi_team_readers_match_single_team(self):
+        totals = team_stats.totals_of_teams(db.session, [1, 3, 99])
+        self.assertEqual(sorted(totals), [1, 3])
+        self.assertEqual(tuple(totals[3])[1:], tuple(team_stats.team_totals(db.session, 3)))
+        histograms = team_stats.histograms_of_teams(db.session, [2, 99])
+        self.assertEqual(histograms[2], team_stats.team_histograms(db.session, 2))
+        self.assertEqual(histograms[99], {'position': {}, 'nationality': {}})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,11 @@
+"""WSGI entry point for production servers.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Only builds the app; gunicorn.conf.py prepares the database once in the
+master before any worker starts.
+"""
+
+from app import create_app
+
+app = create_app()
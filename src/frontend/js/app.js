@@ -103,27 +103,16 @@ function showSection(section) {
 async function loadDashboardData() {
     showLoading();
     try {
-        // Fetch teams
-        const teamsResponse = await fetch(API_ENDPOINTS.teams);
-        const teams = await teamsResponse.json();
-        totalTeamsElement.textContent = teams.length;
+        // Aggregates are computed server-side so no table rows are downloaded
+        const response = await fetch(API_ENDPOINTS.statsSummary);
+        if (!response.ok) throw new Error(`Failed to fetch summary: ${response.status}`);
+        const stats = await response.json();
         
-        // Fetch players
-        const playersResponse = await fetch(API_ENDPOINTS.players);
-        const players = await playersResponse.json();
-        totalPlayersElement.textContent = players.length;
+        totalTeamsElement.textContent = stats.total_teams;
+        totalPlayersElement.textContent = stats.total_players;
+        injuredPlayersElement.textContent = stats.injured_players;
         
-        // Calculate injured players
-        const injured = players.filter(player => player.is_injured || player.isInjured);
-        injuredPlayersElement.textContent = injured.length;
-        
-        // Calculate average player value
-        let totalValue = 0;
-        players.forEach(player => {
-            totalValue += parseFloat(player.player_value || player.playerValue || 0);
-        });
-        
-        const avgValue = players.length ? (totalValue / players.length).toFixed(2) : 0;
+        const avgValue = Number(stats.average_player_value || 0).toFixed(2);
         avgPlayerValueElement.textContent = `$${numberWithCommas(avgValue)}`;
     } catch (error) {
         console.error('Error loading dashboard data:', error);
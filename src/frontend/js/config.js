@@ -42,10 +42,15 @@ function updateApiEndpoints(config) {
     // Update global API_ENDPOINTS object
     API_ENDPOINTS.teams = `${baseUrl}/teams`;
     API_ENDPOINTS.players = `${baseUrl}/players`;
+    API_ENDPOINTS.statsSummary = `${baseUrl}/stats/summary`;
+    API_ENDPOINTS.search = `${baseUrl}/search`;
     API_ENDPOINTS.reports.teamComposition = `${baseUrl}/reports/team-composition`;
     API_ENDPOINTS.reports.playerPerformance = `${baseUrl}/reports/player-performance`;
     API_ENDPOINTS.reports.valueReport = `${baseUrl}/reports/value-report`;
     API_ENDPOINTS.reports.injuryReport = `${baseUrl}/reports/injury-report`;
+    API_ENDPOINTS.reports.batch = `${baseUrl}/reports/batch`;
+    API_ENDPOINTS.exports.players = `${baseUrl}/export/players`;
+    API_ENDPOINTS.exports.reports = `${baseUrl}/export/reports`;
     
     console.log(`API endpoints updated to use ${config.apiType} backend at ${baseUrl}`);
 }
@@ -54,11 +59,18 @@ function updateApiEndpoints(config) {
 const API_ENDPOINTS = {
     teams: `${API_BASE_URL}/teams`,
     players: `${API_BASE_URL}/players`,
+    statsSummary: `${API_BASE_URL}/stats/summary`,
+    search: `${API_BASE_URL}/search`,
     reports: {
         teamComposition: `${API_BASE_URL}/reports/team-composition`,
         playerPerformance: `${API_BASE_URL}/reports/player-performance`,
         valueReport: `${API_BASE_URL}/reports/value-report`,
-        injuryReport: `${API_BASE_URL}/reports/injury-report`
+        injuryReport: `${API_BASE_URL}/reports/injury-report`,
+        batch: `${API_BASE_URL}/reports/batch`
+    },
+    exports: {
+        players: `${API_BASE_URL}/export/players`,
+        reports: `${API_BASE_URL}/export/reports`
     }
 };
 
@@ -122,12 +122,12 @@ function passesFilters(p){
     return true;
   }
 
-function renderPlayers(list){
+function renderPlayers(list, options = {}){
     const tbody = document.getElementById(playersTbodyId);
     if(!tbody) return;
     tbody.innerHTML='';
     list.forEach(p=>{
-      if(!passesFilters(p)) return;
+      if(!options.serverFiltered && !passesFilters(p)) return;
       const tr=document.createElement('tr');
       tr.innerHTML = `
         <td>${p.full_name || p.fullName || ''}</td>
@@ -185,20 +185,35 @@ function populatePlayerFilters(players, teams) {
     });
 }
 
+// Debounce timer for server-side search
+let playerSearchTimer = null;
+
 function filterPlayers() {
-    const searchValue = playerSearch.value.toLowerCase();
-    const teamValue = teamFilter.value;
-    const posValue = positionFilter.value;
-    const injValue = injuryFilter.value;
+    const searchValue = playerSearch.value.trim();
+    clearTimeout(playerSearchTimer);
+    if (!searchValue) {
+        renderPlayers(window.__playersCache || []);
+        return;
+    }
+    // Name search runs against the server's full-text index, not the loaded list
+    playerSearchTimer = setTimeout(() => searchPlayers(searchValue), 150);
+}
 
-    const filtered = playersData.filter(p => {
-        const nameMatch = (p.full_name || p.fullName || '').toLowerCase().includes(searchValue);
-        const teamMatch = !teamValue || (p.team_id || p.teamId) == teamValue;
-        const posMatch = !posValue || p.position === posValue;
-        const injMatch = !injValue || String(p.is_injured || p.isInjured) === injValue;
-        return nameMatch && teamMatch && posMatch && injMatch;
-    });
-    populatePlayersTable(filtered);
+async function searchPlayers(query) {
+    const params = new URLSearchParams({ q: query, type: 'players', limit: 50 });
+    if (teamFilter.value) params.set('team_id', teamFilter.value);
+    if (positionFilter.value) params.set('position', positionFilter.value);
+    if (injuryFilter.value) params.set('injured', injuryFilter.value);
+    try {
+        const res = await fetch(`${API_ENDPOINTS.search}?${params}`);
+        if (!res.ok) throw new Error(`Search failed: ${res.status}`);
+        const data = await res.json();
+        // Ignore responses for queries the user has already typed past
+        if (playerSearch.value.trim() !== query) return;
+        renderPlayers(data.players.items, { serverFiltered: true });
+    } catch (e) {
+        console.error('Player search failed', e);
+    }
 }
 
 function openPlayerModal(playerId) {
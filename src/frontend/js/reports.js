@@ -204,6 +204,29 @@ async function generateTeamCompositionReport(teamId) {
     }
 }
 
+/**
+ * Fetch reports from the batch endpoint
+ * @param {string[]} teamIds - The team IDs to generate reports for
+ * @param {string[]} types - Report types, e.g. 'value-report'
+ * @returns {Object} - Reports keyed by team ID, then by report type
+ */
+async function fetchReportBatch(teamIds, types) {
+    const url = `${API_ENDPOINTS.reports.batch}?team_ids=${teamIds.join(',')}&types=${types.join(',')}`;
+    console.log('Fetching report batch from:', url);
+
+    const response = await fetch(url);
+    if (!response.ok) {
+        const errorText = await response.text();
+        console.error('API error response:', errorText);
+        throw new Error(`Failed to fetch reports: ${response.status} ${response.statusText}`);
+    }
+    const body = await response.json();
+    if (body.not_found.length > 0) {
+        throw new Error(`Team with ID ${body.not_found.join(', ')} not found`);
+    }
+    return body.reports;
+}
+
 /**
  * Generate Player Performance Report
  * @param {string} teamId - The team ID to generate the report for
@@ -211,65 +234,19 @@ async function generateTeamCompositionReport(teamId) {
  */
 async function generatePlayerPerformanceReport(teamId) {
     try {
-        // Get team data using the teams endpoint
-        const teamsResponse = await fetch(API_ENDPOINTS.teams);
-        const teams = await teamsResponse.json();
-        console.log('All teams:', teams);
-        
-        // Handle different property naming conventions
-        const team = teams.find(t => (t.id == teamId) || (t.ID == teamId));
-        console.log('Selected team:', team);
-        
-        if (!team) {
-            throw new Error(`Team with ID ${teamId} not found in the list of ${teams.length} teams`);
-        }
-        
-        // Get all players for the team
-        const playersResponse = await fetch(API_ENDPOINTS.players);
-        const allPlayers = await playersResponse.json();
-        console.log('All players:', allPlayers);
-        
-        // Match by team_id or teamId (handle both formats)
-        const teamPlayers = allPlayers.filter(player => {
-            // Check all possible property naming conventions
-            const playerTeamId = player.team_id || player.teamId || player.TeamId || player.team_ID || null;
-            return playerTeamId == teamId;
-        });
-        
-        if (teamPlayers.length === 0) {
+        const reports = await fetchReportBatch([teamId], ['player-performance']);
+        const report = reports[teamId]['player-performance'];
+
+        if (report.players.length === 0) {
             throw new Error('No players found for this team');
         }
-        
-        // Sort by rating (handle both property naming conventions)
-        teamPlayers.sort((a, b) => {
-            const ratingA = a.rating || a.Rating || 0;
-            const ratingB = b.rating || b.Rating || 0;
-            return ratingB - ratingA;
-        });
-        
-        // Calculate average rating (handle both property naming conventions)
-        const averageRating = teamPlayers.length > 0 ? 
-            teamPlayers.reduce((sum, player) => {
-                return sum + parseFloat(player.rating || player.Rating || 0);
-            }, 0) / teamPlayers.length : 0;
-        
-        // Safety check for edge cases
-        if (teamPlayers.length === 0) {
-            return {
-                team: team,
-                players: [],
-                highestRated: { name: 'None', rating: 0 },
-                lowestRated: { name: 'None', rating: 0 },
-                averageRating: 0
-            };
-        }
-        
+
         return {
-            team: team,
-            players: teamPlayers,
-            highestRated: teamPlayers[0],
-            lowestRated: teamPlayers[teamPlayers.length - 1],
-            averageRating: averageRating
+            team: report.team,
+            players: report.players,
+            highestRated: report.highest_rated,
+            lowestRated: report.lowest_rated,
+            averageRating: report.average_rating
         };
     } catch (error) {
         console.error('Error generating player performance report:', error);
@@ -284,68 +261,20 @@ async function generatePlayerPerformanceReport(teamId) {
  */
 async function generateValueReport(teamId) {
     try {
-        // Get team data using the teams endpoint
-        const teamsResponse = await fetch(API_ENDPOINTS.teams);
-        const teams = await teamsResponse.json();
-        console.log('All teams:', teams);
-        
-        // Handle different property naming conventions
-        const team = teams.find(t => (t.id == teamId) || (t.ID == teamId));
-        console.log('Selected team:', team);
-        
-        if (!team) {
-            throw new Error(`Team with ID ${teamId} not found in the list of ${teams.length} teams`);
-        }
-        
-        // Get all players for the team
-        const playersResponse = await fetch(API_ENDPOINTS.players);
-        const allPlayers = await playersResponse.json();
-        console.log('All players:', allPlayers);
-        
-        // Match by team_id or teamId (handle both formats)
-        const teamPlayers = allPlayers.filter(player => {
-            // Check all possible property naming conventions
-            const playerTeamId = player.team_id || player.teamId || player.TeamId || player.team_ID || null;
-            return playerTeamId == teamId;
-        });
-        
-        if (teamPlayers.length === 0) {
+        const reports = await fetchReportBatch([teamId], ['value-report']);
+        const report = reports[teamId]['value-report'];
+
+        if (report.players.length === 0) {
             throw new Error('No players found for this team');
         }
-        
-        // Sort by value (handle both property naming conventions)
-        teamPlayers.sort((a, b) => {
-            const valueA = a.player_value || a.playerValue || 0;
-            const valueB = b.player_value || b.playerValue || 0;
-            return valueB - valueA;
-        });
-        
-        // Calculate total and average values (handle both property naming conventions)
-        const totalValue = teamPlayers.reduce((sum, player) => {
-            return sum + parseFloat(player.player_value || player.playerValue || 0);
-        }, 0);
-        
-        const averageValue = teamPlayers.length > 0 ? totalValue / teamPlayers.length : 0;
-        
-        // Safety check for edge cases
-        if (teamPlayers.length === 0) {
-            return {
-                team: team,
-                players: [],
-                totalValue: 0,
-                mostValuable: { name: 'None', player_value: 0 },
-                leastValuable: { name: 'None', player_value: 0 },
-                averageValue: 0
-            };
-        }
-        
+
         return {
-            team: team,
-            players: teamPlayers,
-            totalValue: totalValue,
-            mostValuable: teamPlayers[0],
-            leastValuable: teamPlayers[teamPlayers.length - 1],
-            averageValue: averageValue
+            team: report.team,
+            players: report.players,
+            totalValue: report.total_value,
+            mostValuable: report.most_valuable,
+            leastValuable: report.least_valuable,
+            averageValue: report.average_value
         };
     } catch (error) {
         console.error('Error generating value report:', error);
@@ -360,41 +289,14 @@ async function generateValueReport(teamId) {
  */
 async function generateInjuryReport(teamId) {
     try {
-        // Get team data using the teams endpoint
-        const teamsResponse = await fetch(API_ENDPOINTS.teams);
-        const teams = await teamsResponse.json();
-        console.log('All teams:', teams);
-        
-        // Handle different property naming conventions
-        const team = teams.find(t => (t.id == teamId) || (t.ID == teamId));
-        console.log('Selected team:', team);
-        
-        if (!team) {
-            throw new Error(`Team with ID ${teamId} not found in the list of ${teams.length} teams`);
-        }
-        
-        // Get all players for the team
-        const playersResponse = await fetch(API_ENDPOINTS.players);
-        const allPlayers = await playersResponse.json();
-        console.log('All players:', allPlayers);
-        
-        // Match by team_id or teamId (handle both formats)
-        const teamPlayers = allPlayers.filter(player => {
-            // Check all possible property naming conventions
-            const playerTeamId = player.team_id || player.teamId || player.TeamId || player.team_ID || null;
-            return playerTeamId == teamId;
-        });
-        
-        // Filter injured players (handle both property naming conventions)
-        const injuredPlayers = teamPlayers.filter(player => 
-            player.is_injured === true || player.isInjured === true
-        );
-        
+        const reports = await fetchReportBatch([teamId], ['injury-report']);
+        const report = reports[teamId]['injury-report'];
+
         return {
-            team: team,
-            totalPlayers: teamPlayers.length,
-            injuredPlayers: injuredPlayers,
-            injuryRate: teamPlayers.length > 0 ? (injuredPlayers.length / teamPlayers.length) * 100 : 0
+            team: report.team,
+            totalPlayers: report.total_players,
+            injuredPlayers: report.injured_players,
+            injuryRate: report.injury_rate
         };
     } catch (error) {
         console.error('Error generating injury report:', error);
@@ -696,41 +598,26 @@ function renderInjuryReport(data) {
 
 /**
  * Export report to CSV
+ * The server streams the full report straight from the database, so the
+ * export does not depend on what has been rendered.
  */
 function exportReportToCSV() {
     const reportType = reportTypeSelect.value;
+    const teamId = reportTeamSelect.value;
     const teamName = reportTeamSelect.options[reportTeamSelect.selectedIndex].text;
     
-    // Get table data
-    const table = reportContent.querySelector('table');
-    if (!table) {
-        alert('No data to export');
+    if (!teamId) {
+        alert('Please select a team for the report.');
         return;
     }
     
-    // Create CSV content
-    let csvContent = 'data:text/csv;charset=utf-8,';
-    
-    // Add report title
-    csvContent += `${teamName} - ${reportTypeSelect.options[reportTypeSelect.selectedIndex].text}\r\n\r\n`;
-    
-    // Add table headers
-    const headers = Array.from(table.querySelectorAll('th'))
-        .map(th => `"${th.textContent}"`);
-    csvContent += headers.join(',') + '\r\n';
-    
-    // Add table rows
-    const rows = table.querySelectorAll('tbody tr');
-    rows.forEach(row => {
-        const cells = Array.from(row.querySelectorAll('td'))
-            .map(td => `"${td.textContent}"`);
-        csvContent += cells.join(',') + '\r\n';
-    });
+    const exportsBase = (API_ENDPOINTS.exports && API_ENDPOINTS.exports.reports)
+        || `${API_BASE_URL}/export/reports`;
+    const url = `${exportsBase}/${encodeURIComponent(reportType)}?team_id=${encodeURIComponent(teamId)}&format=csv`;
     
     // Create download link
-    const encodedUri = encodeURI(csvContent);
     const link = document.createElement('a');
-    link.setAttribute('href', encodedUri);
+    link.setAttribute('href', url);
     link.setAttribute('download', `${reportType}_${teamName}_${new Date().toISOString().split('T')[0]}.csv`);
     document.body.appendChild(link);
     